@@ -0,0 +1,193 @@
+# asgi_server.py
+
+"""
+Asynchronous server mode.
+
+Serves every route of server.py over ASGI and adds a WebSocket at /ws
+that pushes state changes to dashboards and, when a client asks for it
+with {"preview": true}, downsampled live frames of the default strip.
+
+Usage: python asgi_server.py  (or: uvicorn asgi_server:app)
+"""
+
+import asyncio
+import json
+import time
+import numpy as np
+from asgiref.wsgi import WsgiToAsgi
+
+import boot
+import controller
+import db
+import metrics
+import server
+import stream
+import sync
+
+PREVIEW_FPS = 15  # Upper bound for live preview frames per second
+PREVIEW_PIXELS = 120  # Maximum number of pixels in a preview frame
+
+class Subscriber:
+    """
+    The outbox of one WebSocket client.
+
+    Holds only the latest preview frame and the state changes merged by
+    key since the last send, so a slow client skips frames and coalesces
+    updates instead of buffering them without limit.
+    """
+
+    def __init__(self):
+        self.preview = False
+        self.state = {}
+        self.frame = None
+        self.ready = asyncio.Event()
+
+    def push_state(self, changes):
+        self.state.update(changes)
+        self.ready.set()
+
+    def push_frame(self, frame):
+        if self.preview:
+            self.frame = frame
+            self.ready.set()
+
+    async def next(self):
+        """Wait for something to send and return (state_changes, frame)."""
+        await self.ready.wait()
+        self.ready.clear()
+        state, self.state = self.state, {}
+        frame, self.frame = self.frame, None
+        return state, frame
+
+class Hub:
+    """
+    Fans state changes and preview frames out to every subscriber.
+
+    Frames come from the render thread. At most PREVIEW_FPS of them per
+    second are downsampled, once each, and the resulting bytes object is
+    shared by all subscribers.
+    """
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.subscribers = set()
+        self.previewers = 0
+        self.last_preview = 0.0
+        self.previews_sent = 0
+        controller.add_frame_listener(self.on_frame)
+        db.watch_database(self.on_change)
+
+    def add(self, subscriber):
+        self.subscribers.add(subscriber)
+
+    def remove(self, subscriber):
+        self.set_preview(subscriber, False)
+        self.subscribers.discard(subscriber)
+
+    def set_preview(self, subscriber, enabled):
+        if enabled != subscriber.preview:
+            self.previewers += 1 if enabled else -1
+            subscriber.preview = enabled
+
+    def on_frame(self, strip, buffer):
+        # Runs on the render thread: bail out as early as possible
+        if strip != controller.DEFAULT_STRIP or not self.previewers:
+            return
+        now = time.monotonic()
+        if now - self.last_preview < 1 / PREVIEW_FPS:
+            return
+        self.last_preview = now
+        pixels = np.frombuffer(buffer, dtype=np.uint8).reshape(-1, 3)
+        frame = pixels[::-(-len(pixels) // PREVIEW_PIXELS)].tobytes()
+        self.loop.call_soon_threadsafe(self.publish_frame, frame)
+
+    def on_change(self, changes):
+        self.loop.call_soon_threadsafe(self.publish_state, changes)
+
+    def publish_frame(self, frame):
+        self.previews_sent += 1
+        for subscriber in self.subscribers:
+            subscriber.push_frame(frame)
+
+    def publish_state(self, changes):
+        for subscriber in self.subscribers:
+            subscriber.push_state(changes)
+
+hub = None  # The subscriber hub, created on the server's event loop
+
+def get_hub():
+    """Return the hub, creating it on the running event loop if needed."""
+    global hub
+    if hub is None:
+        hub = Hub(asyncio.get_running_loop())
+    return hub
+
+def current_state():
+    """Return the brightness and active effects as a {key: value} dict."""
+    keys = ['set_brightness'] + [server.active_effect_key(name) for name in controller.segments]
+    return db.get_from_database(keys)
+
+async def send_updates(subscriber, send):
+    while True:
+        state, frame = await subscriber.next()
+        if state:
+            await send({'type': 'websocket.send', 'text': json.dumps({"type": "state", "changes": state})})
+        if frame is not None:
+            await send({'type': 'websocket.send', 'bytes': frame})
+
+async def websocket(scope, receive, send):
+    """Push state changes (and previews if requested) until the client disconnects."""
+    message = await receive()
+    if message['type'] != 'websocket.connect':
+        return
+    await send({'type': 'websocket.accept'})
+    subscriber = Subscriber()
+    get_hub().add(subscriber)
+    subscriber.push_state(current_state())
+    sender = asyncio.create_task(send_updates(subscriber, send))
+    try:
+        while True:
+            message = await receive()
+            if message['type'] == 'websocket.disconnect':
+                break
+            try:
+                options = json.loads(message.get('text') or '{}')
+            except ValueError:
+                continue
+            if isinstance(options, dict) and 'preview' in options:
+                get_hub().set_preview(subscriber, bool(options['preview']))
+    finally:
+        sender.cancel()
+        get_hub().remove(subscriber)
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            metrics.configure_logging()
+            get_hub()
+            server.restore_state()
+            stream.start_receiver()
+            sync.start_sync()
+            boot.mark('ready')
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+http_app = WsgiToAsgi(server.app)
+
+async def app(scope, receive, send):
+    if scope['type'] == 'websocket':
+        if scope['path'] == '/ws':
+            await websocket(scope, receive, send)
+        else:
+            await send({'type': 'websocket.close', 'code': 1008})
+    elif scope['type'] == 'lifespan':
+        await lifespan(receive, send)
+    else:
+        await http_app(scope, receive, send)
+
+if __name__ == '__main__':
+    import uvicorn
+    uvicorn.run(app, host='0.0.0.0', port=server.PORT)
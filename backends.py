@@ -0,0 +1,242 @@
+# backends.py
+
+import collections
+import logging
+import threading
+import time
+import numpy as np
+
+logger = logging.getLogger('backends')
+
+class ColorCorrection:
+    """
+    Brightness, gamma and white balance folded into one 256-entry lookup
+    table per channel.
+
+    The tables are rebuilt only when a setting changes, and swapped in as
+    a whole so a frame being corrected on another thread never sees a
+    half-built table. apply() corrects a whole frame in one vectorized pass.
+
+    Args:
+        brightness (float): Output scale between 0.0 and 1.0.
+        gamma (float): Gamma exponent, 1.0 for linear output.
+        white_balance (tuple): Per-channel (R, G, B) scale between 0.0 and 1.0.
+    """
+
+    def __init__(self, brightness=1.0, gamma=1.0, white_balance=(1.0, 1.0, 1.0)):
+        self.brightness = brightness
+        self.gamma = gamma
+        self.white_balance = tuple(white_balance)
+        self.table = None  # Flat (R, G, B) table of 3 * 256 entries, None when it is the identity
+        self.offsets = None
+        self.index = None
+        self.out = None
+        self.build()
+
+    def update(self, brightness=None, gamma=None, white_balance=None):
+        """Change some settings and rebuild the tables."""
+        if brightness is not None:
+            self.brightness = brightness
+        if gamma is not None:
+            self.gamma = gamma
+        if white_balance is not None:
+            self.white_balance = tuple(white_balance)
+        self.build()
+
+    def build(self):
+        levels = (np.arange(256) / 255.0) ** self.gamma * 255.0
+        table = np.concatenate([levels * (self.brightness * scale) for scale in self.white_balance])
+        table = np.clip(np.rint(table), 0, 255).astype(np.uint8)
+        identity = np.tile(np.arange(256, dtype=np.uint8), 3)
+        self.table = None if np.array_equal(table, identity) else table
+
+    def apply(self, frame):
+        """Return the corrected frame; the frame itself when no correction is needed."""
+        table = self.table
+        if table is None:
+            return frame
+        if self.out is None or len(self.out) != len(frame):
+            self.out = bytearray(len(frame))
+            # Offset each channel into its own third of the table
+            self.offsets = np.tile(np.array([0, 256, 512], dtype=np.uint16), len(frame) // 3)
+            self.index = np.empty(len(frame), dtype=np.uint16)
+        np.add(np.frombuffer(frame, dtype=np.uint8), self.offsets, out=self.index)
+        np.take(table, self.index, out=np.frombuffer(self.out, dtype=np.uint8))
+        return self.out
+
+class PixelBackend:
+    """
+    Base class for pixel outputs.
+
+    Exposes the subset of the neopixel.NeoPixel API the effects use
+    (indexing, fill, show, brightness) on top of a flat RGB framebuffer,
+    plus write() for bulk frame updates. Brightness, gamma and white
+    balance are applied by a ColorCorrection when the frame is shown, so
+    the framebuffer always holds the uncorrected colors. A shown frame
+    identical to the last one sent is skipped, so effects that redraw
+    the same frame cost no bus time. Subclasses implement output().
+    """
+
+    def __init__(self, led_count, brightness=1.0):
+        self.n = led_count
+        self.buffer = bytearray(led_count * 3)
+        self.correction = ColorCorrection(brightness)
+        self.frames_shown = 0  # Frames sent to the output
+        self.frames_skipped = 0  # Frames not sent because they matched the last one
+        self.sent = None  # Copy of the last corrected frame sent, None before the first
+        self.error = None  # Why the output cannot show frames, if it failed
+
+    @property
+    def brightness(self):
+        return self.correction.brightness
+
+    @brightness.setter
+    def brightness(self, value):
+        self.correction.update(brightness=value)
+
+    def __len__(self):
+        return self.n
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self.n))]
+        offset = index * 3
+        return tuple(self.buffer[offset:offset + 3])
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            for i, color in zip(range(*index.indices(self.n)), value):
+                self[i] = color
+            return
+        if index < 0:
+            index += self.n
+        offset = index * 3
+        self.buffer[offset:offset + 3] = bytes(value)
+
+    def fill(self, color):
+        """Set every pixel to the same RGB color."""
+        self.buffer[:] = bytes(color) * self.n
+
+    def write(self, frame):
+        """Copy a flat RGB frame into the framebuffer."""
+        self.buffer[:len(frame)] = frame
+
+    def show(self, force=False):
+        """
+        Push the color-corrected framebuffer to the output, unless it
+        matches the last frame sent and force is False. Returns True if
+        the frame was sent.
+        """
+        frame = self.correction.apply(self.buffer)
+        if self.sent is None:
+            self.sent = bytearray(frame)
+        elif force or frame != self.sent:
+            self.sent[:] = frame
+        else:
+            self.frames_skipped += 1
+            return False
+        self.frames_shown += 1
+        self.output(frame)
+        return True
+
+    def output(self, buffer):
+        raise NotImplementedError
+
+    def close(self):
+        """Release the output."""
+
+class NeoPixelBackend(PixelBackend):
+    """
+    Output to a real NeoPixel strip through the Adafruit neopixel library.
+
+    The library is imported and the GPIO taken on the first show(), not
+    when the backend is created, so importing the controller stays fast
+    and nothing touches the hardware until there is a frame to show. If
+    the strip cannot be opened, the error is logged and kept in `error`,
+    and frames are dropped.
+    """
+
+    def __init__(self, led_count, brightness=1.0, pin='D18', pixel_order='GRB'):
+        super().__init__(led_count, brightness)
+        self.pin = pin
+        self.pixel_order = pixel_order
+        self.strip = None
+
+    def open(self):
+        """Open the strip now rather than on the first frame."""
+        if self.strip is not None or self.error is not None:
+            return
+        try:
+            # Imported here so the other backends work without the Pi libraries
+            import board
+            import neopixel
+            # Brightness is applied by the color correction, so the library never scales
+            self.strip = neopixel.NeoPixel(getattr(board, self.pin), self.n, brightness=1.0,
+                                           auto_write=False, pixel_order=getattr(neopixel, self.pixel_order))
+        except Exception as e:
+            self.error = str(e)
+            logger.error("Could not open the NeoPixel strip", extra={"fields": {"pin": self.pin, "error": self.error}})
+
+    def output(self, buffer):
+        if self.strip is None:
+            self.open()
+            if self.strip is None:
+                return
+        view = memoryview(buffer)
+        self.strip[0:self.n] = list(zip(view[0::3], view[1::3], view[2::3]))
+        self.strip.show()
+
+    def close(self):
+        if self.strip is not None:
+            self.strip.deinit()
+
+class MemoryBackend(PixelBackend):
+    """
+    In-memory framebuffer that records every shown frame with a timestamp.
+
+    Args:
+        max_frames (int): Number of most recent frames to keep.
+    """
+
+    def __init__(self, led_count, brightness=1.0, max_frames=1000):
+        super().__init__(led_count, brightness)
+        self.frames = collections.deque(maxlen=max_frames)
+        self.frames_recorded = 0
+        self.frame_ready = threading.Condition()
+
+    def output(self, buffer):
+        with self.frame_ready:
+            self.frames.append((time.perf_counter(), bytes(buffer)))
+            self.frames_recorded += 1
+            self.frame_ready.notify_all()
+
+    def wait_for_frame(self, count, timeout=None):
+        """Block until at least count frames have been recorded."""
+        with self.frame_ready:
+            return self.frame_ready.wait_for(lambda: self.frames_recorded >= count, timeout)
+
+class Canvas(PixelBackend):
+    """Offscreen framebuffer that effects render into; show() does nothing."""
+
+    def show(self, force=False):
+        return False
+
+class NullBackend(PixelBackend):
+    """Discards every frame. Useful to measure pure render cost."""
+
+    def output(self, buffer):
+        pass
+
+BACKENDS = {
+    'neopixel': NeoPixelBackend,
+    'memory': MemoryBackend,
+    'null': NullBackend,
+}
+
+def create_backend(name, led_count, **options):
+    """Create the pixel backend registered under name."""
+    try:
+        backend_class = BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown pixel backend: {name}. Choose from {', '.join(BACKENDS)}.")
+    return backend_class(led_count, **options)
@@ -0,0 +1,63 @@
+# benchmarks/bench_api_latency.py
+
+"""
+End-to-end latency from an API call to the first frame it produces.
+
+Runs server.py's Flask app through its test client with the in-memory
+pixel backend, so no Raspberry Pi is needed. Iterations alternate
+between two colors, because a frame identical to the one on the strip
+is skipped and would never be recorded.
+
+Usage: python benchmarks/bench_api_latency.py [iterations]
+"""
+
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('LED_BACKEND', 'memory')
+
+import controller
+import server
+
+COLORS = [[255, 0, 0], [0, 0, 255]]
+
+# Payloads for iteration n
+REQUESTS = [
+    ('/color_fill', lambda n: {"color": COLORS[n % 2]}),
+    ('/rainbow_cycle', lambda n: {"colors": [COLORS[n % 2], COLORS[(n + 1) % 2]], "wait": 0.02}),
+    ('/breathing_effect', lambda n: {"color": COLORS[n % 2], "steps": 20, "wait": 0.02}),
+    ('/theater_chase', lambda n: {"color": COLORS[n % 2], "alternate_color": [0, 64, 0], "wait": 0.02}),
+    ('/sparkle_effect', lambda n: {"color": COLORS[n % 2], "alternate_color": [0, 64, 0], "wait": 0.02}),
+]
+
+def bench(iterations):
+    client = server.app.test_client()
+    pixels = controller.pixels
+    try:
+        for route, payload in REQUESTS:
+            latencies = []
+            missed = 0
+            for n in range(iterations):
+                expected = pixels.frames_recorded + 1
+                start = time.perf_counter()
+                client.post(route, json=payload(n))
+                if not pixels.wait_for_frame(expected, timeout=5):
+                    missed += 1
+                    continue
+                latencies.append(pixels.frames[-1][0] - start)
+            if missed:
+                print(f"{route}: {missed} of {iterations} requests showed no frame within 5 s")
+            if latencies:
+                latencies.sort()
+                print(f"{route:20s} median {statistics.median(latencies) * 1e3:8.3f} ms  "
+                      f"p99 {latencies[int(len(latencies) * 0.99)] * 1e3:8.3f} ms")
+    finally:
+        controller.stop_current_effect()
+
+if __name__ == '__main__':
+    if controller.BACKEND != 'memory':
+        sys.exit("LED_BACKEND must be 'memory' for this benchmark.")
+    bench(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
@@ -0,0 +1,97 @@
+# benchmarks/bench_audio.py
+
+"""
+Latency benchmark for the audio-reactive effects.
+
+Streams a synthetic tone sweep into an AudioAnalyzer through a pipe at
+real-time pace and renders audio_spectrum at 60 fps on a null backend.
+Reports the cost of analyzing one chunk and of rendering one frame, and
+the time from a chunk being written to the pipe to the first frame
+showing its analysis.
+
+Usage: python benchmarks/bench_audio.py [led_count] [seconds]
+"""
+
+import os
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('LED_BACKEND', 'null')
+
+import numpy as np
+
+import backends
+from plugins import audio
+from scheduler import FrameScheduler
+
+FPS = 60
+RATE = 44100
+
+def tone_chunks(seconds):
+    """16-bit chunks of a sine sweep from 50 Hz to 10 kHz."""
+    t = np.arange(int(seconds * RATE)) / RATE
+    frequency = 50 * (200 ** (t / seconds))
+    phase = 2 * np.pi * np.cumsum(frequency) / RATE
+    pcm = (np.sin(phase) * 12000).astype('<i2').tobytes()
+    step = audio.HOP * 2
+    return [pcm[i:i + step] for i in range(0, len(pcm) - step + 1, step)]
+
+def bench(led_count, seconds):
+    chunks = tone_chunks(seconds)
+
+    offline = audio.AudioAnalyzer(None, RATE)
+    start = time.perf_counter()
+    for chunk in chunks:
+        offline.feed(chunk)
+    analysis = (time.perf_counter() - start) / len(chunks)
+
+    read_fd, write_fd = os.pipe()
+    audio.analyzer = audio.AudioAnalyzer(os.fdopen(read_fd, 'rb', buffering=0), RATE).start()
+    render, _ = audio.audio_spectrum(1 / FPS, led_count=led_count)
+    canvas = backends.Canvas(led_count)
+    output = backends.NullBackend(led_count)
+    written = {}
+
+    def writer():
+        begin = time.monotonic()
+        with os.fdopen(write_fd, 'wb', buffering=0) as pipe:
+            for index, chunk in enumerate(chunks):
+                delay = begin + index * audio.HOP / RATE - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                written[index + 1] = time.perf_counter()
+                pipe.write(chunk)
+    thread = threading.Thread(target=writer)
+    thread.start()
+
+    latencies = []
+    render_times = []
+    stop = threading.Event()
+
+    def frame(number):
+        sequence = audio.analyzer.sequence
+        start = time.perf_counter()
+        if render(number, canvas) is not False:
+            output.write(canvas.buffer)
+            output.show()
+            shown = time.perf_counter()
+            render_times.append(shown - start)
+            if sequence in written:
+                latencies.append(shown - written[sequence])
+        if not thread.is_alive():
+            stop.set()
+    FrameScheduler(FPS).run(frame, stop)
+
+    latencies.sort()
+    print(f"{led_count} LEDs, {audio.HOP}-sample chunks ({audio.HOP / RATE * 1e3:.1f} ms), "
+          f"{audio.WINDOW}-sample window ({audio.WINDOW / RATE * 1e3:.1f} ms), {FPS} fps")
+    print(f"  analysis {analysis * 1e6:6.1f} us/chunk  render+show {statistics.mean(render_times) * 1e6:6.1f} us/frame")
+    print(f"  chunk written -> frame shown: median {statistics.median(latencies) * 1e3:5.2f} ms  "
+          f"p99 {latencies[int(len(latencies) * 0.99)] * 1e3:5.2f} ms  max {latencies[-1] * 1e3:5.2f} ms "
+          f"(frame budget {1e3 / FPS:.2f} ms, {len(latencies)} frames)")
+
+if __name__ == '__main__':
+    bench(int(sys.argv[1]) if len(sys.argv) > 1 else 1000, float(sys.argv[2]) if len(sys.argv) > 2 else 5.0)
@@ -0,0 +1,64 @@
+# benchmarks/bench_batch.py
+
+"""
+Load benchmark for the /batch endpoint.
+
+Sends the same dashboard update (a brightness change, an effect and a
+number of /write keys) as one request per action and as a single /batch
+request through the Flask test client, and compares the time per update.
+
+Usage: python benchmarks/bench_batch.py [iterations] [keys]
+"""
+
+import contextlib
+import io
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('LED_BACKEND', 'null')
+os.environ.setdefault('LED_DB_PATH', os.path.join(tempfile.mkdtemp(), 'state.journal'))
+
+import controller
+import server
+
+EFFECT = ('rainbow_cycle', {"colors": [[255, 0, 0], [0, 0, 255]], "wait": 0.02})
+
+def single_calls(client, keys):
+    client.post('/set_brightness', json={"brightness": 0.5})
+    client.post(f'/{EFFECT[0]}', json=EFFECT[1])
+    for i in range(keys):
+        client.post('/write', json={"key": f"key{i}", "value": i})
+
+def one_batch(client, keys):
+    operations = [
+        {"op": "brightness", "brightness": 0.5},
+        {"op": "effect", "effect": EFFECT[0], "params": EFFECT[1]},
+    ]
+    operations += [{"op": "write", "key": f"key{i}", "value": i} for i in range(keys)]
+    client.post('/batch', json={"operations": operations})
+
+def bench(iterations, keys):
+    client = server.app.test_client()
+    worker = controller.get_worker()
+    for label, update in (("single calls", single_calls), ("one batch", one_batch)):
+        times = []
+        with contextlib.redirect_stdout(io.StringIO()):
+            for _ in range(iterations):
+                start = time.perf_counter()
+                update(client, keys)
+                # Include the time for the controller to apply the changes
+                worker.flush()
+                times.append(time.perf_counter() - start)
+        print(f"{label:12s} ({keys + 2:3d} actions)  median {statistics.median(times) * 1e3:8.3f} ms  "
+              f"max {max(times) * 1e3:8.3f} ms")
+    with contextlib.redirect_stdout(io.StringIO()):
+        controller.stop_current_effect()
+        worker.flush()
+
+if __name__ == '__main__':
+    bench(int(sys.argv[1]) if len(sys.argv) > 1 else 50,
+          int(sys.argv[2]) if len(sys.argv) > 2 else 10)
@@ -0,0 +1,53 @@
+# benchmarks/bench_color_correction.py
+
+"""
+Per-frame cost of brightness scaling on the output path.
+
+Compares the per-byte float scaling the neopixel library does on every
+show() when its brightness is below 1.0 with the lookup-table color
+correction (brightness, gamma and white balance) applied in one pass.
+
+Usage: python benchmarks/bench_color_correction.py [led_count ...]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import backends
+
+FRAMES = 500
+BRIGHTNESS = 0.2
+
+def float_scaling(buffer):
+    """Brightness scaling as done per byte by the neopixel library's pixel buffer."""
+    return bytearray(int(value * BRIGHTNESS) for value in buffer)
+
+def bench(led_count):
+    frame = bytearray(os.urandom(led_count * 3))
+
+    start = time.perf_counter()
+    for _ in range(FRAMES):
+        float_scaling(frame)
+    scaled = (time.perf_counter() - start) / FRAMES
+
+    correction = backends.ColorCorrection(BRIGHTNESS, gamma=2.2, white_balance=(1.0, 0.9, 0.8))
+    start = time.perf_counter()
+    for _ in range(FRAMES):
+        correction.apply(frame)
+    lut = (time.perf_counter() - start) / FRAMES
+
+    start = time.perf_counter()
+    for n in range(FRAMES):
+        correction.update(brightness=n / FRAMES)
+    rebuild = (time.perf_counter() - start) / FRAMES
+
+    print(f"{led_count:5d} LEDs  float scaling {scaled * 1e6:8.1f} us/frame  "
+          f"LUT {lut * 1e6:6.1f} us/frame  speedup {scaled / lut:6.1f}x  "
+          f"LUT rebuild {rebuild * 1e6:6.1f} us")
+
+if __name__ == '__main__':
+    for count in [int(a) for a in sys.argv[1:]] or [144, 600, 2000]:
+        bench(count)
@@ -0,0 +1,61 @@
+# benchmarks/bench_db.py
+
+"""
+Throughput and startup benchmark for the journal-backed state store.
+
+Measures update_database() calls per second from several threads (the
+callers never wait for disk), the time to flush the resulting batch, and
+the time to replay a journal of the given size on startup.
+
+Usage: python benchmarks/bench_db.py [records]
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+
+THREADS = 8
+KEYS = 100
+
+def bench(records):
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'state.journal')
+        store = db.JournalStore(path, flush_interval=3600)
+        per_thread = records // THREADS
+
+        def writer(offset):
+            for i in range(per_thread):
+                store.set(f"key{(offset + i) % KEYS}", {"color": [i % 256, 0, 0], "wait": 0.05})
+
+        threads = [threading.Thread(target=writer, args=(n,)) for n in range(THREADS)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        write_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        store.close()
+        flush_time = time.perf_counter() - start
+
+        # Build a journal with one record per write to time a worst-case replay
+        with open(path, 'w', encoding='utf-8') as journal:
+            for i in range(records):
+                journal.write(f'{{"k": "key{i % KEYS}", "v": {{"color": [{i % 256}, 0, 0]}}}}\n')
+        start = time.perf_counter()
+        replayed = db.JournalStore(path)
+        replay_time = time.perf_counter() - start
+        replayed.close()
+
+    print(f"{records} writes from {THREADS} threads  {records / write_time:10.0f} ops/s  "
+          f"flush {flush_time * 1e3:7.2f} ms  replay of {records} records {replay_time * 1e3:7.2f} ms")
+
+if __name__ == '__main__':
+    bench(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
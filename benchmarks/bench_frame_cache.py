@@ -0,0 +1,64 @@
+# benchmarks/bench_frame_cache.py
+
+"""
+Benchmark for compiled effect timelines.
+
+Compares rendering breathing_effect live every frame with replaying its
+compiled timeline, and the setup cost of starting an effect on a cache
+miss (compiling) against a hit (restarting the same effect).
+
+Usage: python benchmarks/bench_frame_cache.py [led_count ...]
+"""
+
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('LED_BACKEND', 'null')
+
+import backends
+import controller
+
+FRAMES = 1000
+COLOR = (255, 128, 0)
+STEPS = 50
+
+def live_breathing(frame, canvas):
+    """The per-frame breathing renderer used before timelines were compiled."""
+    step_val = frame % (2 * STEPS)
+    if step_val > STEPS:
+        step_val = 2 * STEPS - step_val
+    brightness = step_val / STEPS
+    canvas.fill(tuple(int(c * brightness) for c in COLOR))
+
+def timed(function, repeat):
+    start = time.perf_counter()
+    for n in range(repeat):
+        function(n)
+    return (time.perf_counter() - start) / repeat
+
+def bench(led_count):
+    canvas = backends.Canvas(led_count)
+    live = timed(lambda frame: live_breathing(frame, canvas), FRAMES)
+
+    controller.frame_cache.clear()
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        render, _ = controller.breathing_effect(COLOR, STEPS, led_count=led_count)
+        miss = time.perf_counter() - start
+        start = time.perf_counter()
+        controller.breathing_effect(COLOR, STEPS, led_count=led_count)
+        hit = time.perf_counter() - start
+    cached = timed(lambda frame: render(frame, canvas), FRAMES)
+
+    stats = controller.get_frame_cache_stats()
+    print(f"{led_count:5d} LEDs  live {live * 1e6:7.2f} us/frame  cached {cached * 1e6:7.2f} us/frame  "
+          f"setup miss {miss * 1e3:7.3f} ms  hit {hit * 1e6:6.1f} us  "
+          f"cache {stats['bytes'] / 1024:7.1f} KiB")
+
+if __name__ == '__main__':
+    for count in [int(a) for a in sys.argv[1:]] or [144, 600, 2000]:
+        bench(count)
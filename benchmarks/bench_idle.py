@@ -0,0 +1,62 @@
+# benchmarks/bench_idle.py
+
+"""
+CPU cost of scenes whose frames stop changing.
+
+Runs each scene on the render worker for a few seconds, once with the
+idle tick and once at the effect's full frame rate (IDLE_FPS = 0), and
+reports the process CPU time per second of wall time, the frames sent
+to the strip and the frames skipped because they matched the last one
+sent. The scenes: a static color fill, a theater chase in one color (a
+timeline whose frames are all identical), a stopped wheel sweep (redrawn
+every frame, caught by the output diff), a breathing effect and a
+rainbow (always changing, for reference).
+
+Usage: python benchmarks/bench_idle.py [seconds]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('LED_BACKEND', 'null')
+
+import controller
+
+RED = (255, 0, 0)
+SCENES = [
+    ('color_fill', controller.color_fill, (RED,)),
+    ('theater_chase, one color', controller.theater_chase, (RED, RED, 0.01)),
+    ('wheel_sweep, speed 0', controller.wheel_sweep, (0.0, 1.0, 0.0, 0.01)),
+    ('breathing_effect', controller.breathing_effect, (RED, 50, 0.01)),
+    ('rainbow_cycle', controller.rainbow_cycle, ([RED, (0, 0, 255)], 0.01, 100)),
+]
+
+def run(effect, args, seconds):
+    """Run an effect for `seconds`; returns CPU seconds per second, frames sent and frames skipped."""
+    output = controller.pixels
+    controller.stop_current_effect()
+    controller.start_effect(effect, *args)
+    controller.get_worker().flush()
+    sent, skipped = output.frames_shown, output.frames_skipped
+    start_cpu, start = time.process_time(), time.perf_counter()
+    time.sleep(seconds)
+    cpu = (time.process_time() - start_cpu) / (time.perf_counter() - start)
+    return cpu, output.frames_shown - sent, output.frames_skipped - skipped
+
+def bench(seconds):
+    controller.set_transition_time(0)
+    idle_fps = controller.IDLE_FPS
+    print(f"{seconds:.0f} s per scene    {'idle tick: cpu':>18s} {'sent':>6s} {'skipped':>7s}   "
+          f"{'full rate: cpu':>14s} {'sent':>6s} {'skipped':>7s}")
+    for name, effect, args in SCENES:
+        results = []
+        for controller.IDLE_FPS in (idle_fps, 0):
+            cpu, sent, skipped = run(effect, args, seconds)
+            results.append(f"{cpu * 100:13.2f} % {sent:6d} {skipped:7d}")
+        print(f"{name:26s} {results[0]}   {results[1]}")
+    controller.IDLE_FPS = idle_fps
+
+if __name__ == '__main__':
+    bench(float(sys.argv[1]) if len(sys.argv) > 1 else 5.0)
@@ -0,0 +1,76 @@
+# benchmarks/bench_pixelmap.py
+
+"""
+Per-frame cost of coordinate-based effects on growing pixel maps.
+
+Loads serpentine matrix maps from JSON and CSV files, then renders the
+mapped effects (rainbow_cycle along a diagonal, wheel_sweep and plasma)
+frame by frame. The cost per pixel should stay flat as maps grow. The
+linear rainbow_cycle, replayed from its precompiled timeline, is shown
+for reference.
+
+Usage: python benchmarks/bench_pixelmap.py [frames]
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('LED_BACKEND', 'null')
+
+import backends
+import controller
+import pixelmap
+
+SIZES = [(12, 12), (32, 32), (64, 64), (128, 128)]
+COLORS = [(255, 0, 0), (0, 255, 0), (0, 0, 255)]
+
+def write_maps(pixel_map, directory):
+    """Write a map as JSON and as index,x,y CSV; returns both paths."""
+    json_path = os.path.join(directory, 'map.json')
+    csv_path = os.path.join(directory, 'map.csv')
+    with open(json_path, 'w') as f:
+        json.dump(pixel_map.points.tolist(), f)
+    with open(csv_path, 'w') as f:
+        f.write("index,x,y\n")
+        f.writelines(f"{n},{x:g},{y:g}\n" for n, (x, y) in enumerate(pixel_map.points))
+    return json_path, csv_path
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - start
+
+def run(render, count, frames):
+    canvas = backends.Canvas(count)
+    start = time.perf_counter()
+    for frame in range(frames):
+        render(frame, canvas)
+    return (time.perf_counter() - start) / frames
+
+def bench(frames):
+    directory = tempfile.mkdtemp()
+    print(f"{'map':>9s} {'pixels':>6s}  {'load json':>9s} {'load csv':>9s}  "
+          f"{'linear':>15s} {'rainbow 30deg':>15s} {'wheel_sweep':>15s} {'plasma':>15s}   (us/frame, ns/pixel)")
+    for width, height in SIZES:
+        count = width * height
+        json_path, csv_path = write_maps(pixelmap.grid(width, height), directory)
+        pixel_map, load_json = timed(lambda: pixelmap.load(json_path))
+        _, load_csv = timed(lambda: pixelmap.load(csv_path))
+        setups = [
+            controller.rainbow_cycle(COLORS, 0.05, 20, led_count=count),
+            controller.rainbow_cycle(COLORS, 0.05, 20, 30.0, led_count=count, pixel_map=pixel_map),
+            controller.wheel_sweep(45.0, led_count=count, pixel_map=pixel_map),
+            controller.plasma(led_count=count, pixel_map=pixel_map),
+        ]
+        results = []
+        for render, _ in setups:
+            seconds = run(render, count, frames)
+            results.append(f"{seconds * 1e6:8.1f} {seconds / count * 1e9:6.1f}")
+        print(f"{width:4d}x{height:<4d} {count:6d}  {load_json * 1e3:7.1f}ms {load_csv * 1e3:7.1f}ms  " + " ".join(results))
+
+if __name__ == '__main__':
+    bench(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
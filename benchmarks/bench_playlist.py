@@ -0,0 +1,97 @@
+# benchmarks/bench_playlist.py
+
+"""
+Cost of scheduled scene changes on the timer queue.
+
+Drives a PlaylistScheduler with a simulated clock: schedules thousands
+of daily entries and playlists, then measures the per-frame cost of
+checking the queue when nothing is due, the cost of firing an entry,
+and the error between each entry's due time and the frame it landed on.
+Also times one preset change made the way an external cron job does it,
+through an HTTP request to /presets/apply.
+
+Usage: python benchmarks/bench_playlist.py [entries]
+"""
+
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('LED_BACKEND', 'null')
+os.environ.setdefault('LED_DB_PATH', os.path.join(tempfile.mkdtemp(), 'bench.journal'))
+
+from playlist import PlaylistScheduler
+
+FPS = 60
+SIMULATED_SECONDS = 600
+
+class SimulatedClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+def bench(entries):
+    clock = SimulatedClock()
+    scheduler = PlaylistScheduler(clock=clock, wall_clock=lambda: 1_700_000_000.0 + clock.now)
+    fired = []
+
+    start = time.perf_counter()
+    for n in range(entries):
+        scheduler.add_daily(f"daily-{n}", (n * 7) % 86400, lambda: None)
+    for n in range(entries // 10):
+        playlist = [(lambda n=n: fired.append((n, clock.now)), 0.5 + (n % 7) * 0.13) for _ in range(4)]
+        scheduler.play(f"playlist-{n}", playlist)
+    schedule = (time.perf_counter() - start) / (entries + entries // 10)
+
+    # Check the queue on every frame boundary, like the render worker
+    frames = SIMULATED_SECONDS * FPS
+    fired_total = 0
+    start = time.perf_counter()
+    for frame in range(frames):
+        clock.now = 1000.0 + frame / FPS
+        fired_total += scheduler.run_due(clock.now)
+    elapsed = time.perf_counter() - start
+
+    # Compare each playlist step with its exact due time: starts at 1000.0, then chained durations
+    errors = []
+    steps = {}
+    for n, at in fired:
+        due = 1000.0 + steps.get(n, 0) * (0.5 + (n % 7) * 0.13)
+        steps[n] = steps.get(n, 0) + 1
+        errors.append(at - due)
+
+    print(f"{entries} daily entries + {entries // 10} playlists: schedule {schedule * 1e6:6.2f} us each, "
+          f"{len(scheduler.timers)} pending timers")
+    print(f"{frames} frames: {elapsed / frames * 1e6:6.2f} us/frame average, {fired_total} timers fired; "
+          f"playlist steps landed {min(errors) * 1e3:5.2f}-{max(errors) * 1e3:5.2f} ms after their due time "
+          f"(frame period {1e3 / FPS:.2f} ms)")
+
+    idle = PlaylistScheduler(clock=clock)
+    for n in range(entries):
+        idle.add_daily(f"daily-{n}", 0, lambda: None)
+    repeat = 100000
+    start = time.perf_counter()
+    for _ in range(repeat):
+        idle.run_due(clock.now)
+    print(f"per-frame check with nothing due: {(time.perf_counter() - start) / repeat * 1e9:6.0f} ns")
+
+    import server
+    client = server.app.test_client()
+    with contextlib.redirect_stderr(io.StringIO()):
+        client.post('/presets', json={"name": "bench", "effects": [
+            {"effect": "color_fill", "params": {"color": [255, 0, 0]}}]})
+        repeat = 200
+        start = time.perf_counter()
+        for _ in range(repeat):
+            client.post('/presets/apply', json={"name": "bench"})
+        http = (time.perf_counter() - start) / repeat
+    print(f"one preset change through HTTP /presets/apply (in-process client): {http * 1e6:7.1f} us")
+
+if __name__ == '__main__':
+    bench(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
@@ -0,0 +1,61 @@
+# benchmarks/bench_rainbow.py
+
+"""
+Frame-time benchmark for rainbow_cycle.
+
+Compares the original per-pixel renderer with the precomputed gradient
+table, both writing through the neopixel backend to the fake strip.
+
+Usage: python benchmarks/bench_rainbow.py [led_count ...]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fake_hardware  # noqa: F401  (registers fake board/neopixel)
+import backends
+import controller
+
+COLORS = [(255, 0, 0), (0, 255, 0), (0, 0, 255)]
+STEPS = 20
+FRAMES = 200
+
+def legacy_frame(pixels, led_count, step):
+    """The per-pixel renderer rainbow_cycle used before the lookup table."""
+    total_steps = len(COLORS) * STEPS
+    for i in range(led_count):
+        pos = (i + step) % total_steps
+        transition_index = pos // STEPS
+        color1 = COLORS[transition_index % len(COLORS)]
+        color2 = COLORS[(transition_index + 1) % len(COLORS)]
+        factor = (pos % STEPS) / STEPS
+        pixels[i] = controller.interpolate(color1, color2, factor)
+    pixels.show()
+
+def bench(led_count):
+    controller.LED_COUNT = led_count
+    controller.pixels = backends.NeoPixelBackend(led_count)
+    total_steps = len(COLORS) * STEPS
+
+    start = time.perf_counter()
+    for step in range(FRAMES):
+        legacy_frame(controller.pixels, led_count, step % total_steps)
+    legacy = (time.perf_counter() - start) / FRAMES
+
+    start = time.perf_counter()
+    table = memoryview(controller.build_gradient_table(COLORS, STEPS, total_steps + led_count))
+    for step in range(FRAMES):
+        step %= total_steps
+        controller.pixels.write(table[step * 3:(step + led_count) * 3])
+        controller.pixels.show()
+    table_time = (time.perf_counter() - start) / FRAMES
+
+    print(f"{led_count:5d} LEDs  legacy {legacy * 1e3:7.3f} ms/frame  "
+          f"table {table_time * 1e3:7.3f} ms/frame  speedup {legacy / table_time:5.1f}x")
+
+if __name__ == '__main__':
+    for count in [int(a) for a in sys.argv[1:]] or [144, 600, 1000]:
+        bench(count)
@@ -0,0 +1,77 @@
+# benchmarks/bench_recording.py
+
+"""
+Offline rendering and replay throughput.
+
+Renders a heavy mapped effect (plasma on a 64x64 matrix) to a recording
+and compares the per-frame cost of rendering it live with the cost of
+reading the recorded frame: a zero-copy mmap view, and for reference a
+seek and read() per frame. Then replays the recording at its recorded
+rate (5 s by default) and reports how far each frame landed from its
+timestamp.
+
+Usage: python benchmarks/bench_recording.py [frames]
+"""
+
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('LED_BACKEND', 'null')
+
+import backends
+import controller
+import pixelmap
+import recording
+
+def bench(frames):
+    pixel_map = pixelmap.grid(64, 64)
+    count = len(pixel_map)
+    path = os.path.join(tempfile.mkdtemp(), 'plasma.ledrec')
+
+    start = time.perf_counter()
+    recording.render('plasma', frames, path, {}, pixel_map=pixel_map)
+    write = (time.perf_counter() - start) / frames
+    print(f"plasma, {count} pixels, {frames} frames: render to file {write * 1e6:7.1f} us/frame, "
+          f"{os.path.getsize(path) / 1e6:.1f} MB")
+
+    draw, fps = controller.plasma(pixel_map=pixel_map, led_count=count)
+    canvas = backends.Canvas(count)
+    framebuffer = backends.Canvas(count)
+    start = time.perf_counter()
+    for frame in range(frames):
+        draw(frame, canvas)
+        framebuffer.write(canvas.buffer)
+    live = (time.perf_counter() - start) / frames
+
+    with recording.Recording(path) as recorded:
+        start = time.perf_counter()
+        for frame in range(frames):
+            framebuffer.write(recorded.frame(frame))
+        mapped = (time.perf_counter() - start) / frames
+        with open(path, 'rb') as f:
+            start = time.perf_counter()
+            for frame in range(frames):
+                f.seek(recording.HEADER_SIZE + frame * recorded.record_size + recording.TIMESTAMP.size)
+                framebuffer.write(f.read(recorded.frame_size))
+            read = (time.perf_counter() - start) / frames
+        print(f"per frame into the framebuffer: live render {live * 1e6:7.1f} us, "
+              f"mmap replay {mapped * 1e6:6.1f} us, read() replay {read * 1e6:6.1f} us")
+
+        errors = []
+
+        def show(frame, n):
+            errors.append(time.monotonic() - start - recorded.timestamps[n])
+            framebuffer.write(frame)
+
+        start = time.monotonic()
+        shown, skipped = recording.replay(recorded, show)
+    errors = sorted(abs(error) for error in errors)
+    print(f"replay at {fps:.0f} frames/s: {shown} shown, {skipped} skipped, timing error "
+          f"median {statistics.median(errors) * 1e3:.3f} ms, max {errors[-1] * 1e3:.3f} ms")
+
+if __name__ == '__main__':
+    bench(int(sys.argv[1]) if len(sys.argv) > 1 else 300)
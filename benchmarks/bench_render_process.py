@@ -0,0 +1,101 @@
+# benchmarks/bench_render_process.py
+
+"""
+Frame timing under HTTP load, rendering on the render thread versus in
+a render process.
+
+Runs plasma on a 128x128 matrix at 60 frames/s, first idle and then
+while client threads hammer the API of a threaded server in the same
+process. Frame timing is the interval between frames reaching the strip
+(a null backend). The report gives the median and p99 error of the
+interval against the frame period, the frame slots dropped, and the
+requests served per second. Everything runs once with the effect on the
+render thread and once with LED_RENDER_PROCESSES=1. The gap only shows
+with a spare core for the render process.
+
+Usage: python benchmarks/bench_render_process.py [seconds]
+"""
+
+import http.client
+import logging
+import os
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('LED_BACKEND', 'null')
+
+import controller
+import pixelmap
+import renderproc
+import server
+
+SIZE = 128
+FPS = 60
+CLIENTS = 8
+ROUTE = '/effects'
+
+def measure(seconds, load, port):
+    """Run for `seconds`; returns frame interval errors (s), dropped frame slots and requests/s."""
+    shown = []
+    stop = threading.Event()
+    served = [0] * CLIENTS
+
+    def client(n):
+        connection = http.client.HTTPConnection('127.0.0.1', port)
+        while not stop.is_set():
+            connection.request('GET', ROUTE)
+            connection.getresponse().read()
+            served[n] += 1
+        connection.close()
+
+    def on_frame(strip, buffer):
+        shown.append(time.perf_counter())
+
+    clients = [threading.Thread(target=client, args=(n,), daemon=True) for n in range(CLIENTS if load else 0)]
+    for thread in clients:
+        thread.start()
+    time.sleep(0.5)  # Let the load settle
+    dropped = (controller.get_frame_stats() or {}).get('frames_dropped', 0)
+    controller.frame_listeners.append(on_frame)
+    time.sleep(seconds)
+    controller.frame_listeners.remove(on_frame)
+    dropped = (controller.get_frame_stats() or {}).get('frames_dropped', 0) - dropped
+    stop.set()
+    for thread in clients:
+        thread.join()
+    errors = sorted(abs(b - a - 1 / FPS) for a, b in zip(shown, shown[1:]))
+    return errors, dropped, sum(served) / (seconds + 0.5)
+
+def bench(seconds):
+    from werkzeug.serving import make_server
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    count = SIZE * SIZE
+    controller.LED_COUNT = count
+    controller.pixels = controller.strips[controller.DEFAULT_STRIP] = controller.create_backend('null', count)
+    controller.define_segment(controller.DEFAULT_SEGMENT, 0, count, pixel_map=pixelmap.grid(SIZE, SIZE))
+    controller.set_transition_time(0)
+    http_server = make_server('127.0.0.1', 0, server.app, threaded=True)
+    threading.Thread(target=http_server.serve_forever, name='bench-http', daemon=True).start()
+
+    print(f"plasma {SIZE}x{SIZE} at {FPS} fps, {CLIENTS} clients on GET {ROUTE}, {os.cpu_count()} CPUs")
+    print(f"{'':28s} {'interval error median':>21s} {'p99':>8s} {'dropped':>8s} {'req/s':>8s}")
+    for controller.RENDER_PROCESSES in (0, 1):
+        controller.start_effect(controller.plasma, 6.0, 1.0, 1 / FPS)
+        controller.get_worker().flush()
+        where = 'render process' if controller.RENDER_PROCESSES else 'render thread'
+        for load in (False, True):
+            errors, dropped, rate = measure(seconds, load, http_server.server_port)
+            label = f"{where}, {'HTTP load' if load else 'idle'}"
+            print(f"{label:28s} {statistics.median(errors) * 1e3:18.3f} ms {errors[int(len(errors) * 0.99)] * 1e3:5.2f} ms "
+                  f"{dropped:8d} {rate:8.0f}")
+        controller.stop_current_effect()
+        controller.get_worker().flush()
+    http_server.shutdown()
+    if renderproc.pool is not None:
+        print(f"late frames from the render process: {renderproc.LATE_FRAMES.value:.0f}")
+
+if __name__ == '__main__':
+    bench(float(sys.argv[1]) if len(sys.argv) > 1 else 5.0)
@@ -0,0 +1,54 @@
+# benchmarks/bench_segments.py
+
+"""
+Frame-time benchmark for segmented strips.
+
+Splits a simulated strip into N segments, each running rainbow_cycle,
+and measures the cost of one composed frame (all segments plus one show()
+per strip) on the render thread and on a four-thread segment pool.
+
+Usage: python benchmarks/bench_segments.py [led_count]
+"""
+
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('LED_BACKEND', 'null')
+
+import controller
+
+FRAMES = 500
+COLORS = [(255, 0, 0), (0, 255, 0), (0, 0, 255)]
+
+def bench(led_count, segment_count, pool_size):
+    controller.LED_COUNT = led_count
+    controller.pixels = controller.strips[controller.DEFAULT_STRIP] = controller.create_backend('null', led_count)
+    controller.segments = {}
+    controller.SEGMENT_POOL_SIZE = pool_size
+    controller.SEGMENT_POOL_THRESHOLD = 1
+    worker = controller.get_worker()
+    length = led_count // segment_count
+    with contextlib.redirect_stdout(io.StringIO()):
+        for i in range(segment_count):
+            segment = controller.define_segment(f"s{i}", i * length, length, reverse=i % 2 == 1)
+            render, fps = controller.rainbow_cycle(COLORS, 0.001, led_count=segment.render_length)
+            segment.compositor.set_layer(controller.Layer('rainbow_cycle', render, fps, segment.render_length))
+
+    start = time.perf_counter()
+    for frame in range(FRAMES):
+        worker._render_frame(frame / 1000)
+    return (time.perf_counter() - start) / FRAMES
+
+if __name__ == '__main__':
+    led_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    # Keep the worker idle so it does not render alongside the benchmark
+    controller.get_worker()
+    for segment_count in (1, 4, 16, 64):
+        serial = bench(led_count, segment_count, pool_size=0)
+        pooled = bench(led_count, segment_count, pool_size=4)
+        print(f"{led_count:5d} LEDs {segment_count:3d} segments  serial {serial * 1e3:7.3f} ms/frame  "
+              f"pool {pooled * 1e3:7.3f} ms/frame")
@@ -0,0 +1,81 @@
+# benchmarks/bench_sparkle.py
+
+"""
+Benchmark for the sparkle particle system.
+
+Compares the previous sparkle_effect, which animated one sparkle at a
+time (one show() per fade step of a single pixel), with the vectorized
+particle version for a growing number of simultaneous sparkles. Each
+frame is rendered and shown on a null backend with color correction on.
+
+Usage: python benchmarks/bench_sparkle.py [led_count]
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('LED_BACKEND', 'null')
+
+import backends
+import controller
+
+FRAMES = 2000
+FPS = 200  # Tick rate of the default sparkle (wait 0.05 over 10 fade steps)
+COLOR = (255, 255, 255)
+ALTERNATE_COLOR = (0, 0, 40)
+FADE_STEPS = 10
+
+def single_sparkle(color, alternate_color, count, fade_steps, led_count):
+    """The previous renderer: one sparkle on screen, faded over fade_steps ticks."""
+    ticks_per_sparkle = 2 * fade_steps
+    ticks_per_cycle = max(1, count) * ticks_per_sparkle
+    state = {"cycle": None, "sparkle": None, "pixel": None, "color": None}
+
+    def render(frame, canvas):
+        cycle, tick = divmod(frame, ticks_per_cycle)
+        sparkle, sparkle_tick = divmod(tick, ticks_per_sparkle)
+        if cycle != state["cycle"]:
+            canvas.fill(alternate_color)
+            state.update(cycle=cycle, sparkle=None, pixel=None, color=None)
+        if sparkle != state["sparkle"]:
+            if state["pixel"] is not None:
+                canvas[state["pixel"]] = alternate_color
+            state.update(sparkle=sparkle, pixel=random.randint(0, led_count - 1), color=None)
+        if sparkle_tick < fade_steps:
+            sparkle_color = tuple(color)
+        else:
+            brightness = 1 - ((sparkle_tick - fade_steps) / fade_steps)
+            sparkle_color = tuple(int(c * brightness + a * (1 - brightness)) for c, a in zip(color, alternate_color))
+        if sparkle_color != state["color"]:
+            canvas[state["pixel"]] = sparkle_color
+            state["color"] = sparkle_color
+    return render
+
+def run(render, led_count):
+    canvas = backends.Canvas(led_count)
+    output = backends.NullBackend(led_count)
+    output.correction.update(brightness=0.5, gamma=2.2)
+    start = time.perf_counter()
+    for frame in range(FRAMES):
+        render(frame, canvas)
+        output.write(canvas.buffer)
+        output.show()
+    return (time.perf_counter() - start) / FRAMES
+
+def bench(led_count):
+    old = run(single_sparkle(COLOR, ALTERNATE_COLOR, 20, FADE_STEPS, led_count), led_count)
+    lifetime_ticks = 2 * FADE_STEPS
+    print(f"{led_count} LEDs, {FPS} frames/s budget {1e6 / FPS:.0f} us/frame")
+    print(f"  one sparkle at a time: {old * 1e6:7.1f} us/frame, "
+          f"{FPS / lifetime_ticks:7.1f} sparkles/s, {old * lifetime_ticks * 1e6:7.2f} us per sparkle")
+    for count in (1, 10, 100, 300, 1000):
+        render, _ = controller.sparkle_effect(COLOR, ALTERNATE_COLOR, count, 0.05, FADE_STEPS, led_count=led_count)
+        new = run(render, led_count)
+        print(f"  {count:4d} particles:         {new * 1e6:7.1f} us/frame, "
+              f"{count * FPS / lifetime_ticks:7.1f} sparkles/s, {new * lifetime_ticks / count * 1e6:7.2f} us per sparkle")
+
+if __name__ == '__main__':
+    bench(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
@@ -0,0 +1,116 @@
+# benchmarks/bench_startup.py
+
+"""
+Cold start: time from a fresh interpreter to the first frame and to ready.
+
+Every measurement runs in a new Python process, with the fake board and
+neopixel modules standing in for the hardware and a saved rainbow as
+the scene to restore. Prints the median of each phase: the bare
+interpreter, importing NumPy, the controller, Flask and the server, and
+then the first frame shown and the server ready to accept requests,
+once through boot.py and once the way `python server.py` starts (import
+the server, then restore the saved state). Times for the last two are
+counted from the first line of the child script, so add the interpreter
+startup for the time since power-on.
+
+Usage: python benchmarks/bench_startup.py [runs]
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault('LED_BACKEND', 'null')
+
+PRELUDE = f"""
+import time
+start = time.perf_counter()
+import json, sys, threading
+sys.path[:0] = [{ROOT!r}, {os.path.join(ROOT, 'benchmarks')!r}]
+import fake_hardware
+"""
+
+def imported(module):
+    return PRELUDE + f"""
+import {module}
+print(json.dumps({{"seconds": time.perf_counter() - start}}))
+"""
+
+def wait_for(condition):
+    return f"""
+deadline = time.monotonic() + 10
+while not ({condition}) and time.monotonic() < deadline:
+    time.sleep(0.0005)
+"""
+
+BOOT = PRELUDE + """
+import boot
+boot.start()
+""" + wait_for("'first_frame' in boot.timings") + """
+print(json.dumps({"first_frame": boot.timings['first_frame'] + boot.START - start,
+                  "ready": boot.timings['ready'] + boot.START - start}))
+"""
+
+SERVER = PRELUDE + """
+shown = []
+import server
+server.controller.add_frame_listener(lambda strip, buffer: shown or shown.append(time.perf_counter() - start))
+server.metrics.configure_logging()
+server.restore_state()
+server.stream.start_receiver()
+server.sync.start_sync()
+ready = time.perf_counter() - start
+""" + wait_for("shown") + """
+print(json.dumps({"first_frame": shown[0], "ready": ready}))
+"""
+
+SCENE = {"k": "active_effect:main",
+         "v": {"effect": "rainbow_cycle",
+               "params": {"segment": "main", "colors": [[255, 0, 0], [0, 0, 255]], "wait": 0.02, "gradient_steps": 50}}}
+
+def run(code, env):
+    """Run code in a fresh interpreter; returns its JSON output and the wall time."""
+    start = time.perf_counter()
+    output = subprocess.run([sys.executable, '-c', code], env=env, capture_output=True, text=True, check=True).stdout
+    wall = time.perf_counter() - start
+    return (json.loads(output.splitlines()[-1]) if output else {}), wall
+
+def median(runs, code, env, field=None):
+    values = []
+    for _ in range(runs):
+        result, wall = run(code, env)
+        values.append(wall if field is None else result[field])
+    return statistics.median(values)
+
+def bench(runs):
+    directory = tempfile.mkdtemp()
+    journal = os.path.join(directory, 'state.journal')
+    env = dict(os.environ, LED_BACKEND='neopixel', LED_DB_PATH=journal)
+    for name in ('LED_PIXEL_MAP', 'LED_STREAM', 'LED_SYNC'):
+        env.pop(name, None)
+
+    def seeded(code):
+        results = []
+        for _ in range(runs):
+            with open(journal, 'w', encoding='utf-8') as f:
+                f.write(json.dumps(SCENE) + '\n')
+            results.append(run(code, env)[0])
+        return {field: statistics.median(result[field] for result in results) for field in results[0]}
+
+    print(f"median of {runs} fresh processes, ms")
+    print(f"  interpreter startup        {median(runs, 'pass', env) * 1e3:7.1f}")
+    for module in ('numpy', 'controller', 'flask', 'server'):
+        print(f"  import {module:<19s} {median(runs, imported(module), env, 'seconds') * 1e3:7.1f}")
+    for name, code in (('boot.py', BOOT), ('server.py', SERVER)):
+        result = seeded(code)
+        print(f"  {name:<10s} first frame     {result['first_frame'] * 1e3:7.1f}")
+        print(f"  {name:<10s} ready           {result['ready'] * 1e3:7.1f}")
+
+if __name__ == '__main__':
+    bench(int(sys.argv[1]) if len(sys.argv) > 1 else 7)
@@ -0,0 +1,80 @@
+# benchmarks/bench_stream.py
+
+"""
+Loopback latency and throughput benchmark for UDP pixel streaming.
+
+Runs a StreamReceiver on 127.0.0.1 with the null pixel backend and sends
+frames tagged with a sequence number in their first pixel. Reports the
+time from sending a frame to its show() at a paced frame rate, and the
+frame rate reached when the sender sends as fast as it can.
+
+Usage: python benchmarks/bench_stream.py [ddp|e131] [led_count]
+"""
+
+import contextlib
+import io
+import os
+import socket
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('LED_BACKEND', 'null')
+
+import controller
+import stream
+
+PACED_FPS = 60
+PACED_FRAMES = 300
+FLOOD_SECONDS = 2.0
+
+def bench(protocol, led_count):
+    controller.LED_COUNT = led_count
+    controller.pixels = controller.strips[controller.DEFAULT_STRIP] = controller.create_backend('null', led_count)
+    shown = {}
+
+    def on_frame(strip, buffer):
+        shown.setdefault(int.from_bytes(buffer[0:3], 'big'), time.perf_counter())
+    controller.add_frame_listener(on_frame)
+
+    receiver = stream.StreamReceiver(protocol, port=0, host='127.0.0.1').start()
+    packetize = stream.ddp_packets if protocol == 'ddp' else stream.e131_packets
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    frame = bytearray(os.urandom(led_count * 3))
+
+    def send(sequence):
+        frame[0:3] = sequence.to_bytes(3, 'big')
+        for packet in packetize(frame, sequence):
+            sock.sendto(packet, receiver.address)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        sent = {}
+        for sequence in range(1, PACED_FRAMES + 1):
+            sent[sequence] = time.perf_counter()
+            send(sequence)
+            time.sleep(1 / PACED_FPS)
+        time.sleep(0.1)
+        latencies = sorted(shown[n] - sent[n] for n in sent if n in shown)
+
+        shown.clear()
+        shows_before = controller.pixels.frames_shown
+        start = time.perf_counter()
+        sequence = PACED_FRAMES
+        while time.perf_counter() - start < FLOOD_SECONDS:
+            sequence += 1
+            send(sequence)
+        time.sleep(0.1)
+        shows = controller.pixels.frames_shown - shows_before
+        receiver.close()
+
+    sent_fps = (sequence - PACED_FRAMES) / FLOOD_SECONDS
+    print(f"{protocol:4s} {led_count:5d} LEDs  latency median {statistics.median(latencies) * 1e3:6.3f} ms  "
+          f"p99 {latencies[int(len(latencies) * 0.99)] * 1e3:6.3f} ms  "
+          f"({len(latencies)}/{PACED_FRAMES} frames at {PACED_FPS} fps)")
+    print(f"{protocol:4s} {led_count:5d} LEDs  flood: sent {sent_fps:8.0f} frames/s  "
+          f"shown {shows / FLOOD_SECONDS:8.0f} frames/s  malformed packets "
+          f"{receiver.bad_packets}")
+
+if __name__ == '__main__':
+    bench(sys.argv[1] if len(sys.argv) > 1 else 'ddp', int(sys.argv[2]) if len(sys.argv) > 2 else 1000)
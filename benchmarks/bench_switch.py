@@ -0,0 +1,55 @@
+# benchmarks/bench_switch.py
+
+"""
+Effect-switch benchmark for the render worker.
+
+Measures how long start_effect() blocks the caller and how long it
+takes until the new effect's first frame is out, using the null backend.
+
+Usage: python benchmarks/bench_switch.py [iterations]
+"""
+
+import contextlib
+import io
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('LED_BACKEND', 'null')
+
+import controller
+
+EFFECTS = [
+    (controller.rainbow_cycle, ([(255, 0, 0), (0, 255, 0), (0, 0, 255)], 0.05)),
+    (controller.sparkle_effect, ((255, 255, 255), (0, 0, 32), 20, 0.2, 10)),
+    (controller.breathing_effect, ((0, 255, 0), 50, 0.1)),
+    (controller.theater_chase, ((255, 255, 0), (0, 0, 64), 0.5)),
+]
+
+def bench(iterations):
+    worker = controller.get_worker()
+    call_times = []
+    switch_times = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for i in range(iterations):
+            effect_func, args = EFFECTS[i % len(EFFECTS)]
+            start = time.perf_counter()
+            controller.start_effect(effect_func, *args)
+            call_times.append(time.perf_counter() - start)
+            worker.flush()
+            while worker.switch_requested_at is not None:
+                time.sleep(0.0001)
+            switch_times.append(worker.last_switch_latency)
+            # Let the effect settle into its sleep between frames
+            time.sleep(0.02)
+        controller.stop_current_effect()
+        worker.flush()
+    print(f"start_effect call   median {statistics.median(call_times) * 1e6:8.1f} us  "
+          f"max {max(call_times) * 1e6:8.1f} us")
+    print(f"switch to 1st frame median {statistics.median(switch_times) * 1e6:8.1f} us  "
+          f"max {max(switch_times) * 1e6:8.1f} us")
+
+if __name__ == '__main__':
+    bench(int(sys.argv[1]) if len(sys.argv) > 1 else 100)
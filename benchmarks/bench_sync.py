@@ -0,0 +1,113 @@
+# benchmarks/bench_sync.py
+
+"""
+Inter-node skew of leader/follower frame synchronization.
+
+Runs a leader and several followers as separate processes on loopback,
+each with the null pixel backend, all showing the same rainbow_cycle.
+Every node logs when it showed each frame; a frame is identified by its
+first pixel. For every follower frame the skew is its show time minus
+the leader's show time of the same frame (all processes share the
+machine's monotonic clock).
+
+Runs twice: with sync, and free-running with each node starting the
+effect on its own, followers a little later, like separately started
+controllers.
+
+Usage: python benchmarks/bench_sync.py [followers] [seconds]
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('LED_BACKEND', 'null')
+
+EFFECT = {"colors": [[255, 0, 0], [0, 255, 0], [0, 0, 255]], "wait": 0.01, "gradient_steps": 250}
+WARMUP = 2.0  # Seconds to skip: offset estimation and the first cross-fade
+
+def run_node(role, mode, seconds, leader_port=None, delay=0.0):
+    """Child process: run one controller and print its (time, first pixel) log as JSON."""
+    import controller
+    import server
+    import sync
+    log = []
+    controller.add_frame_listener(lambda strip, buffer: log.append((time.monotonic(), bytes(buffer[:3]).hex())))
+    params, _ = server.parse_effect('rainbow_cycle', EFFECT)
+    if role == 'leader' and mode == 'sync':
+        leader = sync.SyncLeader(port=0, host='127.0.0.1').start()
+        print(leader.address[1], flush=True)
+    elif role == 'leader':
+        print(0, flush=True)
+    if mode == 'sync' and role == 'follower':
+        sync.SyncFollower(('127.0.0.1', leader_port)).start()
+    if role == 'leader' or mode == 'free':
+        time.sleep(delay)
+        server.start_effect(controller, 'rainbow_cycle', params)
+        server.record_effect('rainbow_cycle', params)
+    time.sleep(seconds)
+    print(json.dumps(log))
+
+def frame_ids(led_count):
+    """Map the first pixel of every rainbow frame to its frame number within the period."""
+    import backends
+    import controller
+    params = EFFECT
+    render, _ = controller.rainbow_cycle(params['colors'], params['wait'], params['gradient_steps'], led_count=led_count)
+    canvas = backends.Canvas(led_count)
+    period = len(params['colors']) * params['gradient_steps']
+    ids = {}
+    for frame in range(period):
+        render(frame, canvas)
+        ids.setdefault(bytes(canvas.buffer[:3]).hex(), frame)
+    return ids, period
+
+def start_node(args):
+    env = dict(os.environ, LED_DB_PATH=os.path.join(tempfile.mkdtemp(), 'node.journal'))
+    return subprocess.Popen([sys.executable, os.path.abspath(__file__), '--node', *map(str, args)],
+                            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, env=env, text=True)
+
+def bench(followers, seconds, mode):
+    import controller
+    ids, period = frame_ids(controller.LED_COUNT)
+    leader = start_node(['leader', mode, seconds])
+    port = int(leader.stdout.readline())
+    nodes = [start_node(['follower', mode, seconds, port, 0.1 + 0.037 * n]) for n in range(followers)]
+    logs = [json.loads(process.communicate()[0].strip().splitlines()[-1]) for process in [leader] + nodes]
+
+    def frames(log):
+        start = log[0][0] + WARMUP if log else 0
+        return [(at, ids[pixel]) for at, pixel in log if at >= start and pixel in ids]
+    leader_frames = {}
+    for at, frame in frames(logs[0]):
+        leader_frames.setdefault(frame, []).append(at)
+    skews = []
+    for log in logs[1:]:
+        for at, frame in frames(log):
+            # The same frame number comes back every period: take the leader's nearest showing
+            # (the leader may have dropped or not yet logged this showing: skip matches a period away)
+            candidates = leader_frames.get(frame)
+            if candidates:
+                skew = min((at - other for other in candidates), key=abs)
+                if abs(skew) < period * EFFECT['wait'] / 2:
+                    skews.append(skew)
+    skews = sorted(abs(skew) for skew in skews)
+    print(f"{mode:4s}: {followers} followers, {len(skews)} frames compared  "
+          f"skew median {statistics.median(skews) * 1e3:7.3f} ms  p99 {skews[int(len(skews) * 0.99)] * 1e3:7.3f} ms  "
+          f"max {skews[-1] * 1e3:7.3f} ms  (frame period {EFFECT['wait'] * 1e3:.0f} ms, effect period {period} frames)")
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--node':
+        role, mode, seconds = sys.argv[2], sys.argv[3], float(sys.argv[4])
+        run_node(role, mode, seconds, int(sys.argv[5]) if len(sys.argv) > 5 else None,
+                 float(sys.argv[6]) if len(sys.argv) > 6 else 0.0)
+    else:
+        count = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+        duration = float(sys.argv[2]) if len(sys.argv) > 2 else 6.0
+        for run_mode in ('sync', 'free'):
+            bench(count, duration, run_mode)
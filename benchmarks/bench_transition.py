@@ -0,0 +1,61 @@
+# benchmarks/bench_transition.py
+
+"""
+Frame-time benchmark for cross-fade transitions.
+
+Composes frames of a theater_chase -> rainbow_cycle transition on a
+simulated strip with the null backend and checks the per-frame cost of
+rendering both layers plus the blend against the transition frame budget.
+
+Usage: python benchmarks/bench_transition.py [led_count ...]
+"""
+
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('LED_BACKEND', 'null')
+
+import backends
+import controller
+
+FRAMES = 1000
+
+def make_layer(effect_func, *args):
+    render, fps = effect_func(*args)
+    return controller.Layer(effect_func.__name__, render, fps, controller.LED_COUNT)
+
+def bench(led_count):
+    controller.LED_COUNT = led_count
+    output = backends.NullBackend(led_count)
+    # Long enough that every measured frame is mid-transition
+    compositor = controller.Compositor(output, transition_time=FRAMES)
+    with contextlib.redirect_stdout(io.StringIO()):
+        compositor.set_layer(make_layer(controller.theater_chase, (255, 255, 0), (0, 0, 64), 0.001))
+        compositor.set_layer(make_layer(controller.rainbow_cycle,
+                                        [(255, 0, 0), (0, 255, 0), (0, 0, 255)], 0.001))
+
+    # Advance one frame of each layer per composed frame
+    start = time.perf_counter()
+    for frame in range(FRAMES):
+        compositor.compose(frame / 1000)
+        output.show()
+    compose_time = (time.perf_counter() - start) / FRAMES
+
+    front, back = compositor.front.canvas.buffer, compositor.back.canvas.buffer
+    start = time.perf_counter()
+    for frame in range(FRAMES):
+        compositor.blend(front, back, frame / FRAMES)
+    blend_time = (time.perf_counter() - start) / FRAMES
+
+    budget = 1.0 / controller.TRANSITION_FPS
+    print(f"{led_count:5d} LEDs  compose {compose_time * 1e3:7.3f} ms/frame  "
+          f"blend {blend_time * 1e3:7.3f} ms/frame  "
+          f"budget used {compose_time / budget * 100:5.1f}% of {budget * 1e3:.1f} ms")
+
+if __name__ == '__main__':
+    for count in [int(a) for a in sys.argv[1:]] or [144, 1000]:
+        bench(count)
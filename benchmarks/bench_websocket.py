@@ -0,0 +1,101 @@
+# benchmarks/bench_websocket.py
+
+"""
+Fan-out benchmark for the ASGI server's /ws WebSocket.
+
+Starts asgi_server under uvicorn on loopback with the null pixel backend,
+connects many preview subscribers (a few of which read slowly), runs an
+effect and a series of brightness changes, and reports how long state
+changes take to reach every client and how many preview frames fast and
+slow clients received.
+
+Needs uvicorn and websockets.
+
+Usage: python benchmarks/bench_websocket.py [clients]
+"""
+
+import asyncio
+import io
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('LED_BACKEND', 'null')
+os.environ.setdefault('LED_DB_PATH', os.path.join(tempfile.mkdtemp(), 'state.journal'))
+
+import uvicorn
+import websockets
+
+import asgi_server
+import controller
+
+PORT = 5077
+SLOW_EVERY = 10  # Every tenth client reads slowly
+CHANGES = 20
+RUN_TIME = 3.0
+
+async def client(index, received, state_seen):
+    slow = index % SLOW_EVERY == 0
+    async with websockets.connect(f"ws://127.0.0.1:{PORT}/ws", max_queue=1) as ws:
+        await ws.send(json.dumps({"preview": True}))
+        stats = received[index] = {"frames": 0, "slow": slow}
+        async for message in ws:
+            if isinstance(message, bytes):
+                stats["frames"] += 1
+            else:
+                changes = json.loads(message)["changes"]
+                if "set_brightness" in changes and changes["set_brightness"]:
+                    state_seen.append((slow, changes["set_brightness"]["brightness"], time.perf_counter()))
+            if slow:
+                await asyncio.sleep(0.5)
+
+async def run(clients, results):
+    received = {}
+    state_seen = []
+    tasks = [asyncio.create_task(client(i, received, state_seen)) for i in range(clients)]
+    while len(received) < clients:
+        await asyncio.sleep(0.05)
+
+    controller.start_effect(controller.rainbow_cycle, [(255, 0, 0), (0, 0, 255)], 1 / 60)
+    sent = {}
+    loop = asyncio.get_running_loop()
+    for n in range(CHANGES):
+        brightness = round(0.1 + n / 100, 3)
+        sent[brightness] = time.perf_counter()
+        # Write through the state store from another thread, as an HTTP handler would
+        await loop.run_in_executor(None, asgi_server.db.update_database, 'set_brightness',
+                                   {"brightness": brightness})
+        await asyncio.sleep(RUN_TIME / CHANGES)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    # Slow clients get coalesced updates, so only fast clients measure fan-out latency
+    latencies = sorted(seen - sent[value] for slow, value, seen in state_seen if value in sent and not slow)
+    fast = [stats["frames"] for stats in received.values() if not stats["slow"]]
+    slow = [stats["frames"] for stats in received.values() if stats["slow"]]
+    print(f"{clients} clients  fast-client state fan-out median {statistics.median(latencies) * 1e3:7.2f} ms  "
+          f"p99 {latencies[int(len(latencies) * 0.99)] * 1e3:7.2f} ms  ({len(latencies)} deliveries)", file=results)
+    print(f"preview frames published {asgi_server.hub.previews_sent}  "
+          f"fast clients median {statistics.median(fast)}  slow clients median {statistics.median(slow)}", file=results)
+
+def main(clients):
+    # Keep the effect and server chatter out of the results
+    sys.stdout, results = io.StringIO(), sys.stdout
+    config = uvicorn.Config(asgi_server.app, host='127.0.0.1', port=PORT, log_level='error', ws_max_queue=1)
+    uvicorn_server = uvicorn.Server(config)
+    thread = threading.Thread(target=uvicorn_server.run, daemon=True)
+    thread.start()
+    while not uvicorn_server.started:
+        time.sleep(0.01)
+    asyncio.run(run(clients, results))
+    uvicorn_server.should_exit = True
+    thread.join()
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
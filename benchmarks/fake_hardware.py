@@ -0,0 +1,57 @@
+# benchmarks/fake_hardware.py
+
+"""
+Software stand-ins for the `board` and `neopixel` modules.
+
+Importing this module registers the fakes in sys.modules so that
+controller.py can be imported on a machine without a Raspberry Pi.
+"""
+
+import sys
+import types
+
+class FakeNeoPixel:
+    """In-memory replacement for neopixel.NeoPixel."""
+
+    def __init__(self, pin, n, brightness=1.0, auto_write=True, pixel_order=None):
+        self.pin = pin
+        self.n = n
+        self.brightness = brightness
+        self.auto_write = auto_write
+        self.pixel_order = pixel_order
+        self._pixels = [(0, 0, 0)] * n
+        self.show_count = 0
+
+    def __len__(self):
+        return self.n
+
+    def __getitem__(self, index):
+        return self._pixels[index]
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            self._pixels[index] = [tuple(v) for v in value]
+        else:
+            self._pixels[index] = tuple(value)
+
+    def fill(self, color):
+        self._pixels = [tuple(color)] * self.n
+
+    def show(self):
+        self.show_count += 1
+
+    def deinit(self):
+        pass
+
+def install():
+    """Register the fake modules unless the real ones are importable."""
+    board = types.ModuleType('board')
+    board.D18 = 18
+    neopixel = types.ModuleType('neopixel')
+    neopixel.GRB = 'GRB'
+    neopixel.RGB = 'RGB'
+    neopixel.NeoPixel = FakeNeoPixel
+    sys.modules.setdefault('board', board)
+    sys.modules.setdefault('neopixel', neopixel)
+
+install()
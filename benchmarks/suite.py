@@ -0,0 +1,415 @@
+# benchmarks/suite.py
+
+"""
+Benchmark suite with machine-readable results and regression checks.
+
+Runs on any Linux box: the neopixel backend drives the fake board and
+neopixel modules from fake_hardware, and the state store lives in a
+temporary directory. Sections:
+
+    effects  Per-frame render + show time of every registered effect
+             at 144, 600 and 2000 LEDs (median and p99).
+    switch   start_effect() call time, time to the new effect's first
+             frame, and stop_current_effect() until applied.
+    api      Throughput and latency (median, p99) of every HTTP route
+             under concurrent clients, through a real threaded server.
+    store    State store operations per second.
+
+Every result is a named metric with a unit and the direction that is
+better. --output writes them as JSON; --baseline compares a run with a
+saved one and exits with status 1 if a metric got worse by more than
+the threshold (twice the threshold for p99 latencies).
+
+Usage:
+    python benchmarks/suite.py [--quick] [--only effects,switch,api,store] [--output results.json]
+    python benchmarks/suite.py --baseline baseline.json [--threshold 0.15] [--output results.json]
+    python benchmarks/suite.py --compare baseline.json results.json
+"""
+
+import argparse
+import contextlib
+import gc
+import http.client
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('LED_BACKEND', 'neopixel')
+os.environ.setdefault('LED_DB_PATH', os.path.join(tempfile.mkdtemp(), 'suite.journal'))
+
+import fake_hardware  # noqa: F401  (registers fake board/neopixel)
+import numpy as np
+
+import backends
+import controller
+import db
+import effects
+import server
+
+SECTIONS = ['effects', 'switch', 'api', 'store']
+LED_COUNTS = [144, 600, 2000]
+SKIPPED_EFFECTS = {'audio_spectrum', 'audio_pulse'}  # Need a live audio source
+SAMPLE_VALUES = {'color': [255, 96, 0], 'colors': [[255, 0, 0], [0, 255, 0], [0, 0, 255]]}
+API_CLIENTS = 8
+def suite_segment(client):
+    """A segment of its own for each API client."""
+    return {"name": f"suite{client}", "start": client * 10, "length": 10}
+
+# One sample request per route of server.app, in the order they run: (method, rule, path, payload).
+# A payload can be a function of the client number, for requests that must not collide.
+# api_requests() fails when a route is missing here, so new routes get benchmarked too.
+API_REQUESTS = [
+    ('GET', '/', '/', None),
+    ('GET', '/healthz', '/healthz', None),
+    ('GET', '/readyz', '/readyz', None),
+    ('GET', '/effects', '/effects', None),
+    ('GET', '/frame_cache', '/frame_cache', None),
+    ('GET', '/metrics', '/metrics', None),
+    ('POST', '/segments', '/segments', suite_segment),
+    ('GET', '/segments', '/segments', None),
+    ('POST', '/segments/delete', '/segments/delete', lambda client: {"name": f"suite{client}"}),
+    ('POST', '/effects/<name>', '/effects/color_fill', {"color": [255, 0, 0]}),
+    ('POST', '/color_fill', '/color_fill', {"color": [0, 0, 255]}),
+    ('POST', '/rainbow_cycle', '/rainbow_cycle', {"colors": [[255, 0, 0], [0, 255, 0], [0, 0, 255]], "wait": 0.05}),
+    ('POST', '/breathing_effect', '/breathing_effect', {"color": [0, 255, 0], "steps": 50, "wait": 0.05}),
+    ('POST', '/theater_chase', '/theater_chase', {"color": [255, 255, 0], "alternate_color": [0, 0, 64], "wait": 0.05}),
+    ('POST', '/sparkle_effect', '/sparkle_effect', {"color": [255, 255, 255], "alternate_color": [0, 0, 32], "wait": 0.05}),
+    ('POST', '/set_brightness', '/set_brightness', {"brightness": 0.5}),
+    ('POST', '/color_correction', '/color_correction', {"gamma": 2.2, "white_balance": [1.0, 0.9, 0.8]}),
+    ('POST', '/batch', '/batch', {"operations": [
+        {"op": "effect", "effect": "color_fill", "params": {"color": [0, 255, 0]}},
+        {"op": "brightness", "brightness": 0.6},
+        {"op": "write", "key": "suite", "value": 1}]}),
+    ('POST', '/write', '/write', {"key": "suite", "value": {"color": [1, 2, 3]}}),
+    ('POST', '/retrieve', '/retrieve', {"keys": ["suite", "set_brightness", "missing"]}),
+    ('POST', '/delete', '/delete', {"keys": ["suite"]}),
+    ('POST', '/presets', '/presets', {"name": "suite", "effects": [{"effect": "color_fill", "params": {"color": [255, 0, 255]}}],
+                                      "brightness": 0.5}),
+    ('GET', '/presets', '/presets', None),
+    ('POST', '/presets/apply', '/presets/apply', {"name": "suite"}),
+    ('POST', '/playlists', '/playlists', {"name": "suite", "entries": [{"preset": "suite", "duration": 60}]}),
+    ('GET', '/playlists', '/playlists', None),
+    ('POST', '/playlists/play', '/playlists/play', {"name": "suite"}),
+    ('POST', '/playlists/stop', '/playlists/stop', {"name": "suite"}),
+    ('POST', '/playlists/delete', '/playlists/delete', {"name": "suite"}),
+    ('POST', '/schedules', '/schedules', {"name": "suite", "at": "03:00", "preset": "suite"}),
+    ('GET', '/schedules', '/schedules', None),
+    ('POST', '/schedules/delete', '/schedules/delete', {"name": "suite"}),
+    ('POST', '/presets/delete', '/presets/delete', {"name": "suite"}),
+    ('POST', '/stop', '/stop', {}),
+]
+SKIPPED_ROUTES = {('GET', '/static/<path:filename>')}  # Flask's static files; the API serves none
+# Untimed request sent before each timed one, for routes that use up what they act on
+API_PREPARE = {('POST', '/segments/delete'): ('POST', '/segments', suite_segment)}
+THRESHOLD = 0.15  # Relative change that counts as a regression
+NOISE_FLOOR = {'us': 1.0, 'ms': 0.05}  # Absolute changes below this are never flagged
+TAIL_FACTOR = 2.0  # Tail latencies are noisier: p99 metrics need this many times the threshold
+
+class Results:
+    """Collects named metrics: value, unit and whether lower or higher is better."""
+
+    def __init__(self):
+        self.metrics = {}
+
+    def add(self, name, value, unit, better='lower'):
+        self.metrics[name] = {"value": round(float(value), 3), "unit": unit, "better": better}
+        print(f"  {name:48s} {value:12.3f} {unit}", flush=True)
+
+@contextlib.contextmanager
+def no_gc():
+    """Keep garbage collection pauses out of a timed loop."""
+    gc.collect()
+    gc.disable()
+    try:
+        yield
+    finally:
+        gc.enable()
+
+def percentile(values, fraction):
+    return float(np.percentile(values, fraction * 100))
+
+def sample_params(effect):
+    """Parameters for an effect: required fields get a sample value, the rest their defaults."""
+    data = {}
+    for param in effect.params:
+        if param.default is effects.REQUIRED:
+            data[param.name] = SAMPLE_VALUES.get(param.kind, param.minimum if param.minimum is not None else 1)
+    params, error = effect.validate(data)
+    if error:
+        raise ValueError(f"{effect.name}: {error}")
+    return params
+
+def bench_effects(results, frames):
+    for effect in effects.list_effects():
+        if effect.name in SKIPPED_EFFECTS:
+            continue
+        arguments = effect.arguments(sample_params(effect))
+        for led_count in LED_COUNTS:
+            render, _ = effect.function(*arguments, led_count=led_count)
+            canvas = backends.Canvas(led_count)
+            output = backends.NeoPixelBackend(led_count)
+            output.correction.update(brightness=0.5, gamma=2.2)
+            times = np.empty(frames)
+            with no_gc():
+                for frame in range(frames):
+                    start = time.perf_counter()
+                    render(frame, canvas)
+                    output.write(canvas.buffer)
+                    output.show()
+                    times[frame] = time.perf_counter() - start
+            results.add(f"effects.{effect.name}.{led_count}.median", np.median(times) * 1e6, 'us')
+            results.add(f"effects.{effect.name}.{led_count}.p99", percentile(times, 0.99) * 1e6, 'us')
+
+def bench_switch(results, iterations):
+    worker = controller.get_worker()
+    rainbow = effects.get_effect('rainbow_cycle')
+    chase = effects.get_effect('theater_chase')
+    choices = [(rainbow.function, rainbow.arguments(sample_params(rainbow))),
+               (chase.function, chase.arguments({"color": [255, 255, 0], "alternate_color": [0, 0, 64], "wait": 0.05}))]
+    calls, switches, stops = [], [], []
+    for n in range(iterations):
+        function, arguments = choices[n % len(choices)]
+        start = time.perf_counter()
+        controller.start_effect(function, *arguments)
+        calls.append(time.perf_counter() - start)
+        worker.flush()
+        while worker.switch_requested_at is not None:
+            time.sleep(0.0001)
+        switches.append(worker.last_switch_latency)
+        time.sleep(0.01)
+        if n % 4 == 3:
+            start = time.perf_counter()
+            controller.stop_current_effect()
+            worker.flush()
+            stops.append(time.perf_counter() - start)
+    controller.stop_current_effect()
+    worker.flush()
+    for name, times in (('start_effect_call', calls), ('first_frame', switches), ('stop_applied', stops)):
+        results.add(f"switch.{name}.median", statistics.median(times) * 1e6, 'us')
+        results.add(f"switch.{name}.p99", percentile(times, 0.99) * 1e6, 'us')
+
+def api_requests():
+    """
+    The requests of API_REQUESTS, checked against the routes of server.app.
+
+    Raises:
+        ValueError: If a route has no sample request, or a request no route.
+    """
+    routes = {(method, rule.rule) for rule in server.app.url_map.iter_rules()
+              for method in rule.methods - {'HEAD', 'OPTIONS'}} - SKIPPED_ROUTES
+    listed = {(method, rule) for method, rule, _, _ in API_REQUESTS}
+    if routes != listed:
+        missing = [f"{method} {rule}" for method, rule in sorted(routes - listed)]
+        unknown = [f"{method} {rule}" for method, rule in sorted(listed - routes)]
+        raise ValueError("benchmarks/suite.py API_REQUESTS does not match the server routes."
+                         + (f" No sample request for: {', '.join(missing)}." if missing else '')
+                         + (f" No such route: {', '.join(unknown)}." if unknown else ''))
+    return API_REQUESTS
+
+def bench_api(results, requests):
+    from werkzeug.serving import make_server
+    routes = api_requests()
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    # Restore the (empty) saved state like server.py does, so /readyz reports ready
+    server.restore_state()
+    http_server = make_server('127.0.0.1', 0, server.app, threaded=True)
+    threading.Thread(target=http_server.serve_forever, name='suite-http', daemon=True).start()
+    port = http_server.server_port
+
+    def send(method, path, payload, client):
+        if callable(payload):
+            payload = payload(client)
+        body = json.dumps(payload).encode() if payload is not None else None
+        headers = {'Content-Type': 'application/json'} if body is not None else {}
+        connection = http.client.HTTPConnection('127.0.0.1', port)
+        connection.request(method, path, body, headers)
+        response = connection.getresponse()
+        response.read()
+        connection.close()
+        return response.status
+
+    try:
+        for method, rule, path, payload in routes:
+            prepare = API_PREPARE.get((method, rule))
+
+            def client(number, count):
+                times, errors = [], 0
+                for _ in range(count):
+                    if prepare is not None:
+                        send(*prepare, number)
+                    start = time.perf_counter()
+                    status = send(method, path, payload, number)
+                    times.append(time.perf_counter() - start)
+                    errors += status != 200
+                return times, errors
+
+            per_client = max(1, requests // API_CLIENTS)
+            start = time.perf_counter()
+            with ThreadPoolExecutor(API_CLIENTS) as pool:
+                outcomes = list(pool.map(client, range(API_CLIENTS), [per_client] * API_CLIENTS))
+            elapsed = time.perf_counter() - start
+            times = [t for client_times, _ in outcomes for t in client_times]
+            errors = sum(client_errors for _, client_errors in outcomes)
+            name = f"api.{method} {rule}"
+            if prepare is None:
+                results.add(f"{name}.throughput", len(times) / elapsed, 'req/s', better='higher')
+            results.add(f"{name}.median", statistics.median(times) * 1e3, 'ms')
+            results.add(f"{name}.p99", percentile(times, 0.99) * 1e3, 'ms')
+            if errors:
+                print(f"  {name}: {errors} responses were not 200 OK", file=sys.stderr)
+    finally:
+        http_server.shutdown()
+        controller.stop_current_effect()
+        controller.get_worker().flush()
+
+def bench_store(results, operations):
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'state.journal')
+        store = db.JournalStore(path, flush_interval=3600)
+        value = {"color": [255, 0, 0], "wait": 0.05}
+        keys = [f"key{n % 1000}" for n in range(operations)]
+
+        def rate(function):
+            with no_gc():
+                start = time.perf_counter()
+                function()
+                return operations / (time.perf_counter() - start)
+
+        results.add('store.set', rate(lambda: [store.set(key, value) for key in keys]), 'ops/s', better='higher')
+        results.add('store.get', rate(lambda: [store.get([key]) for key in keys]), 'ops/s', better='higher')
+        batch = [('write', f"batch{n}", value) for n in range(10)]
+        results.add('store.batch10', rate(lambda: [store.batch(batch) for _ in keys]), 'ops/s', better='higher')
+        per_thread = operations // API_CLIENTS
+
+        def concurrent_sets():
+            threads = [threading.Thread(target=lambda: [store.set(key, value) for key in keys[:per_thread]])
+                       for _ in range(API_CLIENTS)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        results.add(f'store.set_{API_CLIENTS}_threads', rate(concurrent_sets), 'ops/s', better='higher')
+        find_operations = max(1, operations // 100)
+        with no_gc():
+            start = time.perf_counter()
+            for _ in range(find_operations):
+                store.items('key1')
+            results.add('store.find_prefix_1000_keys', find_operations / (time.perf_counter() - start),
+                        'ops/s', better='higher')
+        start = time.perf_counter()
+        store.close()
+        results.add('store.flush', (time.perf_counter() - start) * 1e3, 'ms')
+        with open(path, 'w', encoding='utf-8') as journal:
+            for n in range(operations):
+                journal.write(json.dumps({"k": keys[n], "v": value}) + '\n')
+        start = time.perf_counter()
+        db.JournalStore(path, flush_interval=3600).close()
+        results.add('store.replay', operations / (time.perf_counter() - start), 'records/s', better='higher')
+
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        commit = ''
+    return {"python": platform.python_version(), "numpy": np.__version__, "platform": platform.platform(),
+            "machine": platform.machine(), "cpus": os.cpu_count(), "commit": commit or None,
+            "time": time.strftime('%Y-%m-%dT%H:%M:%S%z')}
+
+def run(sections, quick):
+    controller.RANDOM_SEED = 0
+    scale = 0.25 if quick else 1.0
+    results = Results()
+    settings = {"sections": sections, "quick": quick}
+    if 'effects' in sections:
+        print("effects (render + show per frame)")
+        bench_effects(results, int(400 * scale))
+    if 'switch' in sections:
+        print("switch")
+        bench_switch(results, int(200 * scale))
+    if 'api' in sections:
+        print(f"api ({API_CLIENTS} concurrent clients)")
+        bench_api(results, int(800 * scale))
+    if 'store' in sections:
+        print("store")
+        bench_store(results, int(200000 * scale))
+    return {"environment": environment(), "settings": settings, "results": results.metrics}
+
+def compare(current, baseline, threshold=THRESHOLD):
+    """
+    Compare two result sets.
+
+    Returns:
+        list: (name, baseline value, current value, relative change, regressed) per common metric.
+    """
+    rows = []
+    for name, metric in current["results"].items():
+        base = baseline["results"].get(name)
+        if base is None or base["unit"] != metric["unit"]:
+            continue
+        old, new = base["value"], metric["value"]
+        change = (new - old) / old if old else 0.0
+        limit = threshold * TAIL_FACTOR if name.endswith('.p99') else threshold
+        worse = change > limit if metric["better"] == 'lower' else change < -limit
+        if abs(new - old) < NOISE_FLOOR.get(metric["unit"], 0.0):
+            worse = False
+        rows.append((name, old, new, change, worse))
+    return rows
+
+def report(rows, threshold):
+    """Print a comparison and return the number of regressions."""
+    regressions = [row for row in rows if row[4]]
+    print(f"\n{'metric':56s} {'baseline':>12s} {'current':>12s} {'change':>8s}")
+    for name, old, new, change, worse in rows:
+        flag = '  REGRESSION' if worse else ''
+        print(f"{name:56s} {old:12.3f} {new:12.3f} {change * 100:+7.1f}%{flag}")
+    print(f"\n{len(regressions)} of {len(rows)} metrics regressed by more than {threshold * 100:.0f}%.")
+    return len(regressions)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the benchmark suite.")
+    parser.add_argument('--only', default=','.join(SECTIONS), help="Comma separated sections to run")
+    parser.add_argument('--quick', action='store_true', help="Fewer iterations, for a fast check")
+    parser.add_argument('--output', help="Write the results as JSON to this file ('-' for stdout)")
+    parser.add_argument('--baseline', help="Compare the run with saved results")
+    parser.add_argument('--compare', nargs=2, metavar=('BASELINE', 'CURRENT'), help="Compare two saved results")
+    parser.add_argument('--threshold', type=float, default=THRESHOLD, help="Relative change flagged as a regression")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        loaded = []
+        for path in args.compare:
+            with open(path) as f:
+                loaded.append(json.load(f))
+        sys.exit(1 if report(compare(loaded[1], loaded[0], args.threshold), args.threshold) else 0)
+
+    sections = [name for name in args.only.split(',') if name]
+    unknown = set(sections) - set(SECTIONS)
+    if unknown:
+        sys.exit(f"Unknown sections: {', '.join(sorted(unknown))}. Choose from {', '.join(SECTIONS)}.")
+    with contextlib.redirect_stdout(sys.stderr) if args.output == '-' else contextlib.nullcontext():
+        current = run(sections, args.quick)
+    if args.output == '-':
+        json.dump(current, sys.stdout, indent=1)
+        print()
+    elif args.output:
+        with open(args.output, 'w') as f:
+            json.dump(current, f, indent=1)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        with contextlib.redirect_stdout(sys.stderr) if args.output == '-' else contextlib.nullcontext():
+            regressions = report(compare(current, baseline, args.threshold), args.threshold)
+        sys.exit(1 if regressions else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+# boot.py
+
+"""
+Fast startup: light the last scene first, load the web stack second.
+
+`python server.py` imports Flask before anything else, so after a power
+cycle the LEDs stay dark until the whole web stack has loaded. This
+entry point imports only the controller (NumPy, no hardware: the strip
+opens on its first frame), recreates the saved segments, queues the
+saved brightness and effects on the render worker, and imports the server while the first frames are
+already rendering. The server then re-arms schedules and playlists and
+starts listening.
+
+The time of every phase, in seconds since this module was imported, is
+logged and kept in `timings`; GET /readyz reports it.
+
+Usage: python boot.py
+"""
+
+import time
+
+START = time.perf_counter()
+
+import logging
+import threading
+
+ACTIVE_EFFECT_PREFIX = 'active_effect:'
+SEGMENT_PREFIX = 'segment:'  # Segments defined through the API, recreated before their effects
+
+timings = {}  # Phase name -> seconds since START
+timings_lock = threading.Lock()
+
+logger = logging.getLogger('boot')
+
+def mark(phase):
+    """Record that a startup phase ended now."""
+    with timings_lock:
+        timings.setdefault(phase, round(time.perf_counter() - START, 6))
+
+def restore_segments():
+    """Recreate the segments defined through the API before the last shutdown."""
+    import controller
+    import pixelmap
+    from db import find_in_database
+    for key, definition in find_in_database(SEGMENT_PREFIX).items():
+        name = key[len(SEGMENT_PREFIX):]
+        try:
+            pixel_map = pixelmap.from_spec(definition['map']) if definition.get('map') is not None else None
+            controller.define_segment(name, definition['start'], definition['length'], definition['strip'],
+                                      definition['reverse'], definition['mirror'], pixel_map)
+        except (KeyError, TypeError, ValueError) as e:
+            logger.error("Could not restore segment", extra={"fields": {"segment": name, "error": str(e)}})
+
+def restore_scene():
+    """Restart the segments, brightness, color correction and effects saved before the last shutdown; no web stack needed."""
+    import controller
+    import effects
+    from db import get_from_database
+    restore_segments()
+    saved = get_from_database(['set_brightness', 'color_correction'] +
+                              [ACTIVE_EFFECT_PREFIX + name for name in controller.segments])
+    brightness = saved.pop('set_brightness')
+    if brightness is not None:
+        controller.set_brightness(brightness['brightness'])
+    correction = saved.pop('color_correction')
+    if correction is not None:
+        controller.set_color_correction(correction.get('gamma'), correction.get('white_balance'))
+    for active in saved.values():
+        if active is None:
+            continue
+        try:
+            effect = effects.get_effect(active['effect'])
+            if effect is None:
+                raise KeyError(active['effect'])
+            params = active['params']
+            controller.start_effect(effect.function, *effect.arguments(params), segment=params['segment'])
+        except (KeyError, TypeError) as e:
+            logger.error("Could not restore effect", extra={"fields": {"saved": active, "error": str(e)}})
+
+def on_frame(strip, buffer):
+    if 'first_frame' not in timings:
+        mark('first_frame')
+        logger.info("First frame shown", extra={"fields": {"seconds": timings['first_frame']}})
+
+def start():
+    """Run every startup phase up to serving requests; returns the Flask app."""
+    import metrics
+    metrics.configure_logging()
+    import controller
+    mark('controller_imported')
+    controller.add_frame_listener(on_frame)
+    restore_scene()
+    mark('scene_queued')
+    import server
+    mark('server_imported')
+    server.restore_state(scene=False)
+    import stream
+    import sync
+    stream.start_receiver()
+    sync.start_sync()
+    mark('ready')
+    logger.info("Started", extra={"fields": dict(timings)})
+    return server.app
+
+def main():
+    app = start()
+    import server
+    app.run(host='0.0.0.0', port=server.PORT)
+
+if __name__ == '__main__':
+    # Run the importable module rather than __main__, so server.py sees the same timings
+    import boot
+    try:
+        boot.main()
+    except KeyboardInterrupt:
+        pass
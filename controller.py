@@ -1,45 +1,772 @@
 # controller.py
 
-import time
-import board
-import neopixel
+import atexit
+import functools
+import logging
+import os
+import queue
 import threading
-import random
+import time
+import numpy as np
+from backends import Canvas, create_backend
+from frame_cache import FrameCache, Timeline, play_timeline, render_timeline
+import effects
+import metrics
+import pixelmap
+from effects import Param
+from scheduler import MAX_FPS, FrameScheduler, TimerQueue, fps_for_wait
 
 # Configuration
 LED_COUNT = 144  # Number of LEDs in your strip
-PIN = board.D18  # GPIO pin for the data signal (18)
-ORDER = neopixel.GRB  # Color order (WS2815 uses GRB)
+BACKEND = os.environ.get('LED_BACKEND', 'neopixel')  # Pixel output: neopixel, memory or null
+PIN = 'D18'  # GPIO pin for the data signal (18), only used by the neopixel backend
+ORDER = 'GRB'  # Color order (WS2815 uses GRB), only used by the neopixel backend
+GAMMA = 1.0  # Output gamma, 1.0 for linear (2.2-2.8 looks more even on WS281x LEDs)
+WHITE_BALANCE = (1.0, 1.0, 1.0)  # Per-channel (R, G, B) output scale
 
 # Initialize the LED strip object
-pixels = neopixel.NeoPixel(PIN, LED_COUNT, brightness=0.2, auto_write=False, pixel_order=ORDER)
+if BACKEND == 'neopixel':
+    pixels = create_backend(BACKEND, LED_COUNT, brightness=0.2, pin=PIN, pixel_order=ORDER)
+else:
+    pixels = create_backend(BACKEND, LED_COUNT, brightness=0.2)
+pixels.correction.update(gamma=GAMMA, white_balance=WHITE_BALANCE)
+
+# Strips and segments
+DEFAULT_STRIP = 'main'  # Name of the strip above
+DEFAULT_SEGMENT = 'main'  # Segment covering the whole default strip
+SEGMENT_POOL_SIZE = 0  # Threads composing segments in parallel, 0 to compose them on the render thread
+SEGMENT_POOL_THRESHOLD = 8  # Use the pool from this many segments on
+RENDER_PROCESSES = int(os.environ.get('LED_RENDER_PROCESSES', '0'))  # Processes rendering effects (see renderproc.py), 0 to render them on the render thread
+PIXEL_MAP = os.environ.get('LED_PIXEL_MAP')  # JSON or CSV file with the (x, y) of every LED of the default segment
+
+strips = {DEFAULT_STRIP: pixels}  # Physical strips by name
+segments = {}  # Segments by name, replaced as a whole on every change
+segments_lock = threading.Lock()  # Serializes segment definitions
+frame_listeners = []  # Called as listener(strip_name, buffer) on the render thread after each show()
+
+# Streaming
+STREAM_TIMEOUT = 2.0  # Seconds without streamed frames before a strip falls back to its effects
+
+# Transitions
+TRANSITION_TIME = 0.5  # Seconds to cross-fade between effects, 0 for a hard cut
+TRANSITION_FPS = 60  # Minimum frame rate while a cross-fade is running
+
+# Idle mode
+IDLE_AFTER = 1.0  # Seconds without a changed frame before an animated effect drops to IDLE_FPS
+IDLE_FPS = 2  # Frame rate while the output stays unchanged, 0 to always run at the effect's rate
+
+# Render processes
+START_POLL_INTERVAL = 0.01  # Seconds between checks on an effect being set up in a render process while nothing animates
+
+# Randomized effects
+RANDOM_SEED = None  # Seed for effects that use random numbers, None for different ones every run
+
+# Compiled effect timelines, shared by every segment
+frame_cache = FrameCache()
 
 # Thread management
-effect_thread = None
-stop_event = threading.Event()
+worker = None  # The long-lived render worker, started on first use
+timers = TimerQueue()  # Timed commands, fired by the render worker at the start of a frame
+
+logger = logging.getLogger('controller')
+
+# Render loop metrics
+RENDER_SECONDS = metrics.histogram('led_render_seconds', 'Time to compose all segments for one frame.')
+SHOW_SECONDS = metrics.histogram('led_show_seconds', 'Time to send one frame to a strip.')
+SWITCH_SECONDS = metrics.histogram('led_effect_switch_seconds', 'Time from an effect switch request to its first frame.')
+FRAMES_SHOWN = metrics.counter('led_frames_shown_total', 'Frames sent to a strip.')
+FRAMES_SKIPPED = metrics.counter('led_frames_skipped_total', 'Frames not sent because they matched the last frame sent to the strip.')
+FRAMES_DROPPED = metrics.counter('led_frames_dropped_total', 'Frame slots skipped because the render loop fell behind.')
+FRAME_OVERRUNS = metrics.counter('led_frame_overruns_total', 'Frames that took longer than the frame period to render and show.')
+ACHIEVED_FPS = metrics.gauge('led_achieved_fps', 'Frame rate reached by the running effect.',
+                             lambda: (get_frame_stats() or {}).get('achieved_fps', 0.0))
+
+class Layer:
+    """
+    A running effect rendering into its own offscreen canvas.
+
+    The layer derives its frame number from the clock, so two layers with
+    different frame rates can be advanced side by side by one scheduler.
+    Frame 0 is at start_time, or at the first advance() when it is None.
+    A render function with a close() method (an effect running in a
+    render process) is closed when the layer is dropped.
+    """
+
+    def __init__(self, name, render, fps, led_count, start_time=None):
+        self.name = name
+        self.render = render
+        self.fps = fps
+        self.canvas = Canvas(led_count)
+        self.start_time = start_time
+        self.last_frame = None
+
+    def advance(self, now):
+        """Render the frame due at `now`. Returns True if the canvas changed."""
+        if self.start_time is None:
+            self.start_time = now
+        frame = max(0, int((now - self.start_time) * self.fps + 1e-6)) if self.fps else 0
+        if frame == self.last_frame:
+            return False
+        self.last_frame = frame
+        try:
+            return self.render(frame, self.canvas) is not False
+        except Exception as e:
+            logger.error("Effect failed", extra={"fields": {"effect": self.name, "error": str(e)}})
+            # Freeze the layer on its last good frame
+            self.fps = None
+            return False
+
+    def close(self):
+        close = getattr(self.render, 'close', None)
+        if close is not None:
+            close()
+
+class Compositor:
+    """
+    Double-buffered compositor that cross-fades between two layers.
+
+    The front layer is the one on screen. A newly set layer becomes the
+    back layer and both are rendered side by side while the compositor
+    blends them into the output, until the back layer is swapped to the
+    front once the transition time has elapsed.
+    """
+
+    def __init__(self, output, transition_time=TRANSITION_TIME):
+        self.output = output
+        self.transition_time = transition_time
+        self.front = None
+        self.back = None
+        self.transition_start = None
+        self.dirty = False
+        self.out = np.frombuffer(output.buffer, dtype=np.uint8)
+        self.blend_front = np.zeros(len(output.buffer), dtype=np.uint16)
+        self.blend_back = np.zeros(len(output.buffer), dtype=np.uint16)
+
+    def set_layer(self, layer):
+        """Show layer, cross-fading from the current one if a transition time is set."""
+        if self.back is not None:
+            # Switching mid-transition: jump to the incoming layer and fade from there
+            self.drop(self.front)
+            self.front = self.back
+        if self.front is None or self.transition_time <= 0:
+            self.drop(self.front)
+            self.front, self.back = layer, None
+        else:
+            self.back = layer
+        self.transition_start = None
+        self.dirty = True
+
+    def invalidate(self):
+        """Make the next compose() write the output even if no layer changed."""
+        self.dirty = True
+
+    def clear(self):
+        """Drop all layers; the output keeps its last frame."""
+        self.drop(self.front)
+        self.drop(self.back)
+        self.front = self.back = None
+        self.dirty = False
+
+    def drop(self, layer):
+        if layer is not None:
+            layer.close()
+
+    def fps(self):
+        """Frame rate the output needs right now, or None when nothing animates."""
+        if self.back is not None:
+            return max(TRANSITION_FPS, self.front.fps or 0, self.back.fps or 0)
+        if self.front is not None and self.front.fps:
+            return self.front.fps
+        return None
+
+    def compose(self, now):
+        """Render the layers for time `now` into the output. Returns True if it changed."""
+        dirty, self.dirty = self.dirty, False
+        if self.front is None:
+            return False
+        if self.back is None:
+            if self.front.advance(now) or dirty:
+                self.output.write(self.front.canvas.buffer)
+                return True
+            return False
+        if self.transition_start is None:
+            self.transition_start = now
+        self.front.advance(now)
+        self.back.advance(now)
+        progress = (now - self.transition_start) / self.transition_time
+        if progress >= 1.0:
+            self.drop(self.front)
+            self.front, self.back = self.back, None
+            self.output.write(self.front.canvas.buffer)
+            return True
+        self.blend(self.front.canvas.buffer, self.back.canvas.buffer, progress)
+        return True
+
+    def blend(self, front, back, progress):
+        """Blend two RGB buffers into the output in one vectorized pass."""
+        weight = int(progress * 256)
+        np.multiply(np.frombuffer(front, dtype=np.uint8), np.uint16(256 - weight), out=self.blend_front)
+        np.multiply(np.frombuffer(back, dtype=np.uint8), np.uint16(weight), out=self.blend_back)
+        self.blend_front += self.blend_back
+        self.blend_front >>= 8
+        self.out[:] = self.blend_front
+
+class Segment:
+    """
+    A slice of a physical strip running its own effect.
+
+    Effects render into an offscreen canvas of render_length pixels that
+    flush() copies into the segment's slice of the strip framebuffer,
+    reversed and/or mirrored around the middle of the segment. A mirrored
+    segment only renders its first half.
+
+    Args:
+        name (str): Segment name used to target it from the API.
+        strip (str): Name of the strip the segment lives on.
+        start (int): Index of the first LED of the segment on the strip.
+        length (int): Number of LEDs in the segment.
+        reverse (bool): Run effects from the end of the segment backwards.
+        mirror (bool): Render half the segment and mirror it onto the other half.
+        pixel_map (PixelMap): Position of each LED of the segment, for
+            effects that render by coordinates.
+    """
+
+    def __init__(self, name, strip, start, length, reverse=False, mirror=False,
+                 transition_time=TRANSITION_TIME, pixel_map=None):
+        output = strips[strip]
+        if start < 0 or length < 1 or start + length > len(output):
+            raise ValueError(f"Segment {name} ({start}+{length}) does not fit strip {strip} "
+                             f"of {len(output)} LEDs.")
+        if pixel_map is not None and len(pixel_map) != length:
+            raise ValueError(f"Pixel map of segment {name} has {len(pixel_map)} pixels, "
+                             f"the segment has {length} LEDs.")
+        self.name = name
+        self.strip = strip
+        self.start = start
+        self.length = length
+        self.reverse = reverse
+        self.mirror = mirror
+        self.render_length = (length + 1) // 2 if mirror else length
+        self.canvas = Canvas(self.render_length)
+        self.compositor = Compositor(self.canvas, transition_time)
+        # Canvas pixel shown at each LED of the segment
+        index = np.arange(length)
+        if mirror:
+            index = np.minimum(index, length - 1 - index)
+        if reverse:
+            index = self.render_length - 1 - index
+        self.index = None if not (reverse or mirror) else index
+        self.pixel_map = pixel_map
+        if pixel_map is not None and self.index is not None:
+            # Effects see the canvas: place each canvas pixel at the first LED showing it
+            first = np.empty(self.render_length, dtype=np.intp)
+            first[index[::-1]] = np.arange(length)[::-1]
+            self.pixel_map = pixel_map.take(first)
+        self.source = np.frombuffer(self.canvas.buffer, dtype=np.uint8).reshape(-1, 3)
+        self.target = np.frombuffer(output.buffer, dtype=np.uint8).reshape(-1, 3)[start:start + length]
+
+    def flush(self):
+        """Copy the composed canvas into the segment's slice of the strip."""
+        if self.index is None:
+            self.target[:] = self.source
+        else:
+            np.take(self.source, self.index, axis=0, out=self.target)
+
+    def describe(self):
+        """Return the segment geometry as a dict."""
+        description = {"strip": self.strip, "start": self.start, "length": self.length,
+                       "reverse": self.reverse, "mirror": self.mirror}
+        if self.pixel_map is not None:
+            description["map"] = self.pixel_map.describe()
+        return description
+
+class RenderWorker:
+    """
+    A single long-lived render thread fed through a command mailbox.
+
+    Commands are callables queued by the API threads and executed on the
+    render thread at the next frame boundary, so submitting one never
+    waits for the running effect. An effect is a setup function taking a
+    led_count keyword and returning (render, fps), where
+    render(frame, canvas) draws the given frame into the canvas (returning
+    False if it left it unchanged) and fps is None for static effects.
+    Every segment runs its own effect; all of them share one scheduler
+    running at the highest frame rate any segment needs. A strip that
+    receives streamed frames shows those instead of its segments until no
+    frame has arrived for STREAM_TIMEOUT seconds. Timers that are due run
+    at the start of a frame, before it is composed. When no strip has
+    received a changed frame for IDLE_AFTER seconds, the scheduler drops
+    to IDLE_FPS until a frame changes again; it still wakes up to run
+    timers when they are due.
+
+    Args:
+        clock (callable): Monotonic clock returning seconds.
+        sleep (callable): Sleep function taking seconds, used between
+            frames. Defaults to waiting on the wakeup event; pass both to
+            drive the worker with a simulated clock.
+    """
+
+    def __init__(self, clock=time.monotonic, sleep=None):
+        self.clock = clock
+        self.sleep = sleep
+        self.running = True
+        self.commands = queue.SimpleQueue()
+        self.wakeup = threading.Event()
+        self.transition_time = TRANSITION_TIME
+        self.pool = None  # Segment compose pool, created once there are many segments
+        self.streams = {}  # Strip name -> monotonic time its stream takeover expires
+        self.scheduler = None
+        self.epoch = None  # Shared monotonic time of frame 0, when frames are synchronized with other nodes
+        self.last_frame = None  # Last frame number rendered by the current scheduler
+        self.idle = False  # True while running at IDLE_FPS because the output stopped changing
+        self.last_change = None  # Monotonic time a strip last received a changed frame
+        self.switch_requested_at = None
+        self.last_switch_latency = None
+        self.render_pool = None  # Render processes, once an effect was offloaded
+        self.pending = {}  # Segment name -> id of the offloaded start it waits for
+        self.thread = threading.Thread(target=self._run, name='render-worker', daemon=True)
+        self.thread.start()
+
+    def submit(self, command):
+        """Queue command() to run on the render thread at the next frame boundary."""
+        self.commands.put(command)
+        self.wakeup.set()
+
+    def flush(self, timeout=None):
+        """Block until every command submitted so far has been applied."""
+        done = threading.Event()
+        self.submit(done.set)
+        return done.wait(timeout)
+
+    def close(self, timeout=None):
+        """Stop the render thread once the commands submitted so far are applied; the LEDs keep their last frame."""
+        def stop():
+            self.running = False
+        self.submit(stop)
+        self.thread.join(timeout)
+
+    def set_effect(self, segment_name, effect_func, args, kwargs, requested_at=None):
+        """
+        Run an effect's setup and cross-fade the segment to it.
+
+        Offloaded effects are set up in a render process in the background;
+        the segment keeps its current effect until the process answers.
+        requested_at is the time.perf_counter() of the request, for the
+        switch latency; now when None.
+        """
+        segment = segments.get(segment_name)
+        if segment is None:
+            logger.error("Unknown segment", extra={"fields": {"effect": effect_func.__name__, "segment": segment_name}})
+            return
+        if requested_at is None:
+            requested_at = time.perf_counter()
+        self._cancel_start(segment_name)
+        if segment.pixel_map is not None and takes_pixel_map(effect_func):
+            kwargs = {**kwargs, 'pixel_map': segment.pixel_map}
+        show = functools.partial(self._show_effect, segment, effect_func.__name__, requested_at)
+        try:
+            if RENDER_PROCESSES and effects.offloadable(effect_func):
+                if self.render_pool is None:
+                    import renderproc  # Deferred: only needed once an effect is offloaded
+                    self.render_pool = renderproc.get_pool(RENDER_PROCESSES)
+                    # The render thread reads the rings: let it close them before the interpreter goes
+                    atexit.register(self.close, 1.0)
+                self.pending[segment_name] = self.render_pool.start(
+                    effect_func, args, kwargs, segment.render_length, self.epoch, show)
+                return
+            setup = effect_func(*args, led_count=segment.render_length, **kwargs)
+        except Exception as e:
+            logger.error("Effect setup failed", extra={"fields": {"effect": effect_func.__name__, "error": str(e)}})
+            setup = None
+        if setup is None:
+            return
+        show(*setup)
+
+    def _show_effect(self, segment, name, requested_at, render, fps):
+        """Cross-fade a segment to an effect that was set up."""
+        if segments.get(segment.name) is not segment:
+            # The segment was redefined or removed while the effect was set up
+            close = getattr(render, 'close', None)
+            if close is not None:
+                close()
+            return
+        self.pending.pop(segment.name, None)
+        self.switch_requested_at = requested_at
+        segment.compositor.set_layer(Layer(name, render, fps, segment.render_length, self.epoch))
+        self.scheduler = None
+
+    def _cancel_start(self, segment_name):
+        layer_id = self.pending.pop(segment_name, None)
+        if layer_id is not None:
+            self.render_pool.cancel(layer_id)
+
+    def clear_effect(self, segment_name=None):
+        """Stop animating one segment, or all when segment_name is None; the LEDs keep their last frame."""
+        for segment in self._targets(segment_name):
+            self._cancel_start(segment.name)
+            if segment.compositor.front:
+                logger.info("Effect stopped", extra={"fields": {"segment": segment.name}})
+            segment.compositor.clear()
+        self.scheduler = None
+
+    def show_stream(self, strip, frame):
+        """Show an externally streamed frame, taking the strip over from its effects."""
+        output = strips[strip]
+        if strip not in self.streams:
+            logger.info("Stream started", extra={"fields": {"strip": strip}})
+        self.streams[strip] = self.clock() + STREAM_TIMEOUT
+        output.write(frame)
+        if output.show():
+            for listener in frame_listeners:
+                listener(strip, output.buffer)
+        else:
+            FRAMES_SKIPPED.inc()
+
+    def set_brightness(self, brightness):
+        """Apply a new brightness to every strip and show it."""
+        self.set_color_correction(brightness=brightness)
+
+    def set_color_correction(self, **settings):
+        """Rebuild the color correction of every strip and show the result."""
+        for output in strips.values():
+            output.correction.update(**settings)
+            output.show()
+
+    def set_epoch(self, epoch):
+        """Count the frames of every effect and of the scheduler from epoch (a monotonic time), or per effect again when None."""
+        self.epoch = epoch
+        if epoch is not None:
+            for segment in segments.values():
+                for layer in (segment.compositor.front, segment.compositor.back):
+                    if layer is not None:
+                        layer.start_time = epoch
+                        layer.last_frame = None
+        self.scheduler = None
+
+    def set_transition_time(self, seconds):
+        """Use the given cross-fade time for the following switches on every segment."""
+        self.transition_time = seconds
+        for segment in segments.values():
+            segment.compositor.transition_time = seconds
+
+    def fps(self):
+        """Frame rate the fastest segment needs, or None when nothing animates."""
+        rates = [rate for rate in (s.compositor.fps() for s in segments.values()) if rate]
+        return max(rates) if rates else None
+
+    def _targets(self, segment_name):
+        if segment_name is None:
+            return list(segments.values())
+        return [segments[segment_name]] if segment_name in segments else []
+
+    def _apply_commands(self, block, timeout=None):
+        self.wakeup.clear()
+        try:
+            command = self.commands.get(block=block, timeout=timeout)
+            while True:
+                command()
+                command = self.commands.get_nowait()
+        except queue.Empty:
+            pass
+
+    def _run(self):
+        idle = True
+        while self.running:
+            # While idle, still wake up when a stream times out to fall back to the effects,
+            # or when a timer is due
+            deadlines = list(self.streams.values())
+            next_timer = timers.next_due()
+            if next_timer is not None:
+                deadlines.append(next_timer)
+            if self.render_pool is not None and self.render_pool.pending:
+                # ...and check on effects being set up in a render process
+                deadlines.append(self.clock() + START_POLL_INTERVAL)
+            timeout = max(0.0, min(deadlines) - self.clock()) if deadlines else None
+            self._apply_commands(block=idle, timeout=timeout)
+            if not self.running:
+                break
+            fps = self.fps()
+            if fps is None:
+                # Static content: compose it once, then wait for the next command,
+                # unless a timer or a render process started an animated effect during that frame
+                self._render_frame(self.clock())
+                idle = self.fps() is None
+                continue
+            idle = False
+            if self.scheduler is None:
+                # A new effect or segment layout: count the time to idle from now
+                self.idle = False
+                self.last_change = self.clock()
+            if self.idle:
+                fps = min(fps, IDLE_FPS)
+            resume = self.scheduler is not None and self.scheduler.fps == min(fps, MAX_FPS)
+            if not resume:
+                self.scheduler = FrameScheduler(fps, clock=self.clock, sleep=self._sleep, epoch=self.epoch)
+                self.last_frame = None
+            self.scheduler.run(self._scheduled_frame, self.wakeup, resume=resume)
+        # Stopped by close(): free the render processes and their frame rings
+        if self.render_pool is not None:
+            for segment in segments.values():
+                segment.compositor.clear()
+            self.render_pool.close()
+
+    def _sleep(self, seconds):
+        """Sleep between frames; at the idle tick, wake up for the next timer and fire it on time."""
+        if self.idle:
+            next_timer = timers.next_due()
+            if next_timer is not None:
+                seconds = min(seconds, next_timer - self.clock())
+        if seconds > 0:
+            (self.sleep or self.wakeup.wait)(seconds)
+        if self.idle and timers.run_due(self.clock()):
+            # Timers may have switched effects: rerun the loop to reschedule
+            self.wakeup.set()
+
+    def _scheduled_frame(self, frame):
+        fps = self.fps()
+        scheduler = self.scheduler
+        if self.last_frame is not None and frame > self.last_frame + 1:
+            FRAMES_DROPPED.inc(frame - self.last_frame - 1)
+        self.last_frame = frame
+        start = time.perf_counter()
+        now = scheduler.due_time(frame)
+        changed = self._render_frame(now)
+        if time.perf_counter() - start > 1 / scheduler.fps:
+            FRAME_OVERRUNS.inc()
+        if changed:
+            self.last_change = now
+            if self.idle:
+                # The output moves again: back to the effect's frame rate
+                self.idle = False
+                self.wakeup.set()
+        elif IDLE_FPS and not self.idle and scheduler.fps > IDLE_FPS and now - self.last_change >= IDLE_AFTER:
+            self.idle = True
+            self.wakeup.set()
+        if self.fps() != fps:
+            # A transition finished; rerun the loop to pick the new frame rate
+            self.wakeup.set()
+
+    def _render_frame(self, now):
+        """Compose and show the frame due at `now`. Returns True if any strip received a changed frame."""
+        started = False
+        if self.render_pool is not None and self.render_pool.pending:
+            started = self.render_pool.poll()
+        if timers.run_due(now) or started:
+            # Timers and render processes may have switched effects: rerun the loop after this frame to reschedule
+            self.wakeup.set()
+        for strip, expires in list(self.streams.items()):
+            if now >= expires:
+                # The stream went quiet: redraw the strip's segments over the last streamed frame
+                logger.info("Stream timed out", extra={"fields": {"strip": strip}})
+                del self.streams[strip]
+                for segment in segments.values():
+                    if segment.strip == strip:
+                        segment.compositor.invalidate()
+        active = list(segments.values())
+        start = time.perf_counter()
+        if SEGMENT_POOL_SIZE and len(active) >= SEGMENT_POOL_THRESHOLD:
+            if self.pool is None:
+                from concurrent.futures import ThreadPoolExecutor
+                self.pool = ThreadPoolExecutor(SEGMENT_POOL_SIZE, thread_name_prefix='segment')
+            changed = list(self.pool.map(lambda segment: segment.compositor.compose(now), active))
+        else:
+            changed = [segment.compositor.compose(now) for segment in active]
+        RENDER_SECONDS.observe(time.perf_counter() - start)
+        # Copy in definition order so later segments win where they overlap
+        dirty_strips = []
+        for segment, segment_changed in zip(active, changed):
+            if segment_changed and segment.strip not in self.streams:
+                segment.flush()
+                if segment.strip not in dirty_strips:
+                    dirty_strips.append(segment.strip)
+        sent = False
+        for strip in dirty_strips:
+            start = time.perf_counter()
+            if not strips[strip].show():
+                # Redrawn, but the same as the frame already on the strip
+                FRAMES_SKIPPED.inc()
+                continue
+            SHOW_SECONDS.observe(time.perf_counter() - start)
+            FRAMES_SHOWN.inc()
+            sent = True
+            for listener in frame_listeners:
+                listener(strip, strips[strip].buffer)
+        if self.switch_requested_at is not None:
+            self.last_switch_latency = time.perf_counter() - self.switch_requested_at
+            SWITCH_SECONDS.observe(self.last_switch_latency)
+            self.switch_requested_at = None
+        return sent
+
+def get_worker():
+    """Return the render worker, starting it if needed."""
+    global worker
+    if worker is None:
+        worker = RenderWorker()
+    return worker
+
+def add_frame_listener(listener):
+    """
+    Call listener(strip_name, buffer) after every frame shown on a strip.
+
+    Listeners run on the render thread and must return quickly; the buffer
+    is only valid during the call.
+    """
+    frame_listeners.append(listener)
+
+def set_transition_time(seconds):
+    """Set the cross-fade time used for the following effect switches."""
+    render_worker = get_worker()
+    render_worker.submit(lambda: render_worker.set_transition_time(max(0.0, seconds)))
+
+def add_strip(name, output):
+    """Register another physical strip (a pixel backend) under name."""
+    output.correction.update(gamma=pixels.correction.gamma, white_balance=pixels.correction.white_balance)
+    strips[name] = output
+
+def define_segment(name, start, length, strip=DEFAULT_STRIP, reverse=False, mirror=False, pixel_map=None):
+    """
+    Define (or redefine) a named segment of a strip.
+
+    Segments may overlap; where they do, the one defined last wins.
+    Redefining a segment stops the effect running on it. Effects that
+    take a pixel_map argument render by the coordinates of pixel_map
+    (one point per LED of the segment) when it is given.
+
+    Raises:
+        ValueError: If the strip is unknown, the segment does not fit on it
+            or the pixel map does not match its length.
+    """
+    global segments
+    if strip not in strips:
+        raise ValueError(f"Unknown strip: {strip}")
+    with segments_lock:
+        transition_time = worker.transition_time if worker is not None else TRANSITION_TIME
+        segment = Segment(name, strip, start, length, reverse, mirror, transition_time, pixel_map)
+        previous = segments.get(name)
+        segments = {**segments, name: segment}
+    retire_segment(previous)
+    return segment
+
+def remove_segment(name):
+    """Remove a segment; its LEDs keep their last frame."""
+    global segments
+    with segments_lock:
+        previous = segments.get(name)
+        segments = {key: value for key, value in segments.items() if key != name}
+    retire_segment(previous)
+
+def retire_segment(segment):
+    """Drop the layers of a segment that was replaced or removed, on the render thread."""
+    if segment is not None and worker is not None:
+        worker.submit(segment.compositor.clear)
+
+def set_frame_epoch(epoch):
+    """Render frame N of every effect at epoch + N / fps (monotonic time) from the next frame boundary on."""
+    render_worker = get_worker()
+    render_worker.submit(lambda: render_worker.set_epoch(epoch))
+
+def run_on_render_thread(command):
+    """Run command() on the render thread at the next frame boundary, e.g. to change timers."""
+    get_worker().submit(command)
+
+def show_stream_frame(strip, frame):
+    """Show a streamed frame on a strip at the next frame boundary."""
+    render_worker = get_worker()
+    render_worker.submit(lambda: render_worker.show_stream(strip, frame))
 
 def set_brightness(brightness):
-    """Set the brightness of the LED strip."""
-    pixels.brightness = max(0.0, min(brightness, 1.0))  # Clamp between 0.0 and 1.0
-    pixels.show()
-    print(f"Brightness set to {pixels.brightness}")
-
-def stop_current_effect():
-    """Signal the current effect to stop."""
-    global stop_event, effect_thread
-    if effect_thread and effect_thread.is_alive():
-        stop_event.set()
-        effect_thread.join()
-        print("Current effect stopped.")
-
-def start_effect(effect_func, *args, **kwargs):
-    """Start a new lighting effect in a separate thread."""
-    global effect_thread, stop_event
-    stop_current_effect()
-    stop_event.clear()
-    effect_thread = threading.Thread(target=effect_func, args=args, kwargs=kwargs)
-    effect_thread.start()
-    print(f"Effect {effect_func.__name__} started with args: {args}, kwargs: {kwargs}")
+    """Set the brightness of every LED strip at the next frame boundary."""
+    brightness = max(0.0, min(brightness, 1.0))  # Clamp between 0.0 and 1.0
+    render_worker = get_worker()
+    render_worker.submit(lambda: render_worker.set_brightness(brightness))
+    logger.info("Brightness set", extra={"fields": {"brightness": brightness}})
+
+def set_color_correction(gamma=None, white_balance=None):
+    """Set the output gamma and per-channel white balance at the next frame boundary."""
+    if white_balance is not None:
+        white_balance = tuple(max(0.0, min(scale, 1.0)) for scale in white_balance)
+    render_worker = get_worker()
+    render_worker.submit(lambda: render_worker.set_color_correction(gamma=gamma, white_balance=white_balance))
+    logger.info("Color correction set", extra={"fields": {"gamma": gamma, "white_balance": white_balance}})
+
+def stop_current_effect(segment=None):
+    """Signal the current effect of a segment (or all segments) to stop at the next frame boundary."""
+    render_worker = get_worker()
+    render_worker.submit(lambda: render_worker.clear_effect(segment))
+
+def start_effect(effect_func, *args, segment=DEFAULT_SEGMENT, **kwargs):
+    """Switch a segment to a new lighting effect at the next frame boundary."""
+    requested_at = time.perf_counter()  # Switch latency includes the wait in the queue
+    render_worker = get_worker()
+    render_worker.submit(lambda: render_worker.set_effect(segment, effect_func, args, kwargs, requested_at))
+    logger.info("Effect started", extra={"fields": {
+        "effect": effect_func.__name__, "segment": segment, "args": args, "kwargs": kwargs}})
+
+class Batch:
+    """
+    Collects controller changes and applies them in one worker command.
+
+    Every change in a batch lands on the same frame boundary, so no frame
+    ever shows part of it. Mirrors the module-level functions.
+    """
+
+    def __init__(self):
+        self.commands = []
+
+    def start_effect(self, effect_func, *args, segment=DEFAULT_SEGMENT, **kwargs):
+        self.commands.append(lambda render_worker, requested_at: render_worker.set_effect(
+            segment, effect_func, args, kwargs, requested_at))
+
+    def stop_current_effect(self, segment=None):
+        self.commands.append(lambda render_worker, requested_at: render_worker.clear_effect(segment))
+
+    def set_brightness(self, brightness):
+        brightness = max(0.0, min(brightness, 1.0))
+        self.commands.append(lambda render_worker, requested_at: render_worker.set_brightness(brightness))
+
+    def apply(self, render_worker):
+        """Apply the collected changes right away; only call this on the render thread."""
+        commands = self.commands
+        self.commands = []
+        requested_at = time.perf_counter()
+        for command in commands:
+            command(render_worker, requested_at)
+
+    def submit(self):
+        """Queue the collected changes as a single command."""
+        render_worker = get_worker()
+        commands = self.commands
+        self.commands = []
+        requested_at = time.perf_counter()
+
+        def apply_all():
+            for command in commands:
+                command(render_worker, requested_at)
+        render_worker.submit(apply_all)
+        logger.info("Batch submitted", extra={"fields": {"changes": len(commands)}})
+
+def get_frame_cache_stats():
+    """Return hit rate and memory use of the compiled effect timelines."""
+    return frame_cache.stats()
+
+def get_frame_stats():
+    """Return the frame statistics of the running (or last) effect."""
+    if worker is None or worker.scheduler is None:
+        return None
+    stats = worker.scheduler.stats()
+    stats["idle"] = worker.idle
+    stats["frames_sent"] = sum(output.frames_shown for output in strips.values())
+    stats["frames_skipped"] = sum(output.frames_skipped for output in strips.values())
+    return stats
+
+@functools.lru_cache(maxsize=None)
+def takes_pixel_map(effect_func):
+    """Return True if an effect setup function accepts a pixel_map argument."""
+    import inspect  # Deferred: slow to import, and only needed once an effect starts
+    try:
+        return 'pixel_map' in inspect.signature(effect_func).parameters
+    except (TypeError, ValueError):
+        return False
 
 def interpolate(color1, color2, factor):
     """
@@ -55,140 +782,194 @@ def interpolate(color1, color2, factor):
     """
     return tuple(int(c1 + (c2 - c1) * factor) for c1, c2 in zip(color1, color2))
 
-def color_fill(color):
+@effects.register(Param('color', 'color'))
+def color_fill(color, led_count=None):
     """Fill the strip with a single color."""
-    stop_event.clear()
-    pixels.fill(color)
-    pixels.show()
-    print(f"Color fill with {color}")
+    def render(frame, canvas):
+        canvas.fill(color)
+
+    logger.debug("Color fill", extra={"fields": {"color": color}})
+    return render, None
+
+def build_gradient_table(colors, gradient_steps_per_transition, length):
+    """
+    Precompute the rainbow gradient as a flat RGB byte table.
+
+    Position p of the table holds the color the strip shows at gradient
+    position p % total_steps, so any rotation of the gradient across the
+    strip is a contiguous slice of the table.
+
+    Args:
+        colors (list of tuples): List of RGB color tuples.
+        gradient_steps_per_transition (int): Steps between two colors.
+        length (int): Number of positions (pixels) to generate.
+
+    Returns:
+        bytearray: length * 3 bytes of RGB data.
+    """
+    num_colors = len(colors)
+    total_steps = num_colors * gradient_steps_per_transition
+    # interpolate() for every position at once
+    palette = np.array(colors, dtype=np.float64)
+    transition_index, step = np.divmod(np.arange(total_steps), gradient_steps_per_transition)
+    color1 = palette[transition_index % num_colors]
+    color2 = palette[(transition_index + 1) % num_colors]
+    factor = (step / gradient_steps_per_transition)[:, None]
+    gradient = np.clip(np.trunc(color1 + (color2 - color1) * factor), 0, 255).astype(np.uint8)
+    # Repeat the gradient until it covers the requested length
+    return bytearray(np.resize(gradient.reshape(-1), length * 3))
 
-def rainbow_cycle(colors, wait=0.05, gradient_steps_per_transition=20):
+@effects.register(Param('colors', 'colors', minimum=2, maximum=256),
+                  Param('wait', 'float', 0.05, 0.0, 60.0),
+                  Param('gradient_steps', 'int', 20, 1, 1000),
+                  Param('angle', 'float', 0.0, -360.0, 360.0))
+def rainbow_cycle(colors, wait=0.05, gradient_steps_per_transition=20, angle=0.0, led_count=None, pixel_map=None):
     """
     Cycle through a list of colors with smooth gradients, moving left.
 
     Args:
         colors (list of tuples): List of RGB color tuples.
         wait (float): Time to wait between cycles in seconds.
+        angle (float): Direction the gradient runs in on the pixel map, in degrees.
+        led_count (int): Number of LEDs to render, defaults to LED_COUNT.
+        pixel_map (PixelMap): LED coordinates; without one the gradient
+            runs along the strip (turned around for angles past 90 degrees).
     """
     try:
-        print(f"Starting rainbow_cycle with colors: {colors}, wait: {wait}")
+        led_count = led_count or LED_COUNT
+        logger.debug("Starting rainbow_cycle", extra={"fields": {"colors": colors, "wait": wait}})
         num_colors = len(colors)
         if num_colors < 2:
-            print("At least two colors are required for a gradient.")
+            logger.error("At least two colors are required for a gradient.")
             return
 
         # Total number of steps in the entire cycle
         total_steps = num_colors * gradient_steps_per_transition
 
-        # Initialize step offset
-        step = 0
+        if pixel_map is None and not angle % 360:
+            # Every frame is a window of led_count pixels into the gradient table,
+            # so consecutive frames are one pixel (3 bytes) apart
+            key = ('rainbow_cycle', repr((colors, gradient_steps_per_transition)), led_count)
+            timeline = frame_cache.get(key, lambda: Timeline(
+                build_gradient_table(colors, gradient_steps_per_transition, total_steps + led_count),
+                total_steps, led_count * 3, stride=3), (total_steps + led_count) * 3)
+            if timeline is not None:
+                return play_timeline(timeline), fps_for_wait(wait)
+            # Too large for the frame cache: look every frame up in the table instead
 
-        while not stop_event.is_set():
-            for i in range(LED_COUNT):
-                # Calculate the position in the gradient
-                pos = (i + step) % total_steps
+        # Spread the same led_count gradient positions along the axis of the map
+        pixel_map = pixel_map or pixelmap.linear(led_count)
+        positions = np.rint(pixel_map.along(angle) * (led_count - 1)).astype(np.intp)
+        table = np.frombuffer(build_gradient_table(colors, gradient_steps_per_transition, total_steps),
+                              dtype=np.uint8).reshape(-1, 3)
+        index = np.empty_like(positions)
 
-                # Determine which transition this position is in
-                transition_index = pos // gradient_steps_per_transition
-                # Find the two colors to interpolate between
-                color1 = colors[transition_index % num_colors]
-                color2 = colors[(transition_index + 1) % num_colors]
-                # Determine the interpolation factor
-                factor = (pos % gradient_steps_per_transition) / gradient_steps_per_transition
-                # Interpolate the color
-                color = interpolate(color1, color2, factor)
-
-                # Assign the color to the pixel
-                pixels[i] = color
-
-            # Update the LEDs
-            pixels.show()
-
-            # Increment step to move the gradient
-            step = (step + 1) % total_steps
-
-            # Wait before the next update
-            time.sleep(wait)
+        def render(frame, canvas):
+            np.add(positions, frame % total_steps, out=index)
+            np.remainder(index, total_steps, out=index)
+            np.take(table, index, axis=0, out=np.frombuffer(canvas.buffer, dtype=np.uint8).reshape(-1, 3))
+        return render, fps_for_wait(wait)
     except Exception as e:
-        print(f"Error in rainbow_cycle: {e}")
+        logger.error("Effect setup failed", extra={"fields": {"effect": "rainbow_cycle", "error": str(e)}})
 
-def breathing_effect(color, steps=50, wait=0.05):
+@effects.register(Param('color', 'color'),
+                  Param('steps', 'int', 50, 1, 1000),
+                  Param('wait', 'float', 0.05, 0.0, 60.0))
+def breathing_effect(color, steps=50, wait=0.05, led_count=None):
     """Create a breathing effect by gradually adjusting brightness."""
     try:
-        while not stop_event.is_set():
-            for step_val in range(steps):
-                if stop_event.is_set():
-                    break
-                brightness = step_val / steps
-                scaled_color = tuple(int(c * brightness) for c in color)
-                pixels.fill(scaled_color)
-                pixels.show()
-                time.sleep(wait)
-            for step_val in range(steps, 0, -1):
-                if stop_event.is_set():
-                    break
-                brightness = step_val / steps
-                scaled_color = tuple(int(c * brightness) for c in color)
-                pixels.fill(scaled_color)
-                pixels.show()
-                time.sleep(wait)
+        led_count = led_count or LED_COUNT
+
+        def render(frame, canvas):
+            # Ramp up over the first `steps` frames, then back down
+            step_val = frame % (2 * steps)
+            if step_val > steps:
+                step_val = 2 * steps - step_val
+            brightness = step_val / steps
+            scaled_color = tuple(int(c * brightness) for c in color)
+            canvas.fill(scaled_color)
+
+        # The effect repeats every 2 * steps frames: compile them once and replay
+        key = ('breathing_effect', repr((color, steps)), led_count)
+        timeline = frame_cache.get(key, lambda: render_timeline(render, 2 * steps, led_count), 2 * steps * led_count * 3)
+        if timeline is None:
+            # Too large for the frame cache: render every frame
+            return render, fps_for_wait(wait)
+        return play_timeline(timeline), fps_for_wait(wait)
     except Exception as e:
-        print(f"Error in breathing_effect: {e}")
+        logger.error("Effect setup failed", extra={"fields": {"effect": "breathing_effect", "error": str(e)}})
 
-def theater_chase(color, alternate_color, wait=0.1):
+@effects.register(Param('color', 'color'),
+                  Param('alternate_color', 'color'),
+                  Param('wait', 'float', 0.1, 0.0, 60.0))
+def theater_chase(color, alternate_color, wait=0.1, led_count=None):
     """Create a theater chase effect."""
     try:
-        while not stop_event.is_set():
+        led_count = led_count or LED_COUNT
+        def compile_chase():
+            # The chase repeats every three frames
+            frames = bytearray()
             for offset in range(3):
-                if stop_event.is_set():
-                    break
-                for i in range(LED_COUNT):
-                    if (i + offset) % 3 == 0:
-                        pixels[i] = color
-                    else:
-                        pixels[i] = alternate_color
-                pixels.show()
-                time.sleep(wait)
+                for i in range(led_count):
+                    frames.extend(color if (i + offset) % 3 == 0 else alternate_color)
+            return Timeline(frames, 3, led_count * 3)
+
+        key = ('theater_chase', repr((color, alternate_color)), led_count)
+        timeline = frame_cache.get(key, compile_chase, 3 * led_count * 3)
+        if timeline is None:
+            # Too large for the frame cache: copy the frames from an uncached timeline
+            timeline = compile_chase()
+        return play_timeline(timeline), fps_for_wait(wait)
     except Exception as e:
-        print(f"Error in theater_chase: {e}")
+        logger.error("Effect setup failed", extra={"fields": {"effect": "theater_chase", "error": str(e)}})
 
-def sparkle_effect(color, alternate_color, count=20, wait=0.05, fade_steps=10):
-    """Create a sparkle effect with fading."""
+@effects.register(Param('color', 'color'),
+                  Param('alternate_color', 'color'),
+                  Param('count', 'int', 20, 1, 10000),
+                  Param('wait', 'float', 0.05, 0.0, 60.0),
+                  Param('fade_steps', 'int', 10, 1, 1000))
+def sparkle_effect(color, alternate_color, count=20, wait=0.05, fade_steps=10, led_count=None):
+    """
+    Create a sparkle effect with fading.
+
+    Up to `count` sparkles are on the strip at once. Each one holds the
+    color for fade_steps ticks of wait / fade_steps seconds, fades back
+    to the alternate color over another fade_steps ticks and then
+    reappears at a random pixel. The sparkles live in arrays (pixel and
+    age) and all of them advance in one vectorized step per frame.
+    """
     try:
-        while not stop_event.is_set():
-            # Fill the LEDs with the alternate color
-            pixels.fill(alternate_color)
-            pixels.show()
-
-            # Perform the sparkle effect with the primary color
-            for _ in range(count):
-                if stop_event.is_set():
-                    break
-                pixel_index = random.randint(0, LED_COUNT - 1)
-
-                # Set the initial sparkle color
-                pixels[pixel_index] = color
-                pixels.show()
-                time.sleep(wait)
-
-                # Gradually fade back to the alternate color
-                for step_val in range(fade_steps):
-                    if stop_event.is_set():
-                        break
-                    brightness = 1 - (step_val / fade_steps)
-                    faded_color = tuple(
-                        int(c * brightness + a * (1 - brightness))
-                        for c, a in zip(color, alternate_color)
-                    )
-                    pixels[pixel_index] = faded_color
-                    pixels.show()
-                    time.sleep(wait / fade_steps)
-
-                # Ensure it ends at the alternate color
-                pixels[pixel_index] = alternate_color
-                pixels.show()
+        led_count = led_count or LED_COUNT
+        fade_steps = max(1, fade_steps)
+        lifetime = 2 * fade_steps
+        # Color of a sparkle by age: held, then blended back to the alternate color
+        brightness = np.minimum(1.0, (lifetime - np.arange(lifetime)) / fade_steps)[:, None]
+        ramp = np.rint(np.array(color) * brightness + np.array(alternate_color) * (1 - brightness)).astype(np.uint8)
+        rng = np.random.default_rng(RANDOM_SEED)
+        # Spread the ages so the sparkles do not all appear at once
+        ages = np.arange(count) * lifetime // count
+        pixels = rng.integers(0, led_count, count)
+        state = {"frame": None}
+
+        def render(frame, canvas):
+            out = np.frombuffer(canvas.buffer, dtype=np.uint8).reshape(-1, 3)
+            if state["frame"] is None or frame < state["frame"]:
+                out[:] = alternate_color
+            else:
+                # Restore the pixels lit in the last frame, then age every sparkle
+                out[pixels] = alternate_color
+                ages[:] += frame - state["frame"]
+                expired = ages >= lifetime
+                respawned = np.count_nonzero(expired)
+                if respawned:
+                    ages[expired] %= lifetime
+                    pixels[expired] = rng.integers(0, led_count, respawned)
+            state["frame"] = frame
+            out[pixels] = ramp[ages]
+
+        return render, fps_for_wait(wait / fade_steps)
     except Exception as e:
-        print(f"Error in sparkle_effect: {e}")
+        logger.error("Effect setup failed", extra={"fields": {"effect": "sparkle_effect", "error": str(e)}})
 
 def wheel(pos):
     """Generate rainbow colors across 0-255 positions."""
@@ -201,8 +982,108 @@ def wheel(pos):
         pos -= 170
         return (pos * 3, 0, 255 - pos * 3)
 
-def cleanup():
-    """Turn off all LEDs."""
-    pixels.fill((0, 0, 0))
-    pixels.show()
-    print("Cleanup: All LEDs turned off.")
+WHEEL = np.array([wheel(pos) for pos in range(256)], dtype=np.uint8)  # wheel() as a lookup table
+
+def wheel_colors(turns, out):
+    """Vectorized wheel(): the colors of an array of positions in turns (1.0 is the whole wheel) into out."""
+    index = (turns * 256).astype(np.intp)
+    np.bitwise_and(index, 255, out=index)
+    np.take(WHEEL, index, axis=0, out=out)
+
+def field_effect(shader, pixel_map, fps):
+    """
+    Build a render function from shader(x, y, t, out).
+
+    The shader gets the normalized coordinates of every pixel of the map
+    and the time in seconds, and writes the (N, 3) uint8 colors of all
+    pixels into out at once.
+    """
+    def render(frame, canvas):
+        shader(pixel_map.x, pixel_map.y, frame / fps, np.frombuffer(canvas.buffer, dtype=np.uint8).reshape(-1, 3))
+    return render, fps
+
+@effects.register(Param('angle', 'float', 0.0, -360.0, 360.0),
+                  Param('spread', 'float', 1.0, 0.0, 100.0),
+                  Param('speed', 'float', 0.25, -100.0, 100.0),
+                  Param('wait', 'float', 1 / 60, 0.0, 60.0))
+def wheel_sweep(angle=0.0, spread=1.0, speed=0.25, wait=1 / 60, led_count=None, pixel_map=None):
+    """
+    Sweep the color wheel across the pixel map along an axis.
+
+    Args:
+        angle (float): Direction of the sweep in degrees, 0 along x, 90 along y.
+        spread (float): Times the wheel repeats across the map.
+        speed (float): Turns of the wheel per second.
+    """
+    try:
+        pixel_map = pixel_map or pixelmap.linear(led_count or LED_COUNT)
+        offset = pixel_map.along(angle) * spread
+        scratch = np.empty_like(offset)
+
+        def shader(x, y, t, out):
+            np.add(offset, (t * speed) % 1.0, out=scratch)
+            wheel_colors(scratch, out)
+        return field_effect(shader, pixel_map, fps_for_wait(wait))
+    except Exception as e:
+        logger.error("Effect setup failed", extra={"fields": {"effect": "wheel_sweep", "error": str(e)}})
+
+@effects.register(Param('scale', 'float', 2.0, 0.0, 100.0),
+                  Param('speed', 'float', 1.0, -100.0, 100.0),
+                  Param('wait', 'float', 1 / 60, 0.0, 60.0))
+def plasma(scale=2.0, speed=1.0, wait=1 / 60, led_count=None, pixel_map=None):
+    """
+    Rainbow plasma from interfering sine waves over the pixel map.
+
+    Args:
+        scale (float): Wave periods across the map; larger is busier.
+        speed (float): Animation speed.
+    """
+    try:
+        pixel_map = pixel_map or pixelmap.linear(led_count or LED_COUNT)
+        waves = 2 * np.pi * scale
+        radius = pixel_map.radius * waves
+        field = np.empty_like(radius)
+        term = np.empty_like(radius)
+
+        def shader(x, y, t, out):
+            phase = t * speed
+            np.multiply(x, waves, out=field)
+            np.sin(np.add(field, phase, out=field), out=field)
+            np.multiply(y, waves, out=term)
+            np.sin(np.subtract(term, phase * 0.7, out=term), out=term)
+            np.add(field, term, out=field)
+            np.sin(np.subtract(radius, phase * 1.3, out=term), out=term)
+            np.add(field, term, out=field)
+            # Three waves sum to -3..3: one turn of the wheel, drifting with time
+            np.multiply(field, 1 / 6, out=field)
+            np.add(field, 0.5 + phase * 0.05, out=field)
+            wheel_colors(field, out)
+        return field_effect(shader, pixel_map, fps_for_wait(wait))
+    except Exception as e:
+        logger.error("Effect setup failed", extra={"fields": {"effect": "plasma", "error": str(e)}})
+
+def cleanup(segment=None, timeout=1.0):
+    """
+    Turn off the LEDs of a segment (or all LEDs) at the next frame boundary.
+
+    Waits up to timeout seconds for the render worker to get there, so
+    the LEDs are off when a shutting-down caller exits.
+    """
+    def turn_off():
+        if segment is None:
+            for output in strips.values():
+                output.fill((0, 0, 0))
+                output.show()
+            logger.info("All LEDs turned off")
+        elif segment in segments:
+            target = segments[segment]
+            target.canvas.fill((0, 0, 0))
+            target.flush()
+            strips[target.strip].show()
+            logger.info("Segment turned off", extra={"fields": {"segment": segment}})
+    render_worker = get_worker()
+    render_worker.submit(turn_off)
+    render_worker.flush(timeout)
+
+# The default segment covers the whole default strip
+define_segment(DEFAULT_SEGMENT, 0, LED_COUNT, pixel_map=pixelmap.load(PIXEL_MAP) if PIXEL_MAP else None)
@@ -1,18 +1,205 @@
+import atexit
 import json
+import logging
 import os
 import threading
 
-database = {}
+DB_PATH = os.environ.get('LED_DB_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'state.journal'))
+FLUSH_INTERVAL = 0.5  # Seconds between background journal flushes
+COMPACT_MIN_RECORDS = 1000  # Never compact journals shorter than this
+COMPACT_RATIO = 4  # Compact once the journal holds this many records per live key
+
+_DELETED = object()  # Marks a pending delete in the write-behind batch
+
+logger = logging.getLogger('db')
+
+class JournalStore:
+    """
+    Thread-safe in-memory key/value store backed by an append-only journal.
+
+    Reads and writes only touch the in-memory dict. Changes are collected
+    in a pending batch (later writes to a key replace earlier ones) that a
+    background thread appends to the journal as JSON lines every
+    flush_interval seconds, so callers never wait for disk I/O. On startup
+    the journal is replayed into memory; once it grows well past the
+    number of live keys it is rewritten as a snapshot.
+
+    Args:
+        path (str): Journal file path.
+        flush_interval (float): Seconds between background flushes.
+    """
+
+    def __init__(self, path, flush_interval=FLUSH_INTERVAL):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.data = {}
+        self.pending = {}
+        self.records = 0
+        self.watchers = []
+        self.lock = threading.Lock()  # Guards data and pending
+        self.write_lock = threading.Lock()  # Serializes journal writes
+        self.closed = threading.Event()
+        self._replay()
+        self.thread = threading.Thread(target=self._run, name='db-writer', daemon=True)
+        self.thread.start()
+
+    def _replay(self):
+        try:
+            with open(self.path, 'rb+') as journal:
+                good_size = 0
+                for line in journal:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # A torn write from a power cut: drop it so later appends stay readable
+                        journal.truncate(good_size)
+                        break
+                    if 'd' in record:
+                        self.data.pop(record['d'], None)
+                    else:
+                        self.data[record['k']] = record['v']
+                    self.records += 1
+                    good_size += len(line)
+        except FileNotFoundError:
+            pass
+
+    def set(self, key, value):
+        """Store value under key."""
+        with self.lock:
+            self.data[key] = value
+            self.pending[key] = value
+        self._notify({key: value})
+
+    def delete(self, keys):
+        """Remove keys; missing keys are ignored."""
+        with self.lock:
+            for key in keys:
+                self.data.pop(key, None)
+                self.pending[key] = _DELETED
+        self._notify(dict.fromkeys(keys))
+
+    def batch(self, operations):
+        """Apply ('write', key, value) and ('delete', keys) operations in order, all at once."""
+        changes = {}
+        with self.lock:
+            for operation in operations:
+                if operation[0] == 'write':
+                    _, key, value = operation
+                    self.data[key] = value
+                    self.pending[key] = value
+                    changes[key] = value
+                else:
+                    for key in operation[1]:
+                        self.data.pop(key, None)
+                        self.pending[key] = _DELETED
+                        changes[key] = None
+        self._notify(changes)
+
+    def watch(self, callback):
+        """Call callback({key: value or None if deleted}) after every change."""
+        self.watchers.append(callback)
+
+    def _notify(self, changes):
+        for callback in self.watchers:
+            callback(changes)
+
+    def get(self, keys):
+        """Return {key: value} for keys, with None for missing keys."""
+        with self.lock:
+            return {key: self.data.get(key) for key in keys}
+
+    def items(self, prefix=''):
+        """Return {key: value} for every string key starting with prefix."""
+        with self.lock:
+            # Older servers accepted other JSON keys; they never match a prefix
+            return {key: value for key, value in self.data.items()
+                    if isinstance(key, str) and key.startswith(prefix)}
+
+    def flush(self):
+        """Append the pending batch to the journal and sync it to disk."""
+        with self.write_lock:
+            with self.lock:
+                batch, self.pending = self.pending, {}
+                lines = [json.dumps({'d': key} if value is _DELETED else {'k': key, 'v': value}) + '\n'
+                         for key, value in batch.items()]
+                compact = (self.records + len(lines) >= COMPACT_MIN_RECORDS
+                           and self.records + len(lines) >= COMPACT_RATIO * max(1, len(self.data)))
+                if compact:
+                    lines = [json.dumps({'k': key, 'v': value}) + '\n' for key, value in self.data.items()]
+            try:
+                if compact:
+                    self._write(lines, self.path + '.tmp', 'w')
+                    os.replace(self.path + '.tmp', self.path)
+                    self.records = len(lines)
+                elif lines:
+                    self._write(lines, self.path, 'a')
+                    self.records += len(lines)
+            except OSError:
+                # Keep the batch for the next flush, behind anything written since
+                with self.lock:
+                    self.pending = {**batch, **self.pending}
+                raise
+
+    def _write(self, lines, path, mode):
+        with open(path, mode, encoding='utf-8') as journal:
+            journal.writelines(lines)
+            journal.flush()
+            os.fsync(journal.fileno())
+
+    def _run(self):
+        while not self.closed.wait(self.flush_interval):
+            try:
+                self.flush()
+            except OSError as e:
+                logger.error("Journal write failed", extra={"fields": {"path": self.path, "error": str(e)}})
+
+    def close(self):
+        """Stop the background writer and flush what is left."""
+        self.closed.set()
+        self.thread.join()
+        self.flush()
+
+store = None  # The state store, opened on first use
+store_lock = threading.Lock()
+
+def get_store():
+    """Return the state store, opening (and replaying) it if needed."""
+    global store
+    if store is None:
+        with store_lock:
+            if store is None:
+                store = JournalStore(DB_PATH)
+                atexit.register(store.close)
+    return store
 
 def update_database(key, value):
     """Update a specific key in the database."""
-    database[key] = value
+    get_store().set(key, value)
+
+def update_database_many(items):
+    """Update several (key, value) pairs at once."""
+    get_store().batch([('write', key, value) for key, value in items])
+
+def apply_database_batch(operations):
+    """Apply ('write', key, value) and ('delete', keys) operations in order, all at once."""
+    get_store().batch(operations)
 
 def remove_from_database(keys):
     """Remove specific keys from the database."""
-    for key in keys:
-        database.pop(key, None)
+    get_store().delete(keys)
 
 def get_from_database(keys):
     """Retrieve specific keys from the database."""
-    return {key: database.get(key) for key in keys}
+    return get_store().get(keys)
+
+def find_in_database(prefix):
+    """Retrieve every key starting with prefix."""
+    return get_store().items(prefix)
+
+def watch_database(callback):
+    """Call callback({key: value or None if deleted}) after every change."""
+    get_store().watch(callback)
+
+def flush_database():
+    """Write all pending changes to disk now."""
+    get_store().flush()
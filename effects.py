@@ -0,0 +1,238 @@
+# effects.py
+
+"""
+Registry of lighting effects and the parameters they accept.
+
+Every effect declares its parameters once, with their type, default and
+bounds. The registry turns the declarations into a validator when the
+effect registers, so a request only runs a list of prepared converters.
+
+Effects outside controller.py live in plugin modules: every module of
+the plugins package, plus the modules named in LED_PLUGINS (comma
+separated). Plugins are imported the first time an effect is looked up
+that is not built in, or when the effects are listed, not at startup.
+"""
+
+import importlib
+import logging
+import os
+import pkgutil
+import threading
+
+PLUGINS = [name for name in os.environ.get('LED_PLUGINS', '').split(',') if name]
+
+REQUIRED = object()  # Default of parameters the request has to provide
+
+logger = logging.getLogger('effects')
+
+class Param:
+    """
+    One effect parameter.
+
+    Args:
+        name (str): Field name in the request, in the order the effect takes its arguments.
+        kind (str): 'int', 'float', 'color' (an [R, G, B] list) or 'colors' (a list of colors).
+        default: Value used when the field is missing; REQUIRED if it must be given.
+        minimum: Smallest allowed value (for 'colors', the smallest number of colors).
+        maximum: Largest allowed value (for 'colors', the largest number of colors).
+    """
+
+    def __init__(self, name, kind, default=REQUIRED, minimum=None, maximum=None):
+        if kind not in CONVERTERS:
+            raise ValueError(f"Unknown parameter kind: {kind}")
+        self.name = name
+        self.kind = kind
+        self.default = default
+        self.minimum = minimum
+        self.maximum = maximum
+
+    def describe(self):
+        schema = {"name": self.name, "type": self.kind, "required": self.default is REQUIRED}
+        if self.default is not REQUIRED:
+            schema["default"] = self.default
+        if self.minimum is not None:
+            schema["minimum"] = self.minimum
+        if self.maximum is not None:
+            schema["maximum"] = self.maximum
+        return schema
+
+def _bounded(convert, minimum, maximum):
+    """Wrap a scalar converter with a range check."""
+    if minimum is None and maximum is None:
+        return convert
+    low = float('-inf') if minimum is None else minimum
+    high = float('inf') if maximum is None else maximum
+
+    def check(value):
+        value = convert(value)
+        if not low <= value <= high:
+            raise ValueError
+        return value
+    return check
+
+def _convert_color(value):
+    if not isinstance(value, list) or len(value) != 3:
+        raise ValueError
+    color = [int(c) for c in value]
+    if not all(0 <= c <= 255 for c in color):
+        raise ValueError
+    return color
+
+def _compile_int(param):
+    return _bounded(int, param.minimum, param.maximum), "an integer"
+
+def _compile_float(param):
+    return _bounded(float, param.minimum, param.maximum), "a number"
+
+def _compile_color(param):
+    return _convert_color, "a list of three integers [R, G, B] from 0 to 255"
+
+def _compile_colors(param):
+    low = param.minimum or 0
+    high = float('inf') if param.maximum is None else param.maximum
+
+    def convert(value):
+        if not isinstance(value, list) or not low <= len(value) <= high:
+            raise ValueError
+        return [_convert_color(color) for color in value]
+    return convert, "a list of RGB lists, e.g., [[R, G, B], ...]"
+
+CONVERTERS = {
+    'int': _compile_int,
+    'float': _compile_float,
+    'color': _compile_color,
+    'colors': _compile_colors,
+}
+
+def _range_text(param):
+    if param.kind == 'colors':
+        if param.minimum and param.maximum is None:
+            return f" with at least {param.minimum} colors"
+        if param.minimum is not None or param.maximum is not None:
+            return f" with {param.minimum or 0} to {param.maximum} colors"
+        return ""
+    if param.minimum is not None and param.maximum is not None:
+        return f" from {param.minimum} to {param.maximum}"
+    if param.minimum is not None:
+        return f" of at least {param.minimum}"
+    if param.maximum is not None:
+        return f" of at most {param.maximum}"
+    return ""
+
+class Effect:
+    """
+    A registered effect: its setup function and compiled parameter validator.
+
+    The setup function is called as function(*arguments, led_count=...),
+    with the arguments in the order the parameters were declared, and
+    with pixel_map=... as well if it takes one and the segment has a map.
+    Unless offload is False, it may run in a render process (see
+    renderproc.py), so it must not depend on state of the server process.
+    """
+
+    def __init__(self, name, function, params, description='', offload=True):
+        self.name = name
+        self.function = function
+        self.params = params
+        self.description = description
+        self.offload = offload
+        # Compile the schema into (name, default, converter, error message) steps
+        self.fields = []
+        for param in params:
+            convert, expected = CONVERTERS[param.kind](param)
+            message = f"Invalid {param.name}. Provide {expected}{_range_text(param)}."
+            self.fields.append((param.name, param.default, convert, message))
+
+    def validate(self, data):
+        """
+        Convert and check request data against the schema.
+
+        :return: Tuple of (params, error_message)
+        """
+        if not isinstance(data, dict):
+            return None, "Parameters must be an object."
+        params = {}
+        for name, default, convert, message in self.fields:
+            value = data.get(name, default)
+            if value is REQUIRED:
+                return None, f"Missing required field: {name}"
+            try:
+                params[name] = convert(value)
+            except (TypeError, ValueError):
+                return None, message
+        return params, None
+
+    def arguments(self, params):
+        """
+        Return the positional arguments for the setup function from validated params.
+
+        Optional parameters missing from params (saved before the effect
+        declared them) take their defaults.
+        """
+        return [params[name] if name in params or default is REQUIRED else default
+                for name, default, _, _ in self.fields]
+
+    def describe(self):
+        return {
+            "name": self.name,
+            "description": self.description,
+            "params": [param.describe() for param in self.params],
+        }
+
+registry = {}  # Effects by name
+_plugins_loaded = False
+_plugins_lock = threading.Lock()
+
+def register(*params, name=None, description=None, offload=True):
+    """
+    Decorator that registers an effect setup function with its parameters.
+
+    The effect is registered under the function's name unless name is
+    given; the description defaults to the first line of its docstring.
+    Pass offload=False for effects that read live state of the server
+    process (e.g. an audio input), so they never run in a render process.
+    """
+    def decorate(function):
+        effect_name = name or function.__name__
+        text = description
+        if text is None:
+            text = (function.__doc__ or '').strip().split('\n')[0]
+        if effect_name in registry:
+            raise ValueError(f"Effect already registered: {effect_name}")
+        registry[effect_name] = Effect(effect_name, function, list(params), text, offload)
+        return function
+    return decorate
+
+def load_plugins():
+    """Import the plugin modules once, registering their effects."""
+    global _plugins_loaded
+    if _plugins_loaded:
+        return
+    with _plugins_lock:
+        if _plugins_loaded:
+            return
+        import plugins
+        names = [f"plugins.{module.name}" for module in pkgutil.iter_modules(plugins.__path__)] + PLUGINS
+        for module in names:
+            try:
+                importlib.import_module(module)
+            except Exception as e:
+                logger.error("Could not load plugin", extra={"fields": {"plugin": module, "error": str(e)}})
+        _plugins_loaded = True
+
+def get_effect(name):
+    """Return the effect registered under name, or None."""
+    effect = registry.get(name)
+    if effect is None and not _plugins_loaded:
+        load_plugins()
+        effect = registry.get(name)
+    return effect
+
+def list_effects():
+    """Return every registered effect, including those from plugins, sorted by name."""
+    load_plugins()
+    return [registry[name] for name in sorted(registry)]
+
+def offloadable(function):
+    """Return True if an effect setup function is registered and may run in a render process."""
+    return any(effect.function is function and effect.offload for effect in registry.values())
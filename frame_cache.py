@@ -0,0 +1,132 @@
+# frame_cache.py
+
+import collections
+import threading
+from backends import Canvas
+
+FRAME_CACHE_BYTES = 16 * 1024 * 1024  # Memory budget for all cached timelines
+
+class Timeline:
+    """
+    One period of a periodic effect, pre-rendered into a contiguous buffer.
+
+    Frame n is the frame_size bytes starting at (n % period) * stride.
+    Usually frames follow each other (stride == frame_size), but effects
+    that rotate a pattern can let consecutive frames overlap by using a
+    smaller stride.
+
+    A run of identical consecutive frames shares an id (the position of
+    the first of them in the period), so a player can tell that the next
+    frame looks the same as the one on screen without comparing pixels.
+    Each frame is only compared with the one before it, in place. Strided
+    timelines scroll a pattern and are not compared at all.
+    """
+
+    def __init__(self, data, period, frame_size, stride=None):
+        self.data = data
+        self.view = memoryview(data)
+        self.period = period
+        self.frame_size = frame_size
+        self.stride = frame_size if stride is None else stride
+        self.nbytes = len(data)
+        if self.stride != frame_size:
+            self.ids = range(period)
+            return
+        self.ids = [0] * period
+        for n in range(1, period):
+            self.ids[n] = self.ids[n - 1] if self.frame(n) == self.frame(n - 1) else n
+
+    def frame(self, n):
+        """Return a view of frame n, wrapping around the period."""
+        offset = (n % self.period) * self.stride
+        return self.view[offset:offset + self.frame_size]
+
+class FrameCache:
+    """
+    LRU cache of compiled timelines, bounded by their total size in bytes.
+
+    Args:
+        max_bytes (int): Memory budget; timelines larger than it are not kept.
+    """
+
+    def __init__(self, max_bytes=FRAME_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.timelines = collections.OrderedDict()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def get(self, key, build, nbytes=None):
+        """
+        Return the timeline cached under key, calling build() to compile it on a miss.
+
+        Args:
+            nbytes (int): Size of the timeline build() returns. When it is
+                over the memory budget, nothing is built and None is returned.
+        """
+        with self.lock:
+            timeline = self.timelines.get(key)
+            if timeline is not None:
+                self.timelines.move_to_end(key)
+                self.hits += 1
+                return timeline
+            self.misses += 1
+            if nbytes is not None and nbytes > self.max_bytes:
+                return None
+        timeline = build()
+        with self.lock:
+            if timeline.nbytes <= self.max_bytes and key not in self.timelines:
+                self.timelines[key] = timeline
+                self.nbytes += timeline.nbytes
+                while self.nbytes > self.max_bytes:
+                    _, evicted = self.timelines.popitem(last=False)
+                    self.nbytes -= evicted.nbytes
+                    self.evictions += 1
+        return timeline
+
+    def clear(self):
+        with self.lock:
+            self.timelines.clear()
+            self.nbytes = 0
+
+    def stats(self):
+        """Return hit rate, entry count and memory use."""
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.timelines),
+                "bytes": self.nbytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+def render_timeline(render, period, led_count):
+    """Compile frames 0..period-1 of render(frame, canvas) into a Timeline."""
+    canvas = Canvas(led_count)
+    frame_size = len(canvas.buffer)
+    data = bytearray(period * frame_size)
+    for frame in range(period):
+        render(frame, canvas)
+        data[frame * frame_size:(frame + 1) * frame_size] = canvas.buffer
+    return Timeline(data, period, frame_size)
+
+def play_timeline(timeline):
+    """
+    Return a render function that copies frame n of the timeline to the
+    canvas, or returns False when frame n looks the same as the last one.
+    """
+    shown = None
+
+    def render(frame, canvas):
+        nonlocal shown
+        frame_id = timeline.ids[frame % timeline.period]
+        if frame_id == shown:
+            return False
+        shown = frame_id
+        canvas.write(timeline.frame(frame))
+    return render
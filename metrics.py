@@ -0,0 +1,198 @@
+# metrics.py
+
+"""
+Low-overhead metrics with Prometheus text exposition, plus structured logging.
+
+Histograms have fixed buckets and preallocated counters, so recording an
+observation only does a bisect and two in-place increments; no containers
+are allocated on the hot path. Counters and plain histograms have a
+single writer (the render loop); the labeled families observed from the
+HTTP threads lock every observation.
+"""
+
+import bisect
+import json
+import logging
+import sys
+import threading
+
+# Bucket upper bounds in seconds, from 50 us to 1 s
+LATENCY_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                   0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+class Counter:
+    """A monotonically increasing count."""
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def expose(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter",
+                f"{self.name} {self.value}"]
+
+class Gauge:
+    """
+    A value that goes up and down.
+
+    Args:
+        function (callable): Optional function returning the value at scrape time.
+    """
+
+    def __init__(self, name, help_text, function=None):
+        self.name = name
+        self.help = help_text
+        self.function = function
+        self.value = 0.0
+
+    def set(self, value):
+        self.value = value
+
+    def expose(self):
+        value = self.function() if self.function else self.value
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge",
+                f"{self.name} {value}"]
+
+class Histogram:
+    """
+    Fixed-bucket histogram.
+
+    Args:
+        name (str): Metric name.
+        help_text (str): Metric description.
+        buckets (tuple): Sorted bucket upper bounds.
+        labels (str): Preformatted label pairs, e.g. 'route="/stop"'.
+    """
+
+    def __init__(self, name, help_text, buckets=LATENCY_BUCKETS, labels=''):
+        self.name = name
+        self.help = help_text
+        self.buckets = buckets
+        self.labels = labels
+        # One count per bucket plus the +Inf overflow bucket
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def samples(self):
+        separator = ',' if self.labels else ''
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            cumulative += count
+            le = '+Inf' if bound == float('inf') else repr(bound)
+            lines.append(f'{self.name}_bucket{{{self.labels}{separator}le="{le}"}} {cumulative}')
+        suffix = f"{{{self.labels}}}" if self.labels else ''
+        lines.append(f"{self.name}_sum{suffix} {self.sum}")
+        lines.append(f"{self.name}_count{suffix} {self.count}")
+        return lines
+
+    def expose(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"] + self.samples()
+
+class SharedHistogram(Histogram):
+    """A histogram observed from several threads at once."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        with self.lock:
+            super().observe(value)
+
+    def samples(self):
+        # Read every bucket of the same moment, so _count matches the +Inf bucket
+        with self.lock:
+            return super().samples()
+
+class LabeledHistogram:
+    """A family of histograms that differ by the value of one label, observed from any thread."""
+
+    def __init__(self, name, help_text, label, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.label = label
+        self.buckets = buckets
+        self.children = {}
+        self.lock = threading.Lock()
+
+    def labels(self, value):
+        """Return the histogram for a label value, creating it the first time."""
+        child = self.children.get(value)
+        if child is None:
+            with self.lock:
+                child = self.children.get(value)
+                if child is None:
+                    labels = f'{self.label}="{value}"'
+                    child = self.children[value] = SharedHistogram(self.name, self.help, self.buckets, labels)
+        return child
+
+    def expose(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for value in sorted(self.children):
+            lines.extend(self.children[value].samples())
+        return lines
+
+class Registry:
+    """The set of metrics exposed by /metrics."""
+
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def expose(self):
+        """Return all metrics in the Prometheus text exposition format."""
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.expose())
+        return '\n'.join(lines) + '\n'
+
+registry = Registry()
+
+def counter(name, help_text):
+    return registry.register(Counter(name, help_text))
+
+def gauge(name, help_text, function=None):
+    return registry.register(Gauge(name, help_text, function))
+
+def histogram(name, help_text, buckets=LATENCY_BUCKETS):
+    return registry.register(Histogram(name, help_text, buckets))
+
+def labeled_histogram(name, help_text, label, buckets=LATENCY_BUCKETS):
+    return registry.register(LabeledHistogram(name, help_text, label, buckets))
+
+class JsonFormatter(logging.Formatter):
+    """Formats records as one JSON object per line, including fields passed as extra={'fields': {...}}."""
+
+    def format(self, record):
+        entry = {
+            "time": round(record.created, 6),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update(getattr(record, 'fields', {}))
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+def configure_logging(level=logging.INFO, stream=sys.stderr):
+    """Send all log records to stream as JSON lines."""
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(JsonFormatter())
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(level)
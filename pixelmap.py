@@ -0,0 +1,211 @@
+# pixelmap.py
+
+"""
+Physical layout of LEDs as 2D coordinates.
+
+A PixelMap holds the (x, y) position of every LED of a segment, in the
+order the LEDs are wired. Everything effects need from it is computed
+once when the map is built: coordinates normalized to the unit square
+(keeping the aspect ratio), polar coordinates around the center, and
+cached projections onto an axis and cell permutations onto a raster.
+Effects then compute all pixels of a frame as array operations over
+these arrays, so a frame costs the same whatever the wiring.
+
+Maps are loaded from JSON (a list of [x, y] pairs, or of objects with
+index, x and y) or CSV (x,y or index,x,y rows, with an optional header),
+or generated for common layouts: linear strips, serpentine-wired
+matrices and spirals.
+"""
+
+import csv
+import io
+import json
+import math
+
+import numpy as np
+
+class PixelMap:
+    """
+    Coordinates of the LEDs of a segment.
+
+    Args:
+        points: Sequence of (x, y) per LED index, in any unit.
+        name (str): Description of where the map came from.
+
+    Raises:
+        ValueError: If the points are not a non-empty list of (x, y) pairs.
+    """
+
+    def __init__(self, points, name='custom'):
+        try:
+            points = np.asarray(points, dtype=np.float64)
+        except (TypeError, ValueError):
+            raise ValueError("A pixel map must be a list of [x, y] pairs.")
+        if points.ndim != 2 or points.shape[1] != 2 or not len(points) or not np.isfinite(points).all():
+            raise ValueError("A pixel map must be a list of [x, y] pairs.")
+        self.name = name
+        self.points = points
+        self.count = len(points)
+        low = points.min(axis=0)
+        span = points.max(axis=0) - low
+        extent = span.max() or 1.0
+        # Normalized to [0, 1] along the longer side
+        self.x = ((points[:, 0] - low[0]) / extent).astype(np.float32)
+        self.y = ((points[:, 1] - low[1]) / extent).astype(np.float32)
+        self.width, self.height = (span / extent).tolist()
+        dx = self.x - self.width / 2
+        dy = self.y - self.height / 2
+        self.radius = np.hypot(dx, dy).astype(np.float32)
+        self.angle = (np.arctan2(dy, dx) / (2 * math.pi) % 1.0).astype(np.float32)  # In turns, 0 to 1
+        # LED indices in raster order: top row first, left to right
+        self.raster = np.lexsort((points[:, 0], points[:, 1]))
+        self._axes = {}
+        self._cells = {}
+
+    def __len__(self):
+        return self.count
+
+    def along(self, angle):
+        """
+        Position of every pixel along an axis, from 0.0 to 1.0.
+
+        Args:
+            angle (float): Axis direction in degrees; 0 runs along x, 90 along y.
+        """
+        key = float(angle) % 360.0
+        positions = self._axes.get(key)
+        if positions is None:
+            radians = math.radians(key)
+            projected = self.x * math.cos(radians) + self.y * math.sin(radians)
+            low, high = projected.min(), projected.max()
+            positions = ((projected - low) / ((high - low) or 1.0)).astype(np.float32)
+            self._axes[key] = positions
+        return positions
+
+    def cells(self, width, height):
+        """
+        Flat index of the cell of a width x height raster each pixel falls in.
+
+        image.reshape(-1, 3)[pixel_map.cells(width, height)] samples an
+        image of height rows and width columns onto the LEDs.
+        """
+        key = (width, height)
+        index = self._cells.get(key)
+        if index is None:
+            scale = max(self.width, self.height) or 1.0
+            columns = np.minimum((self.x / (self.width or scale) * width).astype(np.intp), width - 1)
+            rows = np.minimum((self.y / (self.height or scale) * height).astype(np.intp), height - 1)
+            index = rows * width + columns
+            self._cells[key] = index
+        return index
+
+    def take(self, index):
+        """Return the map of the LEDs at the given indices, in that order."""
+        return PixelMap(self.points[index], self.name)
+
+    def describe(self):
+        """Return a summary of the map as a dict."""
+        return {"name": self.name, "pixels": self.count,
+                "width": round(self.width, 4), "height": round(self.height, 4)}
+
+def linear(count):
+    """A straight strip along x."""
+    return PixelMap(np.column_stack([np.arange(count), np.zeros(count)]), 'linear')
+
+def grid(width, height, serpentine=True):
+    """
+    A matrix wired row by row from the top left.
+
+    With serpentine wiring every other row runs right to left.
+    """
+    rows, columns = np.divmod(np.arange(width * height), width)
+    if serpentine:
+        columns = np.where(rows % 2, width - 1 - columns, columns)
+    return PixelMap(np.column_stack([columns, rows]), 'serpentine' if serpentine else 'grid')
+
+def spiral(count, turns=None):
+    """
+    A spiral wound outwards from the center with evenly spaced LEDs.
+
+    Args:
+        count (int): Number of LEDs.
+        turns (float): Number of turns; defaults to a spacing between
+            turns about equal to the spacing between LEDs.
+    """
+    turns = turns or max(1.0, math.sqrt(count / (4 * math.pi)))
+    # Equal arc length steps: the angle grows with the square root of the distance along the spiral
+    theta = 2 * math.pi * turns * np.sqrt((np.arange(count) + 0.5) / count)
+    return PixelMap(np.column_stack([theta * np.cos(theta), theta * np.sin(theta)]), 'spiral')
+
+def _indexed(rows):
+    """Order (index, x, y) rows by index, which must cover 0 to n - 1 once."""
+    points = [None] * len(rows)
+    for index, x, y in rows:
+        if not 0 <= index < len(rows) or points[index] is not None:
+            raise ValueError(f"Pixel indices must be 0 to {len(rows) - 1}, each once.")
+        points[index] = (x, y)
+    return points
+
+def parse_json(data):
+    """Build a map from decoded JSON: a list of [x, y], or of {"index", "x", "y"} objects."""
+    if isinstance(data, dict):
+        data = data.get('pixels')
+    if not isinstance(data, list) or not data:
+        raise ValueError("A pixel map must be a list of [x, y] pairs.")
+    if all(isinstance(item, dict) for item in data):
+        try:
+            if all('index' in item for item in data):
+                return PixelMap(_indexed([(int(item['index']), item['x'], item['y']) for item in data]))
+            return PixelMap([(item['x'], item['y']) for item in data])
+        except (KeyError, TypeError, ValueError):
+            raise ValueError("Pixel map objects need x and y (and optionally index) fields.")
+    return PixelMap(data)
+
+def parse_csv(text):
+    """Build a map from CSV rows of x,y or index,x,y; a header row is skipped."""
+    rows = [row for row in csv.reader(io.StringIO(text)) if row and any(cell.strip() for cell in row)]
+    try:
+        float(rows[0][-1])
+    except (IndexError, ValueError):
+        rows = rows[1:]
+    try:
+        values = [[float(cell) for cell in row] for row in rows]
+    except ValueError:
+        raise ValueError("Pixel map CSV rows must be numbers.")
+    if values and all(len(row) == 3 for row in values):
+        return PixelMap(_indexed([(int(index), x, y) for index, x, y in values]))
+    if values and all(len(row) == 2 for row in values):
+        return PixelMap(values)
+    raise ValueError("Pixel map CSV rows must be x,y or index,x,y.")
+
+def load(path):
+    """Load a map from a .json or .csv file."""
+    with open(path) as f:
+        text = f.read()
+    if path.lower().endswith('.csv'):
+        pixel_map = parse_csv(text)
+    else:
+        pixel_map = parse_json(json.loads(text))
+    pixel_map.name = path
+    return pixel_map
+
+def from_spec(spec):
+    """
+    Build a map from an API request: a list of [x, y] pairs, or a layout such as
+    {"layout": "serpentine", "width": 16, "height": 16} or {"layout": "spiral", "count": 200}.
+    """
+    if not isinstance(spec, dict) or 'layout' not in spec:
+        return parse_json(spec)
+    layouts = {
+        'linear': lambda: linear(int(spec['count'])),
+        'grid': lambda: grid(int(spec['width']), int(spec['height']), serpentine=False),
+        'serpentine': lambda: grid(int(spec['width']), int(spec['height'])),
+        'spiral': lambda: spiral(int(spec['count']), spec.get('turns')),
+    }
+    layout = layouts.get(spec['layout']) if isinstance(spec['layout'], str) else None
+    if layout is None:
+        raise ValueError(f"Unknown layout: {spec['layout']}. Choose from {', '.join(layouts)}.")
+    try:
+        return layout()
+    except (KeyError, TypeError, ValueError):
+        raise ValueError(f"Invalid dimensions for layout {spec['layout']}.")
@@ -0,0 +1,133 @@
+# playlist.py
+
+"""
+Playlists and daily schedules of scene changes.
+
+A PlaylistScheduler turns playlists (actions held for a duration each)
+and daily entries (an action at a local time of day) into timers on a
+TimerQueue. The render worker runs the queue at the start of every
+frame, so each action lands exactly on a frame boundary, without an
+HTTP call or a thread handoff.
+
+Both clocks are injectable: drive the scheduler with a simulated clock
+by calling run_due(now) directly.
+"""
+
+import time
+
+from scheduler import TimerQueue
+
+DAY = 24 * 60 * 60
+DAILY_SLACK = 60.0  # A daily entry that just fired is not due again for at least this long
+MIN_DURATION = 0.1  # Shortest playlist entry, in seconds
+
+def parse_time_of_day(text):
+    """Convert 'HH:MM' or 'HH:MM:SS' into seconds after midnight; raises ValueError if invalid."""
+    parts = [int(part) for part in text.split(':')]
+    if len(parts) not in (2, 3):
+        raise ValueError(text)
+    hours, minutes, seconds = parts + [0] * (3 - len(parts))
+    if not (0 <= hours < 24 and 0 <= minutes < 60 and 0 <= seconds < 60):
+        raise ValueError(text)
+    return hours * 3600 + minutes * 60 + seconds
+
+class PlaylistScheduler:
+    """
+    Runs playlists and daily entries on a TimerQueue.
+
+    Args:
+        timers (TimerQueue): Queue the timers go on; a new one by default.
+        clock (callable): Monotonic clock the queue runs on, in seconds.
+        wall_clock (callable): Wall clock (seconds since the epoch) for
+            times of day.
+    """
+
+    def __init__(self, timers=None, clock=time.monotonic, wall_clock=time.time):
+        self.timers = TimerQueue() if timers is None else timers
+        self.clock = clock
+        self.wall_clock = wall_clock
+        self.playing = {}  # Playlist name -> {"index", "loop", "on_end", "timer"}
+        self.daily = {}  # Entry name -> {"at", "timer"}
+
+    def play(self, name, entries, loop=True, on_end=None):
+        """
+        Start (or restart) a playlist.
+
+        Args:
+            name (str): Playlist name; playing it again restarts it.
+            entries (list): (action, duration) pairs. action() is called when
+                the entry starts and the next entry follows duration seconds later.
+            loop (bool): Start over after the last entry instead of stopping.
+            on_end (callable): Called after the last entry of a playlist that does not loop.
+        """
+        self.stop(name)
+        if not entries:
+            return
+        state = {"index": 0, "loop": loop, "on_end": on_end, "timer": None}
+        self.playing[name] = state
+        # The first entry starts on the next frame
+        self._schedule_entry(name, entries, state, self.clock())
+
+    def _schedule_entry(self, name, entries, state, due):
+        def fire():
+            action, duration = entries[state["index"]]
+            state["index"] += 1
+            ended = state["index"] == len(entries) and not state["loop"]
+            if ended:
+                del self.playing[name]
+            else:
+                state["index"] %= len(entries)
+                # Chain from the due time, not the firing time, so the playlist does not drift
+                self._schedule_entry(name, entries, state, due + duration)
+            action()
+            if ended and state["on_end"] is not None:
+                state["on_end"]()
+        state["timer"] = self.timers.schedule(due, fire)
+
+    def stop(self, name=None):
+        """Stop a playlist, or all playlists when name is None."""
+        for playlist in [name] if name is not None else list(self.playing):
+            state = self.playing.pop(playlist, None)
+            if state is not None:
+                self.timers.cancel(state["timer"])
+
+    def add_daily(self, name, at, action):
+        """
+        Call action() every day at a local time of day, replacing any entry with the same name.
+
+        Args:
+            at (float): Seconds after local midnight.
+        """
+        self.remove_daily(name)
+        entry = {"at": at, "timer": None}
+        self.daily[name] = entry
+        self._schedule_daily(entry, action, self._seconds_until(at))
+
+    def _schedule_daily(self, entry, action, delay):
+        def fire():
+            delay = self._seconds_until(entry["at"])
+            if delay < DAILY_SLACK:
+                # The wall clock is a little behind the monotonic one: skip to tomorrow
+                delay += DAY
+            self._schedule_daily(entry, action, delay)
+            action()
+        entry["timer"] = self.timers.schedule(self.clock() + delay, fire)
+
+    def remove_daily(self, name):
+        entry = self.daily.pop(name, None)
+        if entry is not None:
+            self.timers.cancel(entry["timer"])
+
+    def _seconds_until(self, at):
+        """Seconds from now until the next local time of day at."""
+        wall = self.wall_clock()
+        local = time.localtime(wall)
+        since_midnight = local.tm_hour * 3600 + local.tm_min * 60 + local.tm_sec + wall % 1
+        return (at - since_midnight) % DAY
+
+    def next_due(self):
+        return self.timers.next_due()
+
+    def run_due(self, now):
+        """Fire everything due at or before now. Returns how many timers fired."""
+        return self.timers.run_due(now)
@@ -0,0 +1,17 @@
+# plugins/__init__.py
+
+"""
+Effect plugins.
+
+Every module in this package is imported the first time an effect that
+is not built in is requested (see effects.load_plugins). A plugin
+registers its effects with the effects.register decorator:
+
+    import effects
+    from effects import Param
+
+    @effects.register(Param('color', 'color'), Param('wait', 'float', 0.05, 0.001, 60))
+    def my_effect(color, wait=0.05, led_count=None):
+        ...
+        return render, fps_for_wait(wait)
+"""
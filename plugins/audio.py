@@ -0,0 +1,224 @@
+# plugins/audio.py
+
+"""
+Audio-reactive effects driven by a streaming FFT.
+
+An AudioAnalyzer reads 16-bit PCM in fixed-size chunks (hops) from
+stdin, a FIFO, a raw PCM file or a WAV file. For every chunk it runs an
+FFT over the last WINDOW samples (so consecutive windows overlap), sums
+the power into logarithmically spaced bands and keeps a smoothed level
+between 0.0 and 1.0 per band. The effects only read the latest levels,
+so the render thread never waits for audio.
+
+The source is configured by the environment rather than the request:
+    LED_AUDIO_SOURCE    '-' for stdin (default), or the path of a FIFO or file
+    LED_AUDIO_RATE      Sample rate of raw PCM, default 44100 (WAV files carry their own)
+    LED_AUDIO_CHANNELS  Channels of raw PCM, default 1
+
+For example:
+    arecord -f S16_LE -r 44100 -c 1 -t raw | python server.py
+"""
+
+import logging
+import os
+import sys
+import threading
+import time
+import wave
+
+import numpy as np
+
+import controller
+import effects
+from effects import Param
+from scheduler import fps_for_wait
+
+SOURCE = os.environ.get('LED_AUDIO_SOURCE', '-')
+SAMPLE_RATE = int(os.environ.get('LED_AUDIO_RATE', '44100'))
+CHANNELS = int(os.environ.get('LED_AUDIO_CHANNELS', '1'))
+WINDOW = 2048  # Samples per FFT window
+HOP = 512  # Samples read per chunk; windows overlap by WINDOW - HOP
+BANDS = 16  # Logarithmically spaced frequency bands
+MIN_FREQUENCY = 40.0  # Lower edge of the first band, in Hz
+MAX_FREQUENCY = 16000.0  # Upper edge of the last band, in Hz (capped at Nyquist)
+DB_RANGE = 50.0  # Levels span this many dB below the (slowly falling) loudest band
+CEILING_FALL = 0.05  # dB per chunk the loudness reference falls back in quiet passages
+FALLOFF = 0.85  # Per-chunk decay of a band level after a peak
+
+logger = logging.getLogger('audio')
+
+def band_edges(sample_rate, window=WINDOW, bands=BANDS):
+    """Return the FFT bin index where each band starts, plus the end of the last band."""
+    top = min(MAX_FREQUENCY, sample_rate / 2)
+    frequencies = np.geomspace(MIN_FREQUENCY, top, bands + 1)
+    edges = np.rint(frequencies * window / sample_rate).astype(np.intp)
+    # Every band needs at least one bin
+    edges = np.maximum(edges, np.arange(len(edges)) + 1)
+    return np.minimum(edges, window // 2)
+
+class AudioAnalyzer:
+    """
+    Turns a PCM stream into per-band levels.
+
+    feed() analyzes one chunk of HOP samples; start() runs a thread that
+    reads chunks from the stream and feeds them. `levels` is replaced as
+    a whole after every chunk, together with `sequence` (chunks analyzed)
+    and `chunk_time` (perf_counter time the chunk was read).
+
+    Args:
+        stream: Binary file object with 16-bit little-endian PCM.
+        sample_rate (int): Samples per second.
+        channels (int): Interleaved channels, mixed down to mono.
+        pace (bool): Read no faster than real time (for files, which
+            would otherwise be consumed at disk speed).
+    """
+
+    def __init__(self, stream, sample_rate=SAMPLE_RATE, channels=CHANNELS, pace=False):
+        self.stream = stream
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.pace = pace
+        self.samples = np.zeros(WINDOW, dtype=np.float32)
+        self.taper = np.hanning(WINDOW).astype(np.float32)
+        self.edges = band_edges(sample_rate)
+        self.ceiling = None
+        self.levels = np.zeros(BANDS)
+        self.sequence = 0
+        self.chunk_time = None
+        self.chunk = bytearray(HOP * channels * 2)
+        self.thread = None
+
+    def feed(self, chunk, chunk_time=None):
+        """Analyze one chunk of HOP frames of interleaved 16-bit PCM."""
+        pcm = np.frombuffer(chunk, dtype='<i2')
+        if self.channels > 1:
+            pcm = pcm.reshape(-1, self.channels).mean(axis=1)
+        # Slide the window by one hop
+        self.samples[:-HOP] = self.samples[HOP:]
+        self.samples[-HOP:] = pcm
+        self.samples[-HOP:] *= 1 / 32768
+        power = np.abs(np.fft.rfft(self.samples * self.taper)) ** 2
+        energy = np.add.reduceat(power, self.edges[:-1])[:BANDS]
+        decibels = 10 * np.log10(energy + 1e-12)
+        loudest = float(decibels.max())
+        self.ceiling = loudest if self.ceiling is None else max(loudest, self.ceiling - CEILING_FALL)
+        levels = np.clip((decibels - (self.ceiling - DB_RANGE)) / DB_RANGE, 0.0, 1.0)
+        # Fast attack, slow release
+        self.levels = np.maximum(levels, self.levels * FALLOFF)
+        self.chunk_time = time.perf_counter() if chunk_time is None else chunk_time
+        self.sequence += 1
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name='audio-reader', daemon=True)
+        self.thread.start()
+        return self
+
+    def _run(self):
+        view = memoryview(self.chunk)
+        chunk_seconds = HOP / self.sample_rate
+        start = time.monotonic()
+        chunks = 0
+        while True:
+            filled = 0
+            while filled < len(self.chunk):
+                count = self.stream.readinto(view[filled:])
+                if not count:
+                    logger.info("Audio stream ended", extra={"fields": {"chunks": chunks}})
+                    self.levels = np.zeros(BANDS)
+                    self.sequence += 1
+                    return
+                filled += count
+            self.feed(self.chunk, time.perf_counter())
+            chunks += 1
+            if self.pace:
+                delay = start + chunks * chunk_seconds - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+
+class WaveStream:
+    """Adapts a wave reader to the readinto() interface of a binary stream."""
+
+    def __init__(self, reader):
+        self.reader = reader
+        self.frame_bytes = reader.getsampwidth() * reader.getnchannels()
+
+    def readinto(self, buffer):
+        data = self.reader.readframes(len(buffer) // self.frame_bytes)
+        buffer[:len(data)] = data
+        return len(data)
+
+def open_source(source):
+    """Open an audio source; returns (stream, sample_rate, channels, pace)."""
+    if source == '-':
+        return sys.stdin.buffer, SAMPLE_RATE, CHANNELS, False
+    if source.lower().endswith('.wav'):
+        reader = wave.open(source, 'rb')
+        if reader.getsampwidth() != 2:
+            raise ValueError(f"{source}: only 16-bit WAV files are supported")
+        return WaveStream(reader), reader.getframerate(), reader.getnchannels(), True
+    stream = open(source, 'rb', buffering=0)
+    return stream, SAMPLE_RATE, CHANNELS, os.path.isfile(source)
+
+analyzer = None  # Shared by every audio effect, started on first use
+analyzer_lock = threading.Lock()
+
+def get_analyzer():
+    """Return the analyzer for LED_AUDIO_SOURCE, starting it if needed."""
+    global analyzer
+    with analyzer_lock:
+        if analyzer is None:
+            stream, sample_rate, channels, pace = open_source(SOURCE)
+            analyzer = AudioAnalyzer(stream, sample_rate, channels, pace).start()
+            logger.info("Audio analysis started", extra={"fields": {
+                "source": SOURCE, "sample_rate": sample_rate, "channels": channels}})
+    return analyzer
+
+def band_layout(led_count, bands=BANDS):
+    """Return the band each pixel shows, spreading the bands evenly along the strip."""
+    return np.arange(led_count) * bands // led_count
+
+@effects.register(Param('wait', 'float', 1 / 60, 0.0, 1.0), offload=False)
+def audio_spectrum(wait=1 / 60, led_count=None):
+    """Show the audio spectrum: one rainbow hue per band, lit by the band's level."""
+    try:
+        led_count = led_count or controller.LED_COUNT
+        source = get_analyzer()
+        bands = band_layout(led_count)
+        hues = np.array([controller.wheel(band * 255 // BANDS) for band in range(BANDS)], dtype=np.float32)
+        pixel_hues = hues[bands]
+        scaled = np.empty_like(pixel_hues)
+        state = {"sequence": None}
+
+        def render(frame, canvas):
+            if source.sequence == state["sequence"]:
+                # No new audio since the last frame
+                return False
+            state["sequence"] = source.sequence
+            np.multiply(pixel_hues, source.levels[bands][:, None], out=scaled)
+            np.frombuffer(canvas.buffer, dtype=np.uint8).reshape(-1, 3)[:] = scaled
+        return render, fps_for_wait(wait)
+    except Exception as e:
+        logger.error("Effect setup failed", extra={"fields": {"effect": "audio_spectrum", "error": str(e)}})
+
+@effects.register(Param('color', 'color'),
+                  Param('alternate_color', 'color', [0, 0, 0]),
+                  Param('low_band', 'int', 0, 0, BANDS - 1),
+                  Param('high_band', 'int', 3, 0, BANDS - 1),
+                  Param('wait', 'float', 1 / 60, 0.0, 1.0),
+                  offload=False)
+def audio_pulse(color, alternate_color=(0, 0, 0), low_band=0, high_band=3, wait=1 / 60, led_count=None):
+    """Pulse the whole strip between two colors with the level of a range of bands (the bass by default)."""
+    try:
+        low, high = sorted((low_band, high_band))
+        source = get_analyzer()
+        state = {"sequence": None}
+
+        def render(frame, canvas):
+            if source.sequence == state["sequence"]:
+                return False
+            state["sequence"] = source.sequence
+            level = float(source.levels[low:high + 1].max())
+            canvas.fill(controller.interpolate(alternate_color, color, level))
+        return render, fps_for_wait(wait)
+    except Exception as e:
+        logger.error("Effect setup failed", extra={"fields": {"effect": "audio_pulse", "error": str(e)}})
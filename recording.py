@@ -0,0 +1,342 @@
+# recording.py
+
+"""
+Offline rendering of effects to frame files, and replay of those files.
+
+`render` runs a registered effect headless against a simulated strip
+for a number of frames and streams them to a recording. The effect gets
+frame numbers 0, 1, 2, ... at its own frame rate instead of the clock,
+and randomized effects use a fixed seed, so the same command always
+writes the same file: a golden recording that `compare` checks later
+renders against. `replay` shows a recording on the strip (or sends it
+as DDP/E1.31) at the recorded rate, so a heavy show can be rendered on
+a fast machine and played on a weaker Pi.
+
+Recordings hold the uncorrected colors; brightness, gamma and white
+balance are applied by the strip they are played on.
+
+File format (little endian): a HEADER, then one record per frame: the
+float64 time of the frame in seconds from the first one, followed by
+led_count * 3 bytes of RGB, padded to a multiple of 8 bytes. Records are
+fixed size, so frame n is at a computed offset of the memory-mapped file
+and a recording cut short by an interrupted render stays readable.
+
+Usage:
+    python recording.py render EFFECT FRAMES OUTPUT [--params JSON] [--led-count N] [--map FILE] [--seed N]
+    python recording.py replay INPUT [--strip NAME | --send HOST[:PORT] [--protocol ddp|e131]] [--speed X] [--loop]
+    python recording.py compare EXPECTED ACTUAL
+    python recording.py info INPUT
+"""
+
+import argparse
+import json
+import logging
+import mmap
+import os
+import socket
+import struct
+import sys
+import time
+
+import numpy as np
+
+MAGIC = b'LEDREC\x00\x00'
+VERSION = 1
+HEADER = struct.Struct('<8sHHIId')  # magic, version, reserved, led_count, record size, frames per second
+HEADER_SIZE = 32  # HEADER padded to keep the records 8-byte aligned
+TIMESTAMP = struct.Struct('<d')
+SEED = 0  # Random seed used for rendering, so renders of randomized effects are repeatable
+
+logger = logging.getLogger('recording')
+
+def record_size(led_count):
+    """Bytes per frame record: the timestamp plus the padded RGB frame."""
+    return TIMESTAMP.size + -(-led_count * 3 // 8) * 8
+
+class RecordingWriter:
+    """
+    Streams frames to a new recording file.
+
+    Args:
+        path (str): File to create (replaced if it exists).
+        led_count (int): Pixels per frame.
+        fps (float): Nominal frame rate, informative only; the timestamps
+            given to write() set the replay timing.
+    """
+
+    def __init__(self, path, led_count, fps):
+        self.led_count = led_count
+        self.frame_size = led_count * 3
+        self.record = bytearray(record_size(led_count))
+        self.frames = 0
+        self.file = open(path, 'wb')
+        header = HEADER.pack(MAGIC, VERSION, 0, led_count, len(self.record), float(fps or 0.0))
+        self.file.write(header.ljust(HEADER_SIZE, b'\x00'))
+
+    def write(self, frame, timestamp):
+        """Append a frame shown `timestamp` seconds after the first one."""
+        TIMESTAMP.pack_into(self.record, 0, timestamp)
+        self.record[TIMESTAMP.size:TIMESTAMP.size + self.frame_size] = frame
+        self.file.write(self.record)
+        self.frames += 1
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+class Recording:
+    """
+    A recording opened for reading through a read-only memory map.
+
+    frame(n) is a memoryview into the map, so reading a frame copies
+    nothing; `timestamps` is a strided array view of every frame time.
+
+    Raises:
+        ValueError: If the file is not a recording.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            header = f.read(HEADER_SIZE)
+            if len(header) < HEADER_SIZE:
+                raise ValueError(f"{path}: not a recording")
+            magic, version, _, self.led_count, self.record_size, self.fps = HEADER.unpack_from(header)
+            if magic != MAGIC or version != VERSION or self.record_size != record_size(self.led_count):
+                raise ValueError(f"{path}: not a recording (or written by another version)")
+            size = os.fstat(f.fileno()).st_size
+            self.frame_size = self.led_count * 3
+            # A partly written last record is ignored
+            self.frames = (size - HEADER_SIZE) // self.record_size
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.view = memoryview(self.map)
+        self.timestamps = np.ndarray((self.frames,), dtype='<f8', buffer=self.map,
+                                     offset=HEADER_SIZE, strides=(self.record_size,))
+
+    def __len__(self):
+        return self.frames
+
+    def frame(self, n):
+        """Return a zero-copy view of the RGB data of frame n."""
+        if not 0 <= n < self.frames:
+            raise IndexError(n)
+        offset = HEADER_SIZE + n * self.record_size + TIMESTAMP.size
+        return self.view[offset:offset + self.frame_size]
+
+    def duration(self):
+        """Seconds from the first frame to the end of the last one."""
+        if not self.frames:
+            return 0.0
+        last = float(self.timestamps[-1])
+        return last + (1 / self.fps if self.fps else 0.0)
+
+    def describe(self):
+        return {"path": self.path, "led_count": self.led_count, "frames": self.frames,
+                "fps": self.fps, "duration": self.duration()}
+
+    def close(self):
+        # Views into the map (including the timestamps) must be released first
+        self.timestamps = None
+        self.view.release()
+        self.map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def render(name, frames, path, data=None, led_count=None, pixel_map=None, seed=SEED):
+    """
+    Render frames 0 to frames - 1 of a registered effect into a recording.
+
+    Args:
+        name (str): Effect name.
+        frames (int): Number of frames to record.
+        path (str): Recording file to write.
+        data (dict): Effect parameters, validated like an API request.
+        led_count (int): Strip length, defaults to the pixel map's or controller.LED_COUNT.
+        pixel_map (PixelMap): LED coordinates for effects that use them.
+        seed (int): Random seed for randomized effects.
+
+    Returns:
+        dict: Description of the written recording.
+
+    Raises:
+        ValueError: If the effect is unknown, the parameters are invalid or setup fails.
+    """
+    import backends
+    import controller
+    import effects
+    effect = effects.get_effect(name)
+    if effect is None:
+        raise ValueError(f"Unknown effect: {name}. Choose from {', '.join(e.name for e in effects.list_effects())}.")
+    params, error = effect.validate(data or {})
+    if error:
+        raise ValueError(error)
+    led_count = led_count or (len(pixel_map) if pixel_map is not None else controller.LED_COUNT)
+    kwargs = {'pixel_map': pixel_map} if pixel_map is not None and controller.takes_pixel_map(effect.function) else {}
+    saved_seed, controller.RANDOM_SEED = controller.RANDOM_SEED, seed
+    try:
+        setup = effect.function(*effect.arguments(params), led_count=led_count, **kwargs)
+    finally:
+        controller.RANDOM_SEED = saved_seed
+    if setup is None:
+        raise ValueError(f"Effect {name} could not be set up with {params}.")
+    draw, fps = setup
+    canvas = backends.Canvas(led_count)
+    with RecordingWriter(path, led_count, fps) as writer:
+        for frame in range(frames):
+            # Static effects draw their one frame; the recording still has the requested length
+            draw(frame if fps else 0, canvas)
+            writer.write(canvas.buffer, frame / fps if fps else 0.0)
+    return {"path": path, "effect": name, "params": params, "led_count": led_count,
+            "frames": frames, "fps": fps}
+
+def replay(recording, show, speed=1.0, loop=False, clock=time.monotonic, sleep=time.sleep):
+    """
+    Play a recording at its recorded rate, calling show(frame_view, n) per frame.
+
+    Frames whose successor is already due are skipped, so a slow output
+    keeps the timing instead of falling behind.
+
+    Returns:
+        tuple: (frames shown, frames skipped)
+    """
+    shown = skipped = 0
+    timestamps = recording.timestamps
+    period = recording.duration()
+    start = clock()
+    while True:
+        for n in range(len(recording)):
+            if n + 1 < len(recording) and clock() >= start + timestamps[n + 1] / speed:
+                skipped += 1
+                continue
+            delay = start + timestamps[n] / speed - clock()
+            if delay > 0:
+                sleep(delay)
+            show(recording.frame(n), n)
+            shown += 1
+        if not loop or not period:
+            return shown, skipped
+        start += period / speed
+
+def strip_output(strip=None):
+    """
+    Return a show function that shows frames on a controller strip, taking it over like a stream.
+
+    Frames longer than the strip are cut to its length.
+
+    Raises:
+        ValueError: If the strip is unknown.
+    """
+    import controller
+    strip = strip or controller.DEFAULT_STRIP
+    if strip not in controller.strips:
+        raise ValueError(f"Unknown strip: {strip}")
+    size = len(controller.strips[strip]) * 3
+    return lambda frame, n: controller.show_stream_frame(strip, frame[:size])
+
+def network_output(target, protocol='ddp'):
+    """Return a show function that sends frames to host[:port] over DDP or E1.31."""
+    import stream
+    host, _, port = target.partition(':')
+    address = (host, int(port) if port else stream.DDP_PORT if protocol == 'ddp' else stream.E131_PORT)
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    return lambda frame, n: stream.send_frame(sock, address, frame, n, protocol)
+
+def compare(expected, actual):
+    """
+    Compare two recordings frame by frame.
+
+    Returns:
+        str: None if they match, otherwise a description of the first difference.
+    """
+    if expected.led_count != actual.led_count:
+        return f"LED count differs: expected {expected.led_count}, got {actual.led_count}"
+    if len(expected) != len(actual):
+        return f"Frame count differs: expected {len(expected)}, got {len(actual)}"
+    if not np.array_equal(expected.timestamps, actual.timestamps):
+        n = int(np.argmax(expected.timestamps != actual.timestamps))
+        return f"Frame {n} timing differs: expected {expected.timestamps[n]:.6f} s, got {actual.timestamps[n]:.6f} s"
+    for n in range(len(expected)):
+        if expected.frame(n) != actual.frame(n):
+            a = np.frombuffer(expected.frame(n), dtype=np.uint8).reshape(-1, 3)
+            b = np.frombuffer(actual.frame(n), dtype=np.uint8).reshape(-1, 3)
+            differing = np.flatnonzero((a != b).any(axis=1))
+            pixel = int(differing[0])
+            return (f"Frame {n} differs in {len(differing)} pixels, first pixel {pixel}: "
+                    f"expected {a[pixel].tolist()}, got {b[pixel].tolist()}")
+    return None
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render effects to recordings and replay them.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    render_parser = commands.add_parser('render', help="Render an effect to a recording")
+    render_parser.add_argument('effect')
+    render_parser.add_argument('frames', type=int)
+    render_parser.add_argument('output')
+    render_parser.add_argument('--params', default='{}', help="Effect parameters as a JSON object")
+    render_parser.add_argument('--led-count', type=int)
+    render_parser.add_argument('--map', help="JSON or CSV pixel map")
+    render_parser.add_argument('--seed', type=int, default=SEED)
+    replay_parser = commands.add_parser('replay', help="Play a recording on the strip or over the network")
+    replay_parser.add_argument('input')
+    replay_parser.add_argument('--strip')
+    replay_parser.add_argument('--send', metavar='HOST[:PORT]')
+    replay_parser.add_argument('--protocol', choices=['ddp', 'e131'], default='ddp')
+    replay_parser.add_argument('--speed', type=float, default=1.0)
+    replay_parser.add_argument('--loop', action='store_true')
+    compare_parser = commands.add_parser('compare', help="Check a recording against a golden one")
+    compare_parser.add_argument('expected')
+    compare_parser.add_argument('actual')
+    info_parser = commands.add_parser('info', help="Describe a recording")
+    info_parser.add_argument('input')
+    args = parser.parse_args(argv)
+
+    if args.command == 'render':
+        # Headless: never drive real LEDs
+        os.environ.setdefault('LED_BACKEND', 'null')
+        import pixelmap
+        try:
+            pixel_map = pixelmap.load(args.map) if args.map else None
+            result = render(args.effect, args.frames, args.output, json.loads(args.params),
+                            args.led_count, pixel_map, args.seed)
+        except ValueError as e:
+            sys.exit(str(e))
+        print(json.dumps(result))
+    elif args.command == 'replay':
+        if args.speed <= 0:
+            sys.exit("Speed must be positive.")
+        with Recording(args.input) as recording:
+            if args.send:
+                shown, skipped = replay(recording, network_output(args.send, args.protocol), args.speed, args.loop)
+            else:
+                import controller
+                import metrics
+                metrics.configure_logging()
+                try:
+                    show = strip_output(args.strip)
+                except ValueError as e:
+                    sys.exit(str(e))
+                shown, skipped = replay(recording, show, args.speed, args.loop)
+                # Let the render worker show the last frames before the map goes away
+                controller.get_worker().flush()
+        print(json.dumps({"shown": shown, "skipped": skipped}))
+    elif args.command == 'compare':
+        with Recording(args.expected) as expected, Recording(args.actual) as actual:
+            difference = compare(expected, actual)
+        if difference:
+            sys.exit(difference)
+        print("Recordings match.")
+    else:
+        with Recording(args.input) as recording:
+            print(json.dumps(recording.describe()))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,430 @@
+# renderproc.py
+
+"""
+Effect rendering in worker processes.
+
+With LED_RENDER_PROCESSES set, the render worker hands effect setups to
+a pool of processes instead of running them on the render thread. The
+setup runs in the background: the segment keeps showing its current
+effect until the process answers, which the render thread checks once
+per frame without waiting. The
+process renders the effect's frames a few frames ahead into a ring of
+frames in shared memory, and the render thread only copies the frame
+that is due into the layer's canvas. Everything else (segments,
+transitions, streams, color correction and the strip output) stays in
+the server process. Heavy effects then no longer compete with the HTTP
+threads for the GIL, and a slow frame in the render process is absorbed
+by the frames it has already rendered.
+
+Control messages go over one pipe per process:
+
+    ('start', layer_id, ring_name, frame_size, slots, function, args, kwargs, led_count, epoch)
+        answered by ('started', layer_id, fps) or ('failed', layer_id, error)
+    ('stop', layer_id)
+    None: exit
+
+Effects registered with offload=False (those reading live input in the
+server process, like the audio plugin) always render on the render thread.
+"""
+
+import itertools
+import logging
+import multiprocessing
+import os
+import signal
+import time
+from multiprocessing import shared_memory
+import numpy as np
+import metrics
+
+RING_SLOTS = 8  # Frames a render process may render ahead of the strip
+START_TIMEOUT = 10.0  # Seconds a render process may take to set up an effect
+
+logger = logging.getLogger('renderproc')
+
+LATE_FRAMES = metrics.counter('led_render_process_late_frames_total',
+                              'Frames a render process had not rendered yet when they were due.')
+
+class FrameRing:
+    """
+    Frames of one effect in shared memory, written ahead by a render
+    process and read by the render thread.
+
+    The block starts with the cursor, the last frame the reader asked
+    for, and the step, how many frames apart its last two requests were
+    (1 at the effect's frame rate, more at the idle tick). Then come the
+    frame number and the write count of each slot, followed by the slots
+    themselves. The writer renders the frames the reader will ask for at
+    that step and only overwrites slots holding frames before the
+    cursor. That alone does not protect the slot being read when the
+    reader moves back (a new epoch, a resumed timeline), so every slot
+    is also a seqlock: the writer bumps its count to odd before writing
+    and to even after, and the reader copies the frame to the side and
+    only keeps it if the count was even and unchanged around the copy.
+
+    Args:
+        frame_size (int): Bytes per frame.
+        slots (int): Frames in the ring.
+        name (str): Shared memory block to attach to; a new one is created when None.
+    """
+
+    def __init__(self, frame_size, slots=RING_SLOTS, name=None):
+        self.frame_size = frame_size
+        self.slots = slots
+        header = 8 * (2 + 2 * slots)
+        self.shm = shared_memory.SharedMemory(name=name, create=name is None, size=header + slots * frame_size)
+        self.name = self.shm.name
+        self.cursor = np.ndarray(2, dtype=np.int64, buffer=self.shm.buf)  # Cursor and step
+        self.tags = np.ndarray(slots, dtype=np.int64, buffer=self.shm.buf, offset=16)
+        self.writes = np.ndarray(slots, dtype=np.int64, buffer=self.shm.buf, offset=16 + 8 * slots)  # Odd while writing
+        self.frames = self.shm.buf[header:header + slots * frame_size]
+        self.copy = bytearray(frame_size)  # Reader side: the frame is checked here before it reaches the canvas
+        if name is None:
+            self.cursor[:] = (-1, 1)
+            self.tags[:] = -1
+            self.writes[:] = 0
+
+    def free_slots(self):
+        """Return the slots the writer may overwrite: empty ones and those behind the cursor."""
+        return np.flatnonzero(self.tags < max(0, self.cursor[0])).tolist()
+
+    def write(self, slot, frame, data):
+        """Store frame number `frame` in a free slot (writer side)."""
+        offset = slot * self.frame_size
+        self.writes[slot] += 1
+        self.tags[slot] = frame
+        self.frames[offset:offset + self.frame_size] = data
+        self.writes[slot] += 1
+
+    def read(self, frame, canvas):
+        """
+        Copy frame number `frame` into the canvas (reader side). Returns
+        False, leaving the canvas alone, if it is not rendered yet or was
+        overwritten while being copied.
+        """
+        last = self.cursor[0]
+        if 0 <= last < frame:
+            self.cursor[1] = frame - last
+        self.cursor[0] = frame
+        slot = np.flatnonzero(self.tags == frame)
+        if not len(slot):
+            LATE_FRAMES.inc()
+            return False
+        slot = int(slot[0])
+        offset = slot * self.frame_size
+        writes = int(self.writes[slot])
+        if not writes % 2 and self.tags[slot] == frame:
+            self.copy[:] = self.frames[offset:offset + self.frame_size]
+            if self.writes[slot] == writes:
+                canvas.write(self.copy)
+                return True
+        LATE_FRAMES.inc()
+        return False
+
+    def close(self):
+        # Drop the views first: the block cannot be unmapped while they exist
+        del self.cursor, self.tags, self.writes
+        self.frames.release()
+        self.shm.close()
+
+    def unlink(self):
+        """Free the block once every process has closed it; the mappings stay usable until then."""
+        self.shm.unlink()
+
+class RemoteRender:
+    """Render function of a layer whose effect runs in a render process; close() stops it there."""
+
+    def __init__(self, pool, process, layer_id, ring):
+        self.pool = pool
+        self.process = process
+        self.layer_id = layer_id
+        self.ring = ring
+
+    def __call__(self, frame, canvas):
+        return self.ring.read(frame, canvas)
+
+    def close(self):
+        self.process.stop(self.layer_id)
+        if self.pool.rings.pop(self.layer_id, None) is not None:
+            self.ring.unlink()
+        self.ring.close()
+
+class RenderProcess:
+    """One render process and the server end of its pipe. Used by the render thread only."""
+
+    def __init__(self, context):
+        self.conn, child = context.Pipe()
+        self.process = context.Process(target=serve, args=(child,), name='render-process', daemon=True)
+        self.process.start()
+        child.close()
+        self.layers = set()
+
+    def alive(self):
+        return self.process.is_alive()
+
+    def start(self, layer_id, ring, function, args, kwargs, led_count, epoch):
+        """Ask the process to set up an effect and render it into ring; the answer comes from replies()."""
+        self.conn.send(('start', layer_id, ring.name, ring.frame_size, ring.slots,
+                        function, args, kwargs, led_count, epoch))
+        self.layers.add(layer_id)
+
+    def replies(self):
+        """
+        Return the answers received so far, without waiting.
+
+        Raises:
+            EOFError: If the process is gone.
+        """
+        replies = []
+        while self.conn.poll(0):
+            replies.append(self.conn.recv())
+        return replies
+
+    def stop(self, layer_id):
+        self.layers.discard(layer_id)
+        try:
+            self.conn.send(('stop', layer_id))
+        except OSError:
+            pass  # The process is gone
+
+    def close(self):
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(1.0)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.conn.close()
+
+    def describe(self):
+        return {"pid": self.process.pid, "alive": self.alive(), "layers": len(self.layers)}
+
+class RenderPool:
+    """
+    Render processes sharing the offloaded effects, each effect on the
+    process with the fewest. A process that died is replaced on the next
+    start(). Used by the render thread only.
+
+    Args:
+        size (int): Number of render processes.
+    """
+
+    def __init__(self, size):
+        # Spawn rather than fork: the server process runs threads that a forked child would inherit mid-flight
+        self.context = multiprocessing.get_context('spawn')
+        self.processes = [RenderProcess(self.context) for _ in range(size)]
+        self.layer_ids = itertools.count()
+        self.rings = {}  # Rings of the running effects by layer id
+        self.pending = {}  # Layer id -> [process, ring, deadline, on_started] of the setups not answered yet
+
+    def start(self, function, args, kwargs, led_count, epoch, on_started):
+        """
+        Start setting up an effect in a render process, without waiting for it.
+
+        Once the process has set it up, poll() calls on_started(render, fps)
+        like an effect setup function returns them, where render copies
+        frames from the process and has a close() to stop it. A setup that
+        fails or times out is logged and never calls on_started.
+
+        Returns:
+            int: Layer id, to cancel() the start while it is pending.
+        """
+        for n, process in enumerate(self.processes):
+            if not process.alive():
+                self._fail_pending(process, "Render process died")
+                logger.error("Render process died", extra={"fields": {
+                    "pid": process.process.pid, "exitcode": process.process.exitcode}})
+                process.close()
+                self.processes[n] = RenderProcess(self.context)
+        process = min(self.processes, key=lambda process: len(process.layers))
+        layer_id = next(self.layer_ids)
+        ring = FrameRing(led_count * 3)
+        try:
+            process.start(layer_id, ring, function, args, kwargs, led_count, epoch)
+        except BaseException:
+            ring.close()
+            ring.unlink()
+            raise
+        self.pending[layer_id] = [process, ring, time.monotonic() + START_TIMEOUT, on_started]
+        return layer_id
+
+    def cancel(self, layer_id):
+        """Drop a pending start; its ring is freed once the process answers."""
+        pending = self.pending.get(layer_id)
+        if pending is not None and pending[3] is not None:
+            pending[3] = None
+            pending[0].stop(layer_id)
+
+    def poll(self):
+        """Handle the answers to pending starts without waiting. Returns True if an effect started."""
+        started = False
+        for process in {pending[0] for pending in self.pending.values()}:
+            try:
+                replies = process.replies()
+            except (EOFError, OSError):
+                self._fail_pending(process, "Render process died")
+                continue
+            for reply, layer_id, value in replies:
+                pending = self.pending.pop(layer_id, None)
+                if pending is None:
+                    continue
+                _, ring, _, on_started = pending
+                if reply == 'started' and on_started is not None:
+                    self.rings[layer_id] = ring
+                    on_started(RemoteRender(self, process, layer_id, ring), value)
+                    started = True
+                    continue
+                if reply == 'failed' and on_started is not None:
+                    logger.error("Effect setup failed", extra={"fields": {"pid": process.process.pid, "error": value}})
+                process.stop(layer_id)
+                ring.close()
+                ring.unlink()
+        now = time.monotonic()
+        for layer_id, (process, ring, deadline, _) in list(self.pending.items()):
+            if now >= deadline:
+                logger.error("Render process did not set up the effect in time", extra={"fields": {
+                    "pid": process.process.pid, "seconds": START_TIMEOUT}})
+                del self.pending[layer_id]
+                process.stop(layer_id)
+                ring.close()
+                ring.unlink()
+        return started
+
+    def _fail_pending(self, process, error):
+        for layer_id, (owner, ring, _, on_started) in list(self.pending.items()):
+            if owner is process:
+                if on_started is not None:
+                    logger.error("Effect setup failed", extra={"fields": {"pid": process.process.pid, "error": error}})
+                del self.pending[layer_id]
+                process.layers.discard(layer_id)
+                ring.close()
+                ring.unlink()
+
+    def close(self):
+        """Stop the processes and free the rings; layers still showing keep their mapping until closed."""
+        for process in self.processes:
+            process.close()
+        self.processes = []
+        for ring in self.rings.values():
+            ring.unlink()
+        self.rings.clear()
+        for _, ring, _, _ in self.pending.values():
+            ring.close()
+            ring.unlink()
+        self.pending.clear()
+
+    def describe(self):
+        return [process.describe() for process in self.processes]
+
+pool = None  # Started on the first offloaded effect
+
+def get_pool(size):
+    """Return the render pool, starting `size` processes if needed; the render worker closes it when it stops."""
+    global pool
+    if pool is None:
+        pool = RenderPool(size)
+        logger.info("Render processes started", extra={"fields": {"processes": size}})
+    return pool
+
+def describe():
+    """Return the state of every render process; empty when none were started."""
+    return pool.describe() if pool is not None else []
+
+class ProcessLayer:
+    """An effect running in a render process, rendering ahead into its ring."""
+
+    def __init__(self, render, fps, canvas, ring, epoch):
+        self.render = render
+        self.fps = fps
+        self.canvas = canvas
+        self.ring = ring
+        self.failed = False
+        # Start where the reader will: frame 0, or the frame due now on a shared timeline
+        self.next_frame = 0 if epoch is None or not fps else max(0, int((time.monotonic() - epoch) * fps))
+        self.first_frame = self.next_frame
+
+    def render_ahead(self, limit=None):
+        """Render the frames the reader will ask for next, at most `limit` of them."""
+        if self.failed:
+            return
+        cursor, step = (int(value) for value in self.ring.cursor)
+        step = max(1, step)
+        if cursor < 0:
+            cursor = self.first_frame
+        elif not (cursor < self.next_frame <= cursor + step * (self.ring.slots - 1)
+                  and (self.next_frame - cursor) % step == 0):
+            # Fell behind, the timeline jumped or the reader changed pace: continue from the frame being shown
+            self.next_frame = cursor + step
+        last = cursor + step * (self.ring.slots - 1) if self.fps else 0
+        if limit is not None:
+            last = min(last, self.next_frame + step * (limit - 1))
+        free = self.ring.free_slots()
+        while self.next_frame <= last and free:
+            try:
+                self.render(self.next_frame, self.canvas)
+            except Exception as e:
+                logger.error("Effect failed", extra={"fields": {"error": str(e)}})
+                # Freeze on the last good frame, as on the render thread
+                self.failed = True
+                return
+            self.ring.write(free.pop(), self.next_frame, self.canvas.buffer)
+            self.next_frame += step
+
+def serve(conn):
+    """Main loop of a render process."""
+    # Effect modules import the controller: never let it open the strip here
+    os.environ['LED_BACKEND'] = 'null'
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # The server shuts the process down
+    metrics.configure_logging()
+    layers = {}
+    try:
+        while True:
+            rates = [layer.fps for layer in layers.values() if layer.fps and not layer.failed]
+            # Wake up once per frame of the fastest effect to top its ring up
+            timeout = 1 / max(rates) if rates else None
+            try:
+                while conn.poll(timeout):
+                    message = conn.recv()
+                    if message is None:
+                        return
+                    if message[0] == 'stop':
+                        layer = layers.pop(message[1], None)
+                        if layer is not None:
+                            layer.ring.close()
+                    elif message[0] == 'start':
+                        start_layer(conn, layers, *message[1:])
+                    timeout = 0
+            except (EOFError, OSError):
+                return  # The server went away
+            for layer in layers.values():
+                layer.render_ahead()
+    finally:
+        # Unmap the rings before exiting, or their views keep the blocks exported
+        for layer in layers.values():
+            layer.ring.close()
+
+def start_layer(conn, layers, layer_id, name, frame_size, slots, function, args, kwargs, led_count, epoch):
+    """Set up an effect in a render process and answer the server."""
+    from backends import Canvas
+    try:
+        ring = FrameRing(frame_size, slots, name)
+    except FileNotFoundError:
+        # The server gave up waiting and freed the ring
+        conn.send(('failed', layer_id, "Frame ring is gone"))
+        return
+    try:
+        setup = function(*args, led_count=led_count, **kwargs)
+    except Exception as e:
+        setup = None
+        logger.error("Effect setup failed", extra={"fields": {"error": str(e)}})
+    if setup is None:
+        ring.close()
+        conn.send(('failed', layer_id, f"Setup of {function.__name__} failed"))
+        return
+    render, fps = setup
+    layer = ProcessLayer(render, fps, Canvas(led_count), ring, epoch)
+    # The first frame is ready before the render thread asks for it
+    layer.render_ahead(limit=1)
+    layers[layer_id] = layer
+    conn.send(('started', layer_id, fps))
@@ -0,0 +1,169 @@
+# scheduler.py
+
+import heapq
+import itertools
+import time
+
+MAX_FPS = 240  # Upper bound for effects configured with a zero wait
+
+class FrameScheduler:
+    """
+    Fixed-timestep frame scheduler driven by a monotonic clock.
+
+    Frame N is due at start + N / fps. The render callback receives the
+    frame number computed from the elapsed time, so when rendering falls
+    behind, late frames are dropped instead of slowing the animation down.
+
+    Args:
+        fps (float): Target frames per second.
+        clock (callable): Monotonic clock returning seconds.
+        sleep (callable): Sleep function taking seconds. Defaults to waiting
+            on the stop event so a stop request interrupts the sleep.
+        epoch (float): Optional clock time of frame 0. Several schedulers
+            (or several nodes) sharing an epoch and a frame rate render
+            frame N at the same time. Defaults to the time run() starts.
+    """
+
+    def __init__(self, fps, clock=time.monotonic, sleep=None, epoch=None):
+        self.fps = min(float(fps), MAX_FPS)
+        self.clock = clock
+        self.sleep = sleep
+        self.epoch = epoch
+        self.reset()
+
+    def reset(self):
+        """Clear the frame statistics."""
+        self.start_time = None
+        self.run_time = None  # Clock time the statistics start from
+        self.end_time = None
+        self.next_frame = 0
+        self.frames_rendered = 0
+        self.frames_dropped = 0
+        self.jitter_total = 0.0
+        self.jitter_max = 0.0
+
+    def due_time(self, frame):
+        """Return the clock time at which the given frame is due."""
+        return self.start_time + frame / self.fps
+
+    def run(self, render, stop_event, max_frames=None, resume=False):
+        """
+        Call render(frame) once per frame until stop_event is set.
+
+        Args:
+            render (callable): Renders and shows the given frame number.
+            stop_event (threading.Event): Stops the loop when set.
+            max_frames (int): Optional number of frame slots to run for.
+            resume (bool): Continue the timeline of the previous run
+                instead of starting again at frame 0.
+        """
+        sleep = self.sleep or stop_event.wait
+        if not resume or self.start_time is None:
+            self.reset()
+            self.run_time = self.clock()
+            if self.epoch is None:
+                self.start_time = self.run_time
+            else:
+                # Join the shared timeline at the next frame instead of counting the past ones as dropped
+                self.start_time = self.epoch
+                self.next_frame = max(0, int((self.run_time - self.epoch) * self.fps) + 1)
+        self.end_time = None
+        next_frame = self.next_frame
+        while not stop_event.is_set():
+            if max_frames is not None and next_frame >= max_frames:
+                break
+            now = self.clock()
+            # The epsilon keeps a wake-up exactly at a due time from rounding to the frame before
+            frame = int((now - self.start_time) * self.fps + 1e-6)
+            if frame < next_frame:
+                sleep(self.due_time(next_frame) - now)
+                continue
+            # Skip the frames whose slot has already passed
+            self.frames_dropped += frame - next_frame
+            lateness = now - self.due_time(frame)
+            self.jitter_total += lateness
+            self.jitter_max = max(self.jitter_max, lateness)
+            render(frame)
+            self.frames_rendered += 1
+            next_frame = frame + 1
+            delay = self.due_time(next_frame) - self.clock()
+            if delay > 0:
+                sleep(delay)
+        self.next_frame = next_frame
+        self.end_time = self.clock()
+
+    def stats(self):
+        """Return achieved FPS, dropped frames and jitter (in seconds)."""
+        elapsed = 0.0
+        if self.run_time is not None:
+            elapsed = (self.end_time if self.end_time is not None else self.clock()) - self.run_time
+        return {
+            "target_fps": self.fps,
+            "achieved_fps": self.frames_rendered / elapsed if elapsed > 0 else 0.0,
+            "frames_rendered": self.frames_rendered,
+            "frames_dropped": self.frames_dropped,
+            "jitter_avg": self.jitter_total / self.frames_rendered if self.frames_rendered else 0.0,
+            "jitter_max": self.jitter_max,
+        }
+
+def fps_for_wait(wait):
+    """Convert an effect's per-frame wait (seconds) into a target FPS."""
+    return 1.0 / wait if wait > 0 else MAX_FPS
+
+class TimerQueue:
+    """
+    Timers ordered in a binary heap by due time.
+
+    Scheduling and firing are O(log n), so thousands of pending timers
+    cost nothing between their due times. Cancelled timers stay in the
+    heap until they reach the top, or until they make up half of it.
+    Not thread-safe: the render worker owns the queue and runs it on its
+    own thread.
+    """
+
+    def __init__(self):
+        self.heap = []
+        self.sequence = itertools.count()  # Keeps timers due at the same time in FIFO order
+        self.cancelled = 0
+
+    def __len__(self):
+        return len(self.heap) - self.cancelled
+
+    def schedule(self, due, callback):
+        """Call callback() once the clock reaches due; returns a handle for cancel()."""
+        timer = [due, next(self.sequence), callback]
+        heapq.heappush(self.heap, timer)
+        return timer
+
+    def cancel(self, timer):
+        """Cancel a pending timer; cancelling a fired or cancelled timer does nothing."""
+        if timer[2] is None:
+            return
+        timer[2] = None
+        self.cancelled += 1
+        if self.cancelled > len(self.heap) // 2:
+            self.heap = [t for t in self.heap if t[2] is not None]
+            heapq.heapify(self.heap)
+            self.cancelled = 0
+
+    def next_due(self):
+        """Return the due time of the earliest pending timer, or None."""
+        while self.heap and self.heap[0][2] is None:
+            heapq.heappop(self.heap)
+            self.cancelled -= 1
+        return self.heap[0][0] if self.heap else None
+
+    def run_due(self, now):
+        """Fire every timer due at or before now, earliest first. Returns how many fired."""
+        fired = 0
+        while self.heap and self.heap[0][0] <= now:
+            timer = heapq.heappop(self.heap)
+            callback = timer[2]
+            if callback is None:
+                self.cancelled -= 1
+                continue
+            # Mark it done so a later cancel() is a no-op
+            timer[2] = None
+            callback()
+            fired += 1
+        return fired
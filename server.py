@@ -1,13 +1,41 @@
 # server.py
 
-from flask import Flask, request, jsonify
+import logging
+import os
+import time
+from flask import Flask, Response, g, request, jsonify
 from flask_cors import CORS
-from db import update_database, remove_from_database, get_from_database
+from db import (update_database, update_database_many, remove_from_database, get_from_database,
+                apply_database_batch, find_in_database)
+import boot
 import controller
+import effects
+import metrics
+import pixelmap
+import playlist
+import stream
+import sync
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
 
+logger = logging.getLogger('server')
+PORT = int(os.environ.get('LED_PORT', '5000'))
+restoring = False  # True while restore_state() runs
+restored = False  # True once restore_state() has finished
+REQUEST_SECONDS = metrics.labeled_histogram('led_request_seconds', 'Time to handle an API request.', 'route')
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def observe_request_latency(response):
+    # Label by route pattern rather than path so the number of series stays fixed
+    route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    REQUEST_SECONDS.labels(route).observe(time.perf_counter() - g.request_start)
+    return response
+
 @app.route('/')
 def index():
     return "WS2815 RGB Strip Control API"
@@ -35,201 +63,283 @@ def extract_api_parameters(data, required_fields, optional_fields=None):
         params[field] = data.get(field, default)
     return params, None
 
-@app.route('/color_fill', methods=['POST'])
-def api_color_fill():
-    data = request.get_json()
-    params, error = extract_api_parameters(data, ['color'])
+def active_effect_key(segment):
+    return boot.ACTIVE_EFFECT_PREFIX + segment
+
+def segment_key(segment):
+    return boot.SEGMENT_PREFIX + segment
+
+def effect_records(name, params):
+    """Database writes that save an effect's parameters and mark it active on its segment."""
+    return [(name, params), (active_effect_key(params['segment']), {"effect": name, "params": params})]
+
+def record_effect(name, params):
+    """Save an effect's parameters and mark it as the active effect of its segment."""
+    update_database_many(effect_records(name, params))
+
+def start_effect(target, name, params):
+    """Start a validated effect through target (the controller or a controller.Batch)."""
+    effect = effects.get_effect(name)
+    if effect is None:
+        raise KeyError(name)
+    target.start_effect(effect.function, *effect.arguments(params), segment=params['segment'])
+
+def restore_state(scene=True):
+    """
+    Restart the brightness and effects that were active before the last
+    shutdown, then re-arm schedules and resume playlists. Pass scene=False
+    when boot.py already restored the scene.
+    """
+    global restoring, restored
+    restoring = True
+    try:
+        if scene:
+            boot.restore_scene()
+        for key, schedule in find_in_database(SCHEDULE_PREFIX).items():
+            arm_schedule(key[len(SCHEDULE_PREFIX):], schedule)
+        for key in find_in_database(PLAYING_PREFIX):
+            name = key[len(PLAYING_PREFIX):]
+            saved_playlist = get_from_database([PLAYLIST_PREFIX + name])[PLAYLIST_PREFIX + name]
+            if saved_playlist is not None:
+                controller.run_on_render_thread(lambda name=name, saved=saved_playlist: play_playlist(name, saved))
+        restored = True
+    finally:
+        restoring = False
+
+def segment_error(segment):
+    """Return an error message if segment does not name a defined segment."""
+    if not isinstance(segment, str) or segment not in controller.segments:
+        return f"Unknown segment: {segment}. Choose from {', '.join(controller.segments)}."
+    return None
+
+def parse_effect(name, data):
+    """
+    Validate the parameters of a registered effect, plus the segment to run it on.
+
+    :return: Tuple of (params, error_message)
+    """
+    effect = effects.get_effect(name) if isinstance(name, str) else None
+    if effect is None:
+        return None, f"Unknown effect: {name}. Choose from {', '.join(e.name for e in effects.list_effects())}."
+    params, error = effect.validate(data)
     if error:
-        return jsonify({"error": error}), 400
-    color = params['color']
-    if not isinstance(color, list) or len(color) != 3:
-        return jsonify({"error": "Invalid color. Provide a list of three integers [R, G, B]."}), 400
+        return None, error
+    segment = data.get('segment', controller.DEFAULT_SEGMENT)
+    error = segment_error(segment)
+    if error:
+        return None, error
+    params['segment'] = segment
+    return params, None
+
+def parse_brightness(data):
+    params, error = extract_api_parameters(data, ['brightness'])
+    if error:
+        return None, error
     try:
-        color = [int(c) for c in color]
+        brightness = float(params['brightness'])
+        if not (0.0 <= brightness <= 1.0):
+            raise ValueError
     except ValueError:
-        return jsonify({"error": "Color values must be integers."}), 400
-    
-    controller.start_effect(controller.color_fill, color)
-    update_database('color_fill', {"color": color})
-    
-    return jsonify({"status": "Color fill applied.", "color": color}), 200
+        return None, "Brightness must be a float between 0.0 and 1.0."
+    return {"brightness": brightness}, None
 
-@app.route('/rainbow_cycle', methods=['POST'])
-def api_rainbow_cycle():
-    data = request.get_json()
-    required = ['colors']
-    optional = {'wait': 0.05, 'gradient_steps': 20}
-    params, error = extract_api_parameters(data, required, optional)
+def parse_color_correction(data):
+    params, error = extract_api_parameters(data, [], {'gamma': None, 'white_balance': None})
     if error:
-        return jsonify({"error": error}), 400
-    colors = params['colors']
-    wait = params['wait']
-    gradient_steps = params['gradient_steps']
-    # Validate colors
-    if not isinstance(colors, list) or not all(isinstance(color, list) and len(color) == 3 for color in colors):
-        return jsonify({"error": "Invalid colors. Provide a list of RGB lists, e.g., [[R, G, B], ...]."}), 400
+        return None, error
+    gamma, white_balance = params['gamma'], params['white_balance']
     try:
-        colors = [[int(c) for c in color] for color in colors]
-        wait = float(wait)
-        gradient_steps = int(gradient_steps)
-    except ValueError:
-        return jsonify({"error": "Colors must be integers, wait must be a float, and gradient_steps must be an integer."}), 400
-    
-    controller.start_effect(controller.rainbow_cycle, colors, wait, gradient_steps)
-    
-    update_database('rainbow_cycle', {
-        "colors": colors,
-        "wait": wait,
-        "gradient_steps": gradient_steps
-    })
-    
-    return jsonify({
-        "status": "Rainbow cycle applied.",
-        "colors": colors,
-        "wait": wait,
-        "gradient_steps": gradient_steps
-    }), 200
+        if gamma is not None:
+            gamma = float(gamma)
+            if not (0.1 <= gamma <= 5.0):
+                raise ValueError
+        if white_balance is not None:
+            if not isinstance(white_balance, list) or len(white_balance) != 3:
+                raise ValueError
+            white_balance = [float(scale) for scale in white_balance]
+            if not all(0.0 <= scale <= 1.0 for scale in white_balance):
+                raise ValueError
+    except (TypeError, ValueError):
+        return None, "Gamma must be a float between 0.1 and 5.0 and white_balance a list of three floats between 0.0 and 1.0."
+    return {"gamma": gamma, "white_balance": white_balance}, None
 
-@app.route('/breathing_effect', methods=['POST'])
-def api_breathing_effect():
-    data = request.get_json()
-    required = ['color']
-    optional = {'steps': 50, 'wait': 0.05}
-    params, error = extract_api_parameters(data, required, optional)
+def apply_effect_request(name, status):
+    """Validate the request body for an effect, start it and save it."""
+    params, error = parse_effect(name, request.get_json())
     if error:
         return jsonify({"error": error}), 400
-    color = params['color']
-    steps = params['steps']
-    wait = params['wait']
-    if not isinstance(color, list) or len(color) != 3:
-        return jsonify({"error": "Invalid color. Provide a list of three integers [R, G, B]."}), 400
-    try:
-        color = [int(c) for c in color]
-        steps = int(steps)
-        wait = float(wait)
-    except ValueError:
-        return jsonify({"error": "Invalid parameters. Ensure color is integers, steps is int, wait is float."}), 400
-    
-    controller.start_effect(controller.breathing_effect, color, steps, wait)
-    
-    update_database('breathing_effect', {
-        "color": color,
-        "steps": steps,
-        "wait": wait
-    })
-    
-    return jsonify({"status": "Breathing effect applied.", "color": color, "steps": steps, "wait": wait}), 200
+    start_effect(controller, name, params)
+    record_effect(name, params)
+    return jsonify({"status": status, **params}), 200
+
+@app.route('/color_fill', methods=['POST'])
+def api_color_fill():
+    return apply_effect_request('color_fill', "Color fill applied.")
+
+@app.route('/rainbow_cycle', methods=['POST'])
+def api_rainbow_cycle():
+    return apply_effect_request('rainbow_cycle', "Rainbow cycle applied.")
+
+@app.route('/breathing_effect', methods=['POST'])
+def api_breathing_effect():
+    return apply_effect_request('breathing_effect', "Breathing effect applied.")
 
 @app.route('/theater_chase', methods=['POST'])
 def api_theater_chase():
-    data = request.get_json()
-    required = ['color', 'alternate_color']
-    optional = {'wait': 0.1}
-    params, error = extract_api_parameters(data, required, optional)
-    if error:
-        return jsonify({"error": error}), 400
-    color = params['color']
-    alternate_color = params['alternate_color']
-    wait = params['wait']
-    if not isinstance(color, list) or len(color) != 3 or not isinstance(alternate_color, list) or len(alternate_color) != 3:
-        return jsonify({"error": "Invalid colors. Provide lists of three integers for 'color' and 'alternate_color'."}), 400
-    try:
-        color = [int(c) for c in color]
-        alternate_color = [int(c) for c in alternate_color]
-        wait = float(wait)
-    except ValueError:
-        return jsonify({"error": "Color values must be integers and wait must be a float."}), 400
-    
-    controller.start_effect(controller.theater_chase, color, alternate_color, wait)
-     
-    update_database('theater_chase', {
-        "color": color,
-        "alternate_color": alternate_color,
-        "wait": wait
-    })
-    return jsonify({
-        "status": "Theater chase applied.",
-        "color": color,
-        "alternate_color": alternate_color,
-        "wait": wait
-    }), 200
+    return apply_effect_request('theater_chase', "Theater chase applied.")
 
 @app.route('/sparkle_effect', methods=['POST'])
 def api_sparkle_effect():
-    data = request.get_json()
-    required = ['color', 'alternate_color']
-    optional = {'count': 20, 'wait': 0.05, 'fade_steps': 10}
-    params, error = extract_api_parameters(data, required, optional)
-    if error:
-        return jsonify({"error": error}), 400
-    color = params['color']
-    alternate_color = params['alternate_color']
-    count = params['count']
-    wait = params['wait']
-    fade_steps = params['fade_steps']
-    if not isinstance(color, list) or len(color) != 3 or not isinstance(alternate_color, list) or len(alternate_color) != 3:
-        return jsonify({"error": "Invalid colors. Provide lists of three integers for 'color' and 'alternate_color'."}), 400
-    try:
-        color = [int(c) for c in color]
-        alternate_color = [int(c) for c in alternate_color]
-        count = int(count)
-        wait = float(wait)
-        fade_steps = int(fade_steps)
-    except ValueError:
-        return jsonify({"error": "Invalid parameters. Ensure colors are integers and count, fade_steps are integers, wait is float."}), 400
-    
-    controller.start_effect(controller.sparkle_effect, color, alternate_color, count, wait, fade_steps)
-    update_database('sparkle_effect', {
-        "color": color,
-        "alternate_color": alternate_color,
-        "count": count,
-        "wait": wait,
-        "fade_steps": fade_steps
-    })
-    
-    return jsonify({
-        "status": "Sparkle effect parameters applied.",
-        "color": color,
-        "alternate_color": alternate_color,
-        "count": count,
-        "wait": wait,
-        "fade_steps": fade_steps
-    }), 200
+    return apply_effect_request('sparkle_effect', "Sparkle effect parameters applied.")
+
+@app.route('/effects', methods=['GET'])
+def api_effects():
+    return jsonify({"effects": [effect.describe() for effect in effects.list_effects()]}), 200
+
+@app.route('/effects/<name>', methods=['POST'])
+def api_effect(name):
+    if effects.get_effect(name) is None:
+        return jsonify({"error": f"Unknown effect: {name}."}), 404
+    return apply_effect_request(name, f"Effect {name} applied.")
 
 @app.route('/set_brightness', methods=['POST'])
 def api_set_brightness():
-    data = request.get_json()
-    params, error = extract_api_parameters(data, ['brightness'])
+    params, error = parse_brightness(request.get_json())
     if error:
         return jsonify({"error": error}), 400
-    brightness = params['brightness']
-    try:
-        brightness = float(brightness)
-        if not (0.0 <= brightness <= 1.0):
-            raise ValueError
-    except ValueError:
-        return jsonify({"error": "Brightness must be a float between 0.0 and 1.0."}), 400
     
-    controller.set_brightness(brightness)
-    update_database('set_brightness', {"brightness": brightness})
+    controller.set_brightness(params['brightness'])
+    update_database('set_brightness', params)
     
-    return jsonify({"status": "Brightness parameter applied.", "brightness": brightness}), 200
+    return jsonify({"status": "Brightness parameter applied.", **params}), 200
+
+@app.route('/color_correction', methods=['POST'])
+def api_color_correction():
+    params, error = parse_color_correction(request.get_json())
+    if error:
+        return jsonify({"error": error}), 400
+
+    controller.set_color_correction(params['gamma'], params['white_balance'])
+    saved = get_from_database(['color_correction'])['color_correction'] or {}
+    update_database('color_correction', {**saved, **{k: v for k, v in params.items() if v is not None}})
+
+    return jsonify({"status": "Color correction applied.", **params}), 200
 
 @app.route('/stop', methods=['POST'])
 def api_stop():
-    controller.stop_current_effect()
-    controller.cleanup()
-    update_database('stop', {})
+    data = request.get_json(silent=True) or {}
+    segment = data.get('segment')
+    if segment is not None:
+        error = segment_error(segment)
+        if error:
+            return jsonify({"error": error}), 400
+    controller.stop_current_effect(segment)
+    controller.cleanup(segment)
+    update_database('stop', {} if segment is None else {"segment": segment})
+    stopped = controller.segments if segment is None else [segment]
+    remove_from_database([active_effect_key(name) for name in stopped])
     return jsonify({"status": "Stop command applied."}), 200
 
+@app.route('/segments', methods=['GET'])
+def api_list_segments():
+    segments = {name: segment.describe() for name, segment in controller.segments.items()}
+    strips = {name: len(strip) for name, strip in controller.strips.items()}
+    return jsonify({"segments": segments, "strips": strips}), 200
+
+@app.route('/segments', methods=['POST'])
+def api_define_segment():
+    data = request.get_json()
+    required = ['name', 'start', 'length']
+    optional = {'strip': controller.DEFAULT_STRIP, 'reverse': False, 'mirror': False, 'map': None}
+    params, error = extract_api_parameters(data, required, optional)
+    if error:
+        return jsonify({"error": error}), 400
+    name, start, length = params['name'], params['start'], params['length']
+    strip, reverse, mirror = params['strip'], params['reverse'], params['mirror']
+    # Checked rather than cast: the definition is saved and comes back at boot
+    if not isinstance(name, str) or not name:
+        return jsonify({"error": "'name' must be a non-empty string."}), 400
+    if not all(isinstance(value, int) and not isinstance(value, bool) for value in (start, length)):
+        return jsonify({"error": "Start and length must be integers."}), 400
+    if not isinstance(strip, str):
+        return jsonify({"error": "'strip' must be a strip name."}), 400
+    if not isinstance(reverse, bool) or not isinstance(mirror, bool):
+        return jsonify({"error": "Reverse and mirror must be true or false."}), 400
+    try:
+        pixel_map = pixelmap.from_spec(params['map']) if params['map'] is not None else None
+        segment = controller.define_segment(name, start, length, strip, reverse, mirror, pixel_map)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    # Redefining a segment stops its effect
+    definition = {"start": start, "length": length, "strip": strip, "reverse": reverse,
+                  "mirror": mirror, "map": params['map']}
+    apply_database_batch([('write', segment_key(name), definition), ('delete', [active_effect_key(name)])])
+    return jsonify({"status": f"Segment '{name}' defined.", "name": name, **segment.describe()}), 200
+
+@app.route('/segments/delete', methods=['POST'])
+def api_remove_segment():
+    data = request.get_json()
+    name = data.get('name')
+    if name == controller.DEFAULT_SEGMENT or segment_error(name):
+        return jsonify({"error": f"Cannot remove segment: {name}"}), 400
+    controller.stop_current_effect(name)
+    controller.remove_segment(name)
+    remove_from_database([segment_key(name), active_effect_key(name)])
+    return jsonify({"status": f"Segment '{name}' removed."}), 200
+
+@app.route('/frame_cache', methods=['GET'])
+def api_frame_cache():
+    return jsonify(controller.get_frame_cache_stats()), 200
+
+@app.route('/healthz', methods=['GET'])
+def api_healthz():
+    # Liveness: the process answers and the render thread, once started, has not died
+    worker = controller.worker
+    if worker is not None and not worker.thread.is_alive():
+        return jsonify({"status": "render worker stopped"}), 503
+    return jsonify({"status": "ok"}), 200
+
+@app.route('/readyz', methods=['GET'])
+def api_readyz():
+    # Readiness: the saved state is restored and every strip can show frames
+    worker = controller.worker
+    if worker is None:
+        render = 'idle'
+    else:
+        render = 'running' if worker.thread.is_alive() else 'stopped'
+    errors = {name: output.error for name, output in controller.strips.items() if output.error is not None}
+    processes = []
+    if controller.RENDER_PROCESSES:
+        import renderproc
+        processes = renderproc.describe()
+    state = 'restoring' if restoring else 'done' if restored else 'pending'
+    ready = (state == 'done' and render != 'stopped' and not errors
+             and all(process['alive'] for process in processes))
+    body = {"ready": ready, "restore": state, "render_worker": render, "render_processes": processes,
+            "strip_errors": errors, "startup_seconds": dict(boot.timings)}
+    return jsonify(body), 200 if ready else 503
+
+@app.route('/metrics', methods=['GET'])
+def api_metrics():
+    return Response(metrics.registry.expose(), mimetype='text/plain; version=0.0.4')
+
 # New APIs for database interaction
 @app.route('/write', methods=['POST'])
 def api_write():
     data = request.get_json()
+    items = data.get('items')
+    if items is not None:
+        # Bulk form: {"items": {"key": value, ...}}
+        if not isinstance(items, dict) or not items or None in items.values():
+            return jsonify({"error": "'items' must be a non-empty object of keys to values."}), 400
+        update_database_many(items.items())
+        return jsonify({"status": f"{len(items)} keys written successfully.", "keys": list(items)}), 200
     key = data.get('key')
     value = data.get('value')
     if key is None or value is None:
         return jsonify({"error": "Both 'key' and 'value' are required."}), 400
+    if not isinstance(key, str):
+        return jsonify({"error": "'key' must be a string."}), 400
     
     update_database(key, value)
 
@@ -253,9 +363,314 @@ def api_delete():
     remove_from_database(keys)
     return jsonify({"status": f"Keys {keys} deleted successfully."}), 200
 
+def parse_batch_operation(operation):
+    """
+    Validate one /batch operation.
+
+    :return: Tuple of (operation_type, params, error_message)
+    """
+    if not isinstance(operation, dict):
+        return None, None, "Each operation must be an object."
+    op = operation.get('op')
+    if op == 'effect':
+        name = operation.get('effect')
+        params, error = parse_effect(name, operation.get('params') or {})
+        return op, (name, params), error
+    if op == 'brightness':
+        params, error = parse_brightness(operation)
+        return op, params, error
+    if op == 'write':
+        key, value = operation.get('key'), operation.get('value')
+        if key is None or value is None:
+            return None, None, "Both 'key' and 'value' are required."
+        if not isinstance(key, str):
+            return None, None, "'key' must be a string."
+        return op, (key, value), None
+    if op == 'delete':
+        keys = operation.get('keys')
+        if not isinstance(keys, list):
+            return None, None, "'keys' must be a list of keys to delete."
+        return op, keys, None
+    return None, None, f"Unknown op: {op}. Choose from effect, brightness, write, delete."
+
+@app.route('/batch', methods=['POST'])
+def api_batch():
+    """Apply an ordered list of operations together, or none of them if any is invalid."""
+    data = request.get_json()
+    operations = data.get('operations')
+    if not isinstance(operations, list):
+        return jsonify({"error": "'operations' must be a list of operations."}), 400
+    parsed = []
+    for index, operation in enumerate(operations):
+        op, params, error = parse_batch_operation(operation)
+        if error:
+            return jsonify({"error": f"Operation {index}: {error}"}), 400
+        parsed.append((op, params))
+
+    batch = controller.Batch()
+    database_ops = []
+    for op, params in parsed:
+        if op == 'effect':
+            name, effect_params = params
+            start_effect(batch, name, effect_params)
+            database_ops.extend(('write', key, value) for key, value in effect_records(name, effect_params))
+        elif op == 'brightness':
+            batch.set_brightness(params['brightness'])
+            database_ops.append(('write', 'set_brightness', params))
+        elif op == 'write':
+            database_ops.append(('write', *params))
+        else:
+            database_ops.append(('delete', params))
+    batch.submit()
+    apply_database_batch(database_ops)
+    return jsonify({"status": f"{len(parsed)} operations applied.", "applied": len(parsed)}), 200
+
+# Presets, playlists and daily schedules
+PRESET_PREFIX = 'preset:'
+PLAYLIST_PREFIX = 'playlist:'
+PLAYING_PREFIX = 'playing:'  # Marks a playlist as playing, so it restarts after a restart
+SCHEDULE_PREFIX = 'schedule:'
+
+# Runs on the render thread: only change it through controller.run_on_render_thread
+playlists = playlist.PlaylistScheduler(controller.timers)
+
+def parse_name(data):
+    name = data.get('name') if isinstance(data, dict) else None
+    if not isinstance(name, str) or not name:
+        return None, "'name' must be a non-empty string."
+    return name, None
+
+def parse_preset(data):
+    params, error = extract_api_parameters(data, ['name', 'effects'], {'brightness': None})
+    if error:
+        return None, error
+    name, error = parse_name(params)
+    if error:
+        return None, error
+    if not isinstance(params['effects'], list):
+        return None, "'effects' must be a list of {\"effect\": name, \"params\": {...}} objects."
+    preset_effects = []
+    for index, item in enumerate(params['effects']):
+        if not isinstance(item, dict):
+            return None, f"Effect {index}: each effect must be an object."
+        effect_params, error = parse_effect(item.get('effect'), item.get('params') or {})
+        if error:
+            return None, f"Effect {index}: {error}"
+        preset_effects.append({"effect": item['effect'], "params": effect_params})
+    brightness = params['brightness']
+    if brightness is not None:
+        brightness, error = parse_brightness({'brightness': brightness})
+        if error:
+            return None, error
+        brightness = brightness['brightness']
+    return {"name": name, "effects": preset_effects, "brightness": brightness}, None
+
+def parse_playlist(data):
+    params, error = extract_api_parameters(data, ['name', 'entries'], {'loop': True})
+    if error:
+        return None, error
+    name, error = parse_name(params)
+    if error:
+        return None, error
+    entries = params['entries']
+    if not isinstance(entries, list) or not entries:
+        return None, "'entries' must be a non-empty list of {\"preset\": name, \"duration\": seconds} objects."
+    parsed = []
+    for index, entry in enumerate(entries):
+        if not isinstance(entry, dict) or not isinstance(entry.get('preset'), str):
+            return None, f"Entry {index}: 'preset' must name a preset."
+        try:
+            duration = float(entry.get('duration'))
+            if not duration >= playlist.MIN_DURATION:
+                raise ValueError
+        except (TypeError, ValueError):
+            return None, f"Entry {index}: 'duration' must be at least {playlist.MIN_DURATION} seconds."
+        parsed.append({"preset": entry['preset'], "duration": duration})
+    return {"name": name, "entries": parsed, "loop": bool(params['loop'])}, None
+
+def parse_schedule(data):
+    params, error = extract_api_parameters(data, ['name', 'at'], {'preset': None, 'playlist': None})
+    if error:
+        return None, error
+    name, error = parse_name(params)
+    if error:
+        return None, error
+    try:
+        playlist.parse_time_of_day(params['at'])
+    except (AttributeError, ValueError):
+        return None, "'at' must be a local time of day, 'HH:MM' or 'HH:MM:SS'."
+    if (params['preset'] is None) == (params['playlist'] is None):
+        return None, "Give either 'preset' or 'playlist'."
+    target = params['preset'] if params['preset'] is not None else params['playlist']
+    if not isinstance(target, str):
+        return None, "'preset' or 'playlist' must be a name."
+    return params, None
+
+def preset_changes(target, preset):
+    """Apply a preset through target (the controller or a controller.Batch); returns the database writes recording it."""
+    records = []
+    for item in preset['effects']:
+        start_effect(target, item['effect'], item['params'])
+        records.extend(effect_records(item['effect'], item['params']))
+    if preset.get('brightness') is not None:
+        target.set_brightness(preset['brightness'])
+        records.append(('set_brightness', {"brightness": preset['brightness']}))
+    return records
+
+def apply_saved_preset(name):
+    """Apply a saved preset right away; only call this on the render thread."""
+    preset = get_from_database([PRESET_PREFIX + name])[PRESET_PREFIX + name]
+    if preset is None:
+        logger.error("Unknown preset", extra={"fields": {"preset": name}})
+        return
+    batch = controller.Batch()
+    try:
+        records = preset_changes(batch, preset)
+    except KeyError as e:
+        logger.error("Could not apply preset", extra={"fields": {"preset": name, "error": str(e)}})
+        return
+    batch.apply(controller.get_worker())
+    update_database_many(records)
+    logger.info("Preset applied", extra={"fields": {"preset": name}})
+
+def play_playlist(name, saved):
+    """Start a saved playlist; only call this on the render thread."""
+    entries = [(lambda preset=entry['preset']: apply_saved_preset(preset), entry['duration'])
+               for entry in saved['entries']]
+    playlists.play(name, entries, saved['loop'], on_end=lambda: remove_from_database([PLAYING_PREFIX + name]))
+    update_database(PLAYING_PREFIX + name, True)
+
+def play_saved_playlist(name):
+    """Start the playlist saved under name; only call this on the render thread."""
+    saved = get_from_database([PLAYLIST_PREFIX + name])[PLAYLIST_PREFIX + name]
+    if saved is None:
+        logger.error("Unknown playlist", extra={"fields": {"playlist": name}})
+        return
+    play_playlist(name, saved)
+
+def arm_schedule(name, schedule):
+    """Register a saved daily schedule entry with the playlist scheduler."""
+    at = playlist.parse_time_of_day(schedule['at'])
+    if schedule.get('preset') is not None:
+        action = lambda: apply_saved_preset(schedule['preset'])
+    else:
+        action = lambda: play_saved_playlist(schedule['playlist'])
+    controller.run_on_render_thread(lambda: playlists.add_daily(name, at, action))
+
+def saved_by_name(prefix):
+    return {key[len(prefix):]: value for key, value in find_in_database(prefix).items()}
+
+@app.route('/presets', methods=['GET'])
+def api_presets():
+    return jsonify({"presets": saved_by_name(PRESET_PREFIX)}), 200
+
+@app.route('/presets', methods=['POST'])
+def api_save_preset():
+    preset, error = parse_preset(request.get_json())
+    if error:
+        return jsonify({"error": error}), 400
+    update_database(PRESET_PREFIX + preset['name'], preset)
+    return jsonify({"status": f"Preset '{preset['name']}' saved.", **preset}), 200
+
+@app.route('/presets/apply', methods=['POST'])
+def api_apply_preset():
+    name, error = parse_name(request.get_json())
+    if error:
+        return jsonify({"error": error}), 400
+    preset = get_from_database([PRESET_PREFIX + name])[PRESET_PREFIX + name]
+    if preset is None:
+        return jsonify({"error": f"Unknown preset: {name}"}), 404
+    batch = controller.Batch()
+    try:
+        records = preset_changes(batch, preset)
+    except KeyError as e:
+        return jsonify({"error": f"Preset '{name}' uses an unknown effect: {e}"}), 400
+    batch.submit()
+    update_database_many(records)
+    return jsonify({"status": f"Preset '{name}' applied."}), 200
+
+@app.route('/presets/delete', methods=['POST'])
+def api_delete_preset():
+    name, error = parse_name(request.get_json())
+    if error:
+        return jsonify({"error": error}), 400
+    remove_from_database([PRESET_PREFIX + name])
+    return jsonify({"status": f"Preset '{name}' deleted."}), 200
+
+@app.route('/playlists', methods=['GET'])
+def api_playlists():
+    return jsonify({"playlists": saved_by_name(PLAYLIST_PREFIX),
+                    "playing": sorted(saved_by_name(PLAYING_PREFIX))}), 200
+
+@app.route('/playlists', methods=['POST'])
+def api_save_playlist():
+    saved, error = parse_playlist(request.get_json())
+    if error:
+        return jsonify({"error": error}), 400
+    update_database(PLAYLIST_PREFIX + saved['name'], saved)
+    return jsonify({"status": f"Playlist '{saved['name']}' saved.", **saved}), 200
+
+@app.route('/playlists/play', methods=['POST'])
+def api_play_playlist():
+    name, error = parse_name(request.get_json())
+    if error:
+        return jsonify({"error": error}), 400
+    saved = get_from_database([PLAYLIST_PREFIX + name])[PLAYLIST_PREFIX + name]
+    if saved is None:
+        return jsonify({"error": f"Unknown playlist: {name}"}), 404
+    controller.run_on_render_thread(lambda: play_playlist(name, saved))
+    return jsonify({"status": f"Playlist '{name}' started."}), 200
+
+@app.route('/playlists/stop', methods=['POST'])
+def api_stop_playlist():
+    data = request.get_json(silent=True) or {}
+    name = data.get('name')
+    if name is not None and not isinstance(name, str):
+        return jsonify({"error": "'name' must be a playlist name."}), 400
+    controller.run_on_render_thread(lambda: playlists.stop(name))
+    remove_from_database([PLAYING_PREFIX + name] if name is not None else list(find_in_database(PLAYING_PREFIX)))
+    return jsonify({"status": f"Playlist '{name}' stopped." if name else "All playlists stopped."}), 200
+
+@app.route('/playlists/delete', methods=['POST'])
+def api_delete_playlist():
+    name, error = parse_name(request.get_json())
+    if error:
+        return jsonify({"error": error}), 400
+    controller.run_on_render_thread(lambda: playlists.stop(name))
+    remove_from_database([PLAYLIST_PREFIX + name, PLAYING_PREFIX + name])
+    return jsonify({"status": f"Playlist '{name}' deleted."}), 200
+
+@app.route('/schedules', methods=['GET'])
+def api_schedules():
+    return jsonify({"schedules": saved_by_name(SCHEDULE_PREFIX)}), 200
+
+@app.route('/schedules', methods=['POST'])
+def api_save_schedule():
+    schedule, error = parse_schedule(request.get_json())
+    if error:
+        return jsonify({"error": error}), 400
+    update_database(SCHEDULE_PREFIX + schedule['name'], schedule)
+    arm_schedule(schedule['name'], schedule)
+    return jsonify({"status": f"Schedule '{schedule['name']}' saved.", **schedule}), 200
+
+@app.route('/schedules/delete', methods=['POST'])
+def api_delete_schedule():
+    name, error = parse_name(request.get_json())
+    if error:
+        return jsonify({"error": error}), 400
+    controller.run_on_render_thread(lambda: playlists.remove_daily(name))
+    remove_from_database([SCHEDULE_PREFIX + name])
+    return jsonify({"status": f"Schedule '{name}' deleted."}), 200
+
 if __name__ == '__main__':
     try:
-        # Initialize the database file if it doesn't exist
-        app.run(host='0.0.0.0', port=5000)
+        metrics.configure_logging()
+        # Bring back the last scene before the web server starts accepting requests
+        # (boot.py does this before importing Flask, for a faster first light)
+        restore_state()
+        stream.start_receiver()
+        sync.start_sync()
+        boot.mark('ready')
+        app.run(host='0.0.0.0', port=PORT)
     except KeyboardInterrupt:
         pass
@@ -0,0 +1,237 @@
+# stream.py
+
+"""
+Real-time UDP pixel streaming in DDP or E1.31 (sACN) framing.
+
+A StreamReceiver takes raw RGB frames from the network and shows them on
+a strip, taking it over from its effects while packets arrive; the render
+worker falls back to the effects after controller.STREAM_TIMEOUT seconds
+without a frame.
+
+Usage:
+    python stream.py receive [ddp|e131]
+    python stream.py send HOST [ddp|e131] [fps] [seconds]
+"""
+
+import logging
+import os
+import socket
+import sys
+import threading
+import time
+
+import controller
+import metrics
+
+DDP_PORT = 4048
+E131_PORT = 5568
+E131_UNIVERSE = 1  # Universe that carries the first pixels of the strip
+E131_PIXELS_PER_UNIVERSE = 170  # 510 of the 512 DMX channels
+DDP_MAX_DATA = 1440  # Payload bytes per DDP packet (480 pixels), fits an Ethernet frame
+STREAM = os.environ.get('LED_STREAM')  # Start a receiver with the server: ddp, e131 or unset
+
+logger = logging.getLogger('stream')
+
+DDP_FLAG_VERSION = 0x40
+DDP_FLAG_TIMECODE = 0x10
+DDP_FLAG_PUSH = 0x01
+E131_ACN_ID = b'ASC-E1.17\x00\x00\x00'
+
+class StreamReceiver:
+    """
+    Receives DDP or E1.31 packets on a UDP socket and shows the frames.
+
+    Packets are read with recv_into() into one preallocated buffer and
+    their payload is copied once into the frame buffer at its offset, so
+    nothing is allocated per packet. A frame is handed to the render
+    worker when it is complete: on a DDP packet with the push flag, or on
+    the E1.31 packet for the last universe of the strip. If the worker is
+    still busy with the previous frame, frames are merged rather than
+    queued.
+
+    Args:
+        protocol (str): 'ddp' or 'e131'.
+        port (int): UDP port, defaults to the protocol's standard port.
+        strip (str): Name of the controller strip to show the frames on.
+        host (str): Address to bind to.
+    """
+
+    def __init__(self, protocol='ddp', port=None, strip=controller.DEFAULT_STRIP, host='0.0.0.0'):
+        if protocol not in ('ddp', 'e131'):
+            raise ValueError(f"Unknown stream protocol: {protocol}. Choose from ddp, e131.")
+        self.protocol = protocol
+        self.strip = strip
+        self.frame = bytearray(len(controller.strips[strip].buffer))
+        self.packet = bytearray(65536)
+        self.view = memoryview(self.packet)
+        self.lock = threading.Lock()  # Guards frame against the render thread
+        self.show_pending = False
+        self.packets = 0
+        self.frames = 0
+        self.bad_packets = 0
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 20)
+        self.socket.bind((host, port or (DDP_PORT if protocol == 'ddp' else E131_PORT)))
+        self.address = self.socket.getsockname()
+        self.thread = None
+
+    def start(self):
+        """Receive on a background thread."""
+        self.thread = threading.Thread(target=self.run, name=f'{self.protocol}-receiver', daemon=True)
+        self.thread.start()
+        return self
+
+    def run(self):
+        handle = self.handle_ddp if self.protocol == 'ddp' else self.handle_e131
+        while True:
+            try:
+                size = self.socket.recv_into(self.packet)
+            except OSError:
+                # Socket closed
+                return
+            self.packets += 1
+            if not handle(size):
+                self.bad_packets += 1
+
+    def close(self):
+        self.socket.close()
+
+    def handle_ddp(self, size):
+        """Apply one DDP packet. Returns False if it is malformed."""
+        packet = self.packet
+        if size < 10 or packet[0] & 0xC0 != DDP_FLAG_VERSION:
+            return False
+        header = 14 if packet[0] & DDP_FLAG_TIMECODE else 10
+        offset = int.from_bytes(packet[4:8], 'big')
+        length = min(int.from_bytes(packet[8:10], 'big'), size - header)
+        self.write(offset, self.view[header:header + length])
+        if packet[0] & DDP_FLAG_PUSH:
+            self.present()
+        return True
+
+    def handle_e131(self, size):
+        """Apply one E1.31 data packet. Returns False if it is malformed."""
+        packet = self.packet
+        if (size < 126 or packet[4:16] != E131_ACN_ID or packet[18:22] != b'\x00\x00\x00\x04'
+                or packet[40:44] != b'\x00\x00\x00\x02' or packet[125] != 0):
+            return False
+        universe = int.from_bytes(packet[113:115], 'big') - E131_UNIVERSE
+        count = min(int.from_bytes(packet[123:125], 'big') - 1, size - 126)
+        if universe < 0:
+            return True
+        offset = universe * E131_PIXELS_PER_UNIVERSE * 3
+        self.write(offset, self.view[126:126 + count])
+        if offset + E131_PIXELS_PER_UNIVERSE * 3 >= len(self.frame):
+            self.present()
+        return True
+
+    def write(self, offset, data):
+        end = min(offset + len(data), len(self.frame))
+        if end > offset:
+            with self.lock:
+                self.frame[offset:end] = data[:end - offset]
+
+    def present(self):
+        self.frames += 1
+        with self.lock:
+            if self.show_pending:
+                return
+            self.show_pending = True
+        controller.get_worker().submit(self._show)
+
+    def _show(self):
+        # Runs on the render thread
+        with self.lock:
+            self.show_pending = False
+            controller.get_worker().show_stream(self.strip, self.frame)
+
+def ddp_header(offset, length, last, sequence=0):
+    """Header of the DDP packet carrying length bytes of a frame from offset on."""
+    flags = DDP_FLAG_VERSION | (DDP_FLAG_PUSH if last else 0)
+    # Data type 0x0B: RGB, 8 bits per channel; destination 1: the default output
+    return bytes((flags, sequence & 0x0F, 0x0B, 1)) + offset.to_bytes(4, 'big') + length.to_bytes(2, 'big')
+
+def ddp_packets(frame, sequence=0):
+    """Split an RGB frame into DDP packets, with the push flag on the last one."""
+    view = memoryview(frame)
+    packets = []
+    for offset in range(0, len(frame), DDP_MAX_DATA):
+        data = view[offset:offset + DDP_MAX_DATA]
+        packets.append(ddp_header(offset, len(data), offset + DDP_MAX_DATA >= len(frame), sequence) + data)
+    return packets
+
+def e131_packets(frame, sequence=0, source_name=b'RGBLampControl'):
+    """Split an RGB frame into one E1.31 data packet per universe."""
+    view = memoryview(frame)
+    packets = []
+    universe_bytes = E131_PIXELS_PER_UNIVERSE * 3
+    for index, offset in enumerate(range(0, len(frame), universe_bytes)):
+        data = bytes(view[offset:offset + universe_bytes])
+        count = len(data) + 1
+        root = (b'\x00\x10\x00\x00' + E131_ACN_ID + (0x7000 | (count + 109)).to_bytes(2, 'big')
+                + b'\x00\x00\x00\x04' + b'\x00' * 16)
+        framing = ((0x7000 | (count + 87)).to_bytes(2, 'big') + b'\x00\x00\x00\x02'
+                   + source_name.ljust(64, b'\x00')[:64] + bytes((100,)) + b'\x00\x00'
+                   + bytes((sequence & 0xFF, 0)) + (E131_UNIVERSE + index).to_bytes(2, 'big'))
+        dmp = ((0x7000 | (count + 10)).to_bytes(2, 'big') + b'\x02\xa1\x00\x00\x00\x01'
+               + count.to_bytes(2, 'big') + b'\x00')
+        packets.append(root + framing + dmp + data)
+    return packets
+
+def send_frame(sock, address, frame, sequence=0, protocol='ddp'):
+    """
+    Send one RGB frame to address over an unconnected UDP socket.
+
+    DDP packets are sent with sendmsg() as a header plus a slice of the
+    frame, so the pixel data is never copied into a packet.
+    """
+    if protocol != 'ddp':
+        for packet in e131_packets(frame, sequence):
+            sock.sendto(packet, address)
+        return
+    view = memoryview(frame)
+    for offset in range(0, len(frame), DDP_MAX_DATA):
+        data = view[offset:offset + DDP_MAX_DATA]
+        header = ddp_header(offset, len(data), offset + DDP_MAX_DATA >= len(frame), sequence)
+        sock.sendmsg([header, data], [], 0, address)
+
+def send(host, protocol='ddp', fps=60, seconds=10, led_count=None, port=None):
+    """Stream a moving rainbow to a receiver at the given frame rate."""
+    led_count = led_count or controller.LED_COUNT
+    port = port or (DDP_PORT if protocol == 'ddp' else E131_PORT)
+    packetize = ddp_packets if protocol == 'ddp' else e131_packets
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    colors = [controller.wheel(i * 256 // led_count) for i in range(led_count)]
+    frames = int(fps * seconds)
+    start = time.monotonic()
+    for n in range(frames):
+        frame = b''.join(bytes(colors[(i + n) % led_count]) for i in range(led_count))
+        for packet in packetize(frame, n):
+            sock.sendto(packet, (host, port))
+        delay = start + (n + 1) / fps - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+    print(f"Sent {frames} frames to {host}:{port} over {protocol}.")
+
+def start_receiver(protocol=None):
+    """Start the receiver selected by LED_STREAM (or protocol); returns None if streaming is off."""
+    protocol = protocol or STREAM
+    if not protocol:
+        return None
+    receiver = StreamReceiver(protocol).start()
+    logger.info("Receiving frames", extra={"fields": {
+        "protocol": protocol, "host": receiver.address[0], "port": receiver.address[1]}})
+    return receiver
+
+if __name__ == '__main__':
+    if len(sys.argv) >= 2 and sys.argv[1] == 'receive':
+        metrics.configure_logging()
+        start_receiver(sys.argv[2] if len(sys.argv) > 2 else 'ddp')
+        threading.Event().wait()
+    elif len(sys.argv) >= 3 and sys.argv[1] == 'send':
+        send(sys.argv[2],
+             sys.argv[3] if len(sys.argv) > 3 else 'ddp',
+             float(sys.argv[4]) if len(sys.argv) > 4 else 60,
+             float(sys.argv[5]) if len(sys.argv) > 5 else 10)
+    else:
+        sys.exit(__doc__)
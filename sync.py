@@ -0,0 +1,289 @@
+# sync.py
+
+"""
+Leader/follower frame synchronization between controllers over UDP.
+
+The leader counts frames from a fixed epoch on its monotonic clock and
+sends its effect state (the active effect of every segment and the
+brightness, as saved in its state store) to every follower, whenever it
+changes and every STATE_INTERVAL seconds. Followers ping the leader,
+estimate the offset between the two clocks from the round trip with
+the smallest delay (NTP style), and render with the leader's epoch
+translated to their own clock. Every node then renders frame N of the
+same effect at the same moment, so effects spanning several strips stay
+phase-locked.
+
+State messages carry the leader's session, a random token chosen when
+it starts, and a version that grows with every change. A follower
+applies a state only if it is newer than the last one it applied from
+the same session, so reordered packets are not applied out of order,
+and it starts over when the leader restarts with a new session.
+
+Followers need the same segment names as the leader.
+
+Usage:
+    LED_SYNC=leader python server.py
+    LED_SYNC=follower LED_SYNC_LEADER=192.168.1.10 python server.py
+"""
+
+import collections
+import json
+import logging
+import os
+import socket
+import threading
+import time
+
+import controller
+import effects
+from boot import ACTIVE_EFFECT_PREFIX
+from db import find_in_database, get_from_database, watch_database
+
+SYNC_PORT = 4050
+SYNC = os.environ.get('LED_SYNC')  # Start a sync role with the server: leader, follower or unset
+LEADER = os.environ.get('LED_SYNC_LEADER', '127.0.0.1')  # Leader address for followers, host or host:port
+PING_INTERVAL = 0.25  # Seconds between clock offset probes
+OFFSET_SAMPLES = 32  # Probes the offset estimate is chosen from (the one with the shortest round trip)
+STATE_INTERVAL = 1.0  # Seconds between repeated state messages, for lost packets and late followers
+FOLLOWER_TIMEOUT = 5.0  # Forget followers that have not pinged for this long
+EPOCH_TOLERANCE = 0.0005  # Move the local epoch when the estimate changes by more than this (seconds)
+
+logger = logging.getLogger('sync')
+
+class SyncLeader:
+    """
+    Sends the frame epoch and effect state to the followers that ping it.
+
+    Args:
+        port (int): UDP port to listen on for pings.
+        host (str): Address to bind to.
+    """
+
+    def __init__(self, port=SYNC_PORT, host='0.0.0.0', clock=time.monotonic):
+        self.clock = clock
+        self.epoch = clock()
+        self.followers = {}  # Address -> clock time of its last ping
+        self.session = os.urandom(8).hex()  # New on every start, so followers notice a restarted leader
+        self.version = 0
+        self.state = None
+        self.lock = threading.Lock()  # Guards followers, version and state
+        self.changed = threading.Event()  # Set when the state store changed, for the announce thread
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.bind((host, port))
+        self.address = self.socket.getsockname()
+        self.closed = threading.Event()
+
+    def start(self):
+        controller.set_frame_epoch(self.epoch)
+        self.state = self.read_state()
+        watch_database(self.on_change)
+        threading.Thread(target=self.run, name='sync-leader', daemon=True).start()
+        threading.Thread(target=self.announce, name='sync-announce', daemon=True).start()
+        return self
+
+    def read_state(self):
+        brightness = get_from_database(['set_brightness'])['set_brightness']
+        return {
+            "effects": {key[len(ACTIVE_EFFECT_PREFIX):]: value
+                        for key, value in find_in_database(ACTIVE_EFFECT_PREFIX).items()},
+            "brightness": brightness['brightness'] if brightness else None,
+        }
+
+    def on_change(self, changes):
+        # Runs on whichever thread wrote the state store, e.g. the render thread for
+        # playlist timers: leave reading the state and sending it to the announce thread
+        if any(key == 'set_brightness' or isinstance(key, str) and key.startswith(ACTIVE_EFFECT_PREFIX)
+               for key in changes):
+            self.changed.set()
+
+    def state_message(self):
+        with self.lock:
+            return json.dumps({"type": "state", "epoch": self.epoch, "session": self.session,
+                               "version": self.version, **self.state}).encode()
+
+    def send_state(self, addresses=None):
+        message = self.state_message()
+        now = self.clock()
+        with self.lock:
+            for address, seen in list(self.followers.items()):
+                if now - seen > FOLLOWER_TIMEOUT:
+                    del self.followers[address]
+            addresses = list(self.followers) if addresses is None else addresses
+        for address in addresses:
+            try:
+                self.socket.sendto(message, address)
+            except OSError as e:
+                logger.error("Could not send state", extra={"fields": {"follower": address, "error": str(e)}})
+
+    def announce(self):
+        """Send the state when it changes, and every STATE_INTERVAL seconds."""
+        while not self.closed.is_set():
+            if self.changed.wait(STATE_INTERVAL):
+                if self.closed.is_set():
+                    return
+                self.changed.clear()
+                state = self.read_state()
+                with self.lock:
+                    self.state = state
+                    self.version += 1
+            self.send_state()
+
+    def run(self):
+        while True:
+            try:
+                data, address = self.socket.recvfrom(2048)
+            except OSError:
+                # Socket closed
+                return
+            received = self.clock()
+            try:
+                message = json.loads(data)
+            except ValueError:
+                continue
+            if message.get('type') != 'ping':
+                continue
+            with self.lock:
+                new = address not in self.followers
+                self.followers[address] = received
+            reply = {"type": "pong", "t0": message.get('t0'), "t1": received}
+            reply["t2"] = self.clock()
+            self.socket.sendto(json.dumps(reply).encode(), address)
+            if new:
+                logger.info("Follower joined", extra={"fields": {"follower": address}})
+                self.send_state([address])
+
+    def close(self):
+        self.closed.set()
+        self.changed.set()
+        self.socket.close()
+
+class SyncFollower:
+    """
+    Follows a leader's frame epoch and effect state.
+
+    Args:
+        leader (tuple): (host, port) of the leader.
+        clock (callable): The monotonic clock the render worker uses.
+    """
+
+    def __init__(self, leader, clock=time.monotonic):
+        self.leader = leader
+        self.clock = clock
+        self.samples = collections.deque(maxlen=OFFSET_SAMPLES)  # (round trip, offset) pairs
+        self.offset = None  # Leader clock minus local clock
+        self.round_trip = None
+        self.leader_epoch = None
+        self.epoch = None
+        self.session = None  # Leader session of the last applied state
+        self.version = None  # Version of the last applied state
+        self.applied = {"effects": {}, "brightness": None}
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.bind(('0.0.0.0', 0))
+        self.closed = threading.Event()
+
+    def start(self):
+        threading.Thread(target=self.run, name='sync-follower', daemon=True).start()
+        threading.Thread(target=self.ping, name='sync-ping', daemon=True).start()
+        return self
+
+    def ping(self):
+        while not self.closed.is_set():
+            try:
+                self.socket.sendto(json.dumps({"type": "ping", "t0": self.clock()}).encode(), self.leader)
+            except OSError:
+                return
+            self.closed.wait(PING_INTERVAL)
+
+    def run(self):
+        while True:
+            try:
+                data = self.socket.recv(65536)
+            except OSError:
+                # Socket closed
+                return
+            received = self.clock()
+            try:
+                message = json.loads(data)
+            except ValueError:
+                continue
+            if message.get('type') == 'pong':
+                self.on_pong(message, received)
+            elif message.get('type') == 'state':
+                self.on_state(message)
+
+    def on_pong(self, message, received):
+        t0, t1, t2, t3 = message['t0'], message['t1'], message['t2'], received
+        round_trip = (t3 - t0) - (t2 - t1)
+        self.samples.append((round_trip, ((t1 - t0) + (t2 - t3)) / 2))
+        # The probe with the shortest round trip had the least queuing delay to skew it
+        self.round_trip, self.offset = min(self.samples)
+        self.update_epoch()
+
+    def update_epoch(self):
+        if self.offset is None or self.leader_epoch is None:
+            return
+        epoch = self.leader_epoch - self.offset
+        if self.epoch is None or abs(epoch - self.epoch) > EPOCH_TOLERANCE:
+            if self.epoch is None:
+                logger.info("Synchronized", extra={"fields": {
+                    "offset": self.offset, "round_trip": self.round_trip}})
+            self.epoch = epoch
+            controller.set_frame_epoch(epoch)
+
+    def on_state(self, message):
+        self.leader_epoch = message['epoch']
+        self.update_epoch()
+        session, version = message.get('session'), message['version']
+        if session == self.session and version <= self.version:
+            # Already applied, or reordered behind a newer state
+            return
+        if session != self.session and self.session is not None:
+            logger.info("Leader restarted", extra={"fields": {"session": session}})
+        self.session, self.version = session, version
+        batch = controller.Batch()
+        stopped = []
+        wanted = message.get('effects') or {}
+        for segment in set(wanted) | set(self.applied["effects"]):
+            active = wanted.get(segment)
+            if active == self.applied["effects"].get(segment):
+                continue
+            if active is None:
+                batch.stop_current_effect(segment)
+                stopped.append(segment)
+                continue
+            effect = effects.get_effect(active['effect'])
+            if effect is None:
+                logger.error("Unknown effect", extra={"fields": {"effect": active['effect']}})
+                continue
+            batch.start_effect(effect.function, *effect.arguments(active['params']), segment=segment)
+        brightness = message.get('brightness')
+        if brightness is not None and brightness != self.applied["brightness"]:
+            batch.set_brightness(brightness)
+        if batch.commands:
+            batch.submit()
+        for segment in stopped:
+            controller.cleanup(segment)
+        self.applied = {"effects": wanted, "brightness": brightness}
+
+    def close(self):
+        self.closed.set()
+        self.socket.close()
+
+def parse_address(text, default_port=SYNC_PORT):
+    host, _, port = text.partition(':')
+    return host, int(port) if port else default_port
+
+def start_sync(role=None):
+    """Start the sync role selected by LED_SYNC (or role); returns None if sync is off."""
+    role = role or SYNC
+    if not role:
+        return None
+    if role == 'leader':
+        node = SyncLeader().start()
+        logger.info("Sync leader started", extra={"fields": {"port": node.address[1]}})
+        return node
+    if role == 'follower':
+        node = SyncFollower(parse_address(LEADER)).start()
+        logger.info("Sync follower started", extra={"fields": {"leader": LEADER}})
+        return node
+    raise ValueError(f"Unknown sync role: {role}. Choose from leader, follower.")
@@ -0,0 +1,10 @@
+# tests/conftest.py
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Never drive real LEDs or touch the saved state from the tests
+os.environ['LED_BACKEND'] = 'memory'
+os.environ['LED_DB_PATH'] = os.path.join(tempfile.mkdtemp(), 'test.journal')
@@ -0,0 +1,81 @@
+# tests/test_db.py
+
+import json
+
+import pytest
+
+import db
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'state.journal')
+
+def open_store(path):
+    # No background flushes: the tests flush by hand
+    return db.JournalStore(path, flush_interval=3600)
+
+def test_replay_restores_writes_and_deletes(path):
+    store = open_store(path)
+    store.set('a', 1)
+    store.batch([('write', 'b', {"x": [1, 2]}), ('write', 'c', 3), ('delete', ['a'])])
+    store.set('c', 4)
+    store.close()
+    reopened = open_store(path)
+    assert reopened.get(['a', 'b', 'c']) == {'a': None, 'b': {"x": [1, 2]}, 'c': 4}
+    assert reopened.items('b') == {'b': {"x": [1, 2]}}
+    reopened.close()
+
+def test_writes_stay_in_memory_until_flushed(path):
+    store = open_store(path)
+    store.set('a', 1)
+    assert open_store(path).get(['a']) == {'a': None}
+    store.flush()
+    assert open_store(path).get(['a']) == {'a': 1}
+    store.close()
+
+def test_torn_last_line_is_truncated(path):
+    store = open_store(path)
+    store.set('a', 1)
+    store.flush()
+    store.set('b', 2)
+    store.close()
+    with open(path, 'a') as journal:
+        journal.write('{"k": "c", "v"')  # Power cut mid-write
+    reopened = open_store(path)
+    assert reopened.get(['a', 'b', 'c']) == {'a': 1, 'b': 2, 'c': None}
+    reopened.set('d', 4)
+    reopened.close()
+    with open(path) as journal:
+        assert [json.loads(line) for line in journal][-1] == {'k': 'd', 'v': 4}
+    assert open_store(path).get(['d']) == {'d': 4}
+
+def test_journal_is_compacted_to_the_live_keys(path, monkeypatch):
+    monkeypatch.setattr(db, 'COMPACT_MIN_RECORDS', 10)
+    store = open_store(path)
+    for n in range(30):
+        store.set('key', n)
+        store.set(f'other{n % 2}', n)
+        store.flush()
+    store.close()
+    with open(path) as journal:
+        lines = journal.readlines()
+    assert len(lines) < db.COMPACT_RATIO * 3  # Far fewer than the 60 records written
+    assert open_store(path).get(['key', 'other0', 'other1']) == {'key': 29, 'other0': 28, 'other1': 29}
+
+def test_non_string_keys_are_skipped_by_prefix_lookups(path):
+    with open(path, 'w') as journal:
+        journal.write('{"k": 5, "v": "x"}\n{"k": "preset:a", "v": 1}\n')
+    store = open_store(path)
+    assert store.items('preset:') == {'preset:a': 1}
+    assert store.items() == {'preset:a': 1}
+    store.close()
+
+def test_watchers_see_every_change(path):
+    store = open_store(path)
+    changes = []
+    store.watch(changes.append)
+    store.set('a', 1)
+    store.delete(['a'])
+    store.batch([('write', 'b', 2)])
+    assert changes == [{'a': 1}, {'a': None}, {'b': 2}]
+    store.close()
@@ -0,0 +1,35 @@
+# tests/test_frame_cache.py
+
+from backends import Canvas
+from frame_cache import FrameCache, Timeline, play_timeline
+
+def test_repeated_frames_share_an_id():
+    frames = bytes([1, 1, 1]) * 2 + bytes([2, 2, 2]) + bytes([1, 1, 1])
+    timeline = Timeline(bytearray(frames), 4, 3)
+    assert timeline.ids == [0, 0, 2, 3]
+    render = play_timeline(timeline)
+    canvas = Canvas(1)
+    assert render(0, canvas) is None
+    assert render(1, canvas) is False
+    assert render(2, canvas) is None and canvas[0] == (2, 2, 2)
+    assert render(3, canvas) is None and canvas[0] == (1, 1, 1)
+
+def test_strided_frames_are_windows():
+    timeline = Timeline(bytearray(range(12)), 3, 6, stride=3)
+    assert list(timeline.ids) == [0, 1, 2]
+    assert bytes(timeline.frame(4)) == bytes(range(3, 9))
+
+def test_cache_skips_builds_over_the_budget():
+    cache = FrameCache(max_bytes=100)
+    built = []
+
+    def build():
+        built.append(True)
+        return Timeline(bytearray(60), 2, 30)
+    assert cache.get('big', build, nbytes=101) is None
+    assert not built
+    first = cache.get('a', build, nbytes=60)
+    assert cache.get('a', build, nbytes=60) is first
+    cache.get('b', build, nbytes=60)
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["bytes"] == 60
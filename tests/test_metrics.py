@@ -0,0 +1,32 @@
+# tests/test_metrics.py
+
+import threading
+
+import metrics
+
+def test_labeled_histogram_counts_every_observation_from_many_threads():
+    family = metrics.LabeledHistogram('test_seconds', 'Test.', 'route')
+    histogram = family.labels('/x')
+
+    def observe():
+        for n in range(20000):
+            histogram.observe((n % 100) * 1e-4)
+    threads = [threading.Thread(target=observe) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert histogram.count == 8 * 20000
+    assert sum(histogram.counts) == histogram.count
+    lines = family.expose()
+    assert 'test_seconds_bucket{route="/x",le="+Inf"} 160000' in lines
+    assert 'test_seconds_count{route="/x"} 160000' in lines
+
+def test_histogram_buckets():
+    histogram = metrics.Histogram('test_bucket_seconds', 'Test.', buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 2.0):
+        histogram.observe(value)
+    assert histogram.counts == [2, 1, 1]
+    assert histogram.samples()[:3] == ['test_bucket_seconds_bucket{le="0.1"} 2',
+                                       'test_bucket_seconds_bucket{le="1.0"} 3',
+                                       'test_bucket_seconds_bucket{le="+Inf"} 4']
@@ -0,0 +1,114 @@
+# tests/test_playlist.py
+
+import time
+
+import pytest
+
+import playlist
+from scheduler import TimerQueue
+
+class SimulatedClock:
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+def local_midnight():
+    """Wall clock time of some local midnight, so times of day are exact."""
+    local = time.localtime(1_700_000_000)
+    return time.mktime((local.tm_year, local.tm_mon, local.tm_mday, 0, 0, 0, 0, 0, -1))
+
+def test_timers_fire_in_due_order():
+    timers = TimerQueue()
+    fired = []
+    timers.schedule(2.0, lambda: fired.append('b'))
+    timers.schedule(1.0, lambda: fired.append('a'))
+    timers.schedule(2.0, lambda: fired.append('c'))
+    assert timers.next_due() == 1.0
+    assert timers.run_due(0.5) == 0
+    assert timers.run_due(2.0) == 3
+    assert fired == ['a', 'b', 'c']
+    assert timers.next_due() is None
+
+def test_cancelled_timers_never_fire():
+    timers = TimerQueue()
+    fired = []
+    handles = [timers.schedule(n, lambda n=n: fired.append(n)) for n in range(10)]
+    for handle in handles[:6]:
+        timers.cancel(handle)
+    timers.cancel(handles[0])  # Twice is a no-op
+    assert len(timers) == 4
+    assert timers.next_due() == 6
+    timers.run_due(100)
+    assert fired == [6, 7, 8, 9]
+    timers.cancel(handles[9])  # Already fired
+    assert len(timers) == 0
+
+def test_timer_scheduled_by_a_timer_waits_for_its_time():
+    timers = TimerQueue()
+    fired = []
+    timers.schedule(1.0, lambda: timers.schedule(1.5, lambda: fired.append('later')))
+    assert timers.run_due(1.0) == 1
+    assert fired == []
+    assert timers.run_due(1.5) == 1
+    assert fired == ['later']
+
+def test_playlist_entries_follow_their_durations():
+    clock = SimulatedClock(100.0)
+    scheduler = playlist.PlaylistScheduler(clock=clock)
+    shown = []
+    scheduler.play('show', [(lambda: shown.append('a'), 1.0), (lambda: shown.append('b'), 2.0)])
+    scheduler.run_due(100.0)
+    assert shown == ['a']
+    assert scheduler.next_due() == 101.0
+    # Late runs fire everything due, and the playlist does not drift
+    scheduler.run_due(103.5)
+    assert shown == ['a', 'b', 'a']
+    assert scheduler.next_due() == 104.0
+
+def test_playlist_without_loop_ends():
+    clock = SimulatedClock()
+    scheduler = playlist.PlaylistScheduler(clock=clock)
+    shown = []
+    ended = []
+    scheduler.play('once', [(lambda: shown.append(1), 1.0), (lambda: shown.append(2), 1.0)],
+                   loop=False, on_end=lambda: ended.append(True))
+    scheduler.run_due(10.0)
+    assert shown == [1, 2]
+    assert ended == [True]
+    assert 'once' not in scheduler.playing
+    assert scheduler.next_due() is None
+
+def test_stopping_a_playlist_cancels_its_next_entry():
+    clock = SimulatedClock()
+    scheduler = playlist.PlaylistScheduler(clock=clock)
+    shown = []
+    scheduler.play('show', [(lambda: shown.append('a'), 1.0)])
+    scheduler.run_due(0.0)
+    scheduler.stop('show')
+    scheduler.run_due(10.0)
+    assert shown == ['a']
+
+def test_daily_entry_fires_at_its_time_every_day():
+    midnight = local_midnight()
+    clock = SimulatedClock(5000.0)
+    wall = SimulatedClock(midnight + 6 * 3600)  # 06:00
+    scheduler = playlist.PlaylistScheduler(clock=clock, wall_clock=wall)
+    fired = []
+    scheduler.add_daily('wake', playlist.parse_time_of_day('07:30'), lambda: fired.append(clock()))
+    assert scheduler.next_due() == pytest.approx(5000.0 + 5400)
+    # Both clocks move on to 07:30
+    clock.now, wall.now = 5000.0 + 5400, midnight + 7.5 * 3600
+    scheduler.run_due(clock.now)
+    assert fired == [pytest.approx(10400.0)]
+    assert scheduler.next_due() == pytest.approx(10400.0 + playlist.DAY)
+    scheduler.remove_daily('wake')
+    assert scheduler.next_due() is None
+
+def test_time_of_day_parsing():
+    assert playlist.parse_time_of_day('07:30') == 27000
+    assert playlist.parse_time_of_day('23:59:59') == 86399
+    for text in ('24:00', '7', '07:60', '01:02:03:04'):
+        with pytest.raises(ValueError):
+            playlist.parse_time_of_day(text)
@@ -0,0 +1,81 @@
+# tests/test_recording.py
+
+import pytest
+
+import recording
+
+LED_COUNT = 5
+
+def write(path, frames, fps=10.0):
+    with recording.RecordingWriter(path, LED_COUNT, fps) as writer:
+        for n, frame in enumerate(frames):
+            writer.write(frame, n / fps)
+
+def frames(count, offset=0):
+    return [bytes((n + offset + i) % 256 for i in range(LED_COUNT * 3)) for n in range(count)]
+
+def test_write_read_round_trip(tmp_path):
+    path = str(tmp_path / 'a.rec')
+    written = frames(4)
+    write(path, written)
+    with recording.Recording(path) as recorded:
+        assert len(recorded) == 4
+        assert recorded.led_count == LED_COUNT and recorded.fps == 10.0
+        assert [bytes(recorded.frame(n)) for n in range(4)] == written
+        assert recorded.timestamps.tolist() == pytest.approx([0.0, 0.1, 0.2, 0.3])
+        assert recorded.duration() == pytest.approx(0.4)
+        with pytest.raises(IndexError):
+            recorded.frame(4)
+
+def test_cut_short_recording_stays_readable(tmp_path):
+    path = str(tmp_path / 'a.rec')
+    write(path, frames(3))
+    with open(path, 'ab') as f:
+        f.write(b'\x00' * 7)  # Part of a fourth record
+    with recording.Recording(path) as recorded:
+        assert len(recorded) == 3
+
+def test_not_a_recording(tmp_path):
+    path = tmp_path / 'a.rec'
+    path.write_bytes(b'not a recording at all, really not at all')
+    with pytest.raises(ValueError):
+        recording.Recording(str(path))
+
+def test_compare_finds_the_first_difference(tmp_path):
+    expected, same, different = (str(tmp_path / name) for name in ('e.rec', 's.rec', 'd.rec'))
+    write(expected, frames(3))
+    write(same, frames(3))
+    changed = frames(3)
+    changed[2] = changed[2][:6] + b'\xff\xff\xff' + changed[2][9:]
+    write(different, changed)
+    with recording.Recording(expected) as a, recording.Recording(same) as b:
+        assert recording.compare(a, b) is None
+    with recording.Recording(expected) as a, recording.Recording(different) as b:
+        assert recording.compare(a, b).startswith("Frame 2 differs in 1 pixels, first pixel 2")
+
+def test_rendering_an_effect_is_repeatable(tmp_path):
+    first, second = str(tmp_path / '1.rec'), str(tmp_path / '2.rec')
+    params = {"color": [255, 0, 0], "alternate_color": [0, 0, 255], "count": 3}
+    result = recording.render('sparkle_effect', 20, first, params, led_count=LED_COUNT)
+    recording.render('sparkle_effect', 20, second, params, led_count=LED_COUNT)
+    assert result["frames"] == 20
+    with recording.Recording(first) as a, recording.Recording(second) as b:
+        assert recording.compare(a, b) is None
+
+def test_replay_keeps_the_recorded_timing(tmp_path):
+    path = str(tmp_path / 'a.rec')
+    write(path, frames(5))
+    now = [0.0]
+
+    def sleep(seconds):
+        now[0] += seconds
+
+    def show(frame, n):
+        shown.append((n, now[0]))
+        if n == 1:
+            now[0] += 0.25  # A slow output: frame 3 is due before it returns
+    shown = []
+    with recording.Recording(path) as recorded:
+        assert recording.replay(recorded, show, clock=lambda: now[0], sleep=sleep) == (4, 1)
+    # Frame 2 is skipped, frame 3 is shown late and frame 4 on time again
+    assert shown == [(0, 0.0), (1, pytest.approx(0.1)), (3, pytest.approx(0.35)), (4, pytest.approx(0.4))]
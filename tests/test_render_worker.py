@@ -0,0 +1,110 @@
+# tests/test_render_worker.py
+
+import threading
+import time
+
+import pytest
+
+import controller
+from scheduler import TimerQueue
+
+RED = (255, 0, 0)
+BLUE = (0, 0, 255)
+
+class SimulatedClock:
+    """A clock that only moves when the worker sleeps."""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+        self.lock = threading.Lock()
+
+    def __call__(self):
+        with self.lock:
+            return self.now
+
+    def sleep(self, seconds):
+        with self.lock:
+            self.now += max(0.0, seconds)
+        time.sleep(0)  # Let the test thread run
+
+@pytest.fixture
+def worker(monkeypatch):
+    """A render worker on a simulated clock, with its own segment layout and timer queue."""
+    # Stop the shared worker, so nothing else composes frames or runs timers during the test
+    if controller.worker is not None:
+        assert controller.worker.flush(timeout=5)
+        controller.worker.close(timeout=5)
+    monkeypatch.setattr(controller, 'segments', {controller.DEFAULT_SEGMENT: controller.Segment(
+        controller.DEFAULT_SEGMENT, controller.DEFAULT_STRIP, 0, controller.LED_COUNT)})
+    monkeypatch.setattr(controller, 'timers', TimerQueue())
+    clock = SimulatedClock()
+    render_worker = controller.RenderWorker(clock=clock, sleep=clock.sleep)
+    render_worker.set_transition_time(0)
+    controller.worker = render_worker
+    yield render_worker
+    render_worker.close(timeout=5)
+    # The next get_worker() starts a fresh shared worker
+    controller.worker = None
+
+def test_timer_starts_animation_from_static_scene(worker):
+    def scene():
+        worker.set_effect(controller.DEFAULT_SEGMENT, controller.color_fill, (RED,), {})
+        # Due right away: fires while the static scene is composed
+        controller.timers.schedule(worker.clock(), lambda: worker.set_effect(
+            controller.DEFAULT_SEGMENT, controller.rainbow_cycle, ([RED, BLUE], 0.01), {}))
+    shown = controller.pixels.frames_recorded
+    worker.submit(scene)
+    assert controller.pixels.wait_for_frame(shown + 20, timeout=5)
+    assert worker.scheduler is not None and worker.scheduler.fps == 100
+
+def test_static_scene_waits_for_commands(worker):
+    worker.submit(lambda: worker.set_effect(controller.DEFAULT_SEGMENT, controller.color_fill, (BLUE,), {}))
+    assert worker.flush(timeout=5)
+    assert worker.flush(timeout=5)  # Applied after the static frame is composed
+    start = worker.clock()
+    shown = controller.pixels.frames_recorded
+    time.sleep(0.05)
+    assert worker.clock() == start
+    assert controller.pixels.frames_recorded == shown
+    assert bytes(controller.pixels.buffer[:3]) == bytes(BLUE)
+
+def test_cleanup_turns_the_leds_off_before_returning():
+    controller.start_effect(controller.color_fill, RED)
+    controller.get_worker().flush(timeout=5)
+    controller.cleanup()
+    assert not any(controller.pixels.buffer)
+    assert not any(controller.pixels.sent)
+    controller.stop_current_effect()
+    controller.get_worker().flush(timeout=5)
+
+def test_switch_latency_includes_the_queue_wait():
+    render_worker = controller.get_worker()
+    release = threading.Event()
+    render_worker.submit(release.wait)  # Keep the render thread busy
+    controller.start_effect(controller.color_fill, RED)
+    time.sleep(0.1)
+    release.set()
+    render_worker.flush(timeout=5)
+    render_worker.flush(timeout=5)  # Applied after the frame that follows the switch
+    assert render_worker.last_switch_latency >= 0.1
+    controller.stop_current_effect()
+    render_worker.flush(timeout=5)
+
+def test_timers_fire_on_time_at_the_idle_tick(worker):
+    # A stopped sweep redraws the same frame: the worker drops to the idle tick
+    worker.submit(lambda: worker.set_effect(controller.DEFAULT_SEGMENT, controller.wheel_sweep,
+                                            (0.0, 1.0, 0.0, 1 / 60), {}))
+    deadline = time.monotonic() + 5
+    while not worker.idle and time.monotonic() < deadline:
+        time.sleep(0.001)
+    assert worker.idle
+    fired = threading.Event()
+    due = []
+
+    def arm():
+        # Half-way between two idle ticks
+        due.append(worker.clock() + 0.5 / controller.IDLE_FPS + 0.1)
+        controller.timers.schedule(due[0], lambda: fired.set() or due.append(worker.clock()))
+    worker.submit(arm)
+    assert fired.wait(timeout=5)
+    assert due[1] - due[0] < 1 / 60
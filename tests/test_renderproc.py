@@ -0,0 +1,163 @@
+# tests/test_renderproc.py
+
+import time
+
+import pytest
+
+import controller
+from backends import Canvas
+from renderproc import RING_SLOTS, FrameRing, ProcessLayer, RenderPool
+
+LED_COUNT = 4
+RED = (255, 0, 0)
+BLUE = (0, 0, 255)
+
+def numbered(frame, canvas):
+    """Render the frame number into the first pixel."""
+    canvas[0] = (frame % 256, frame // 256 % 256, 0)
+
+@pytest.fixture
+def ring():
+    frame_ring = FrameRing(LED_COUNT * 3)
+    yield frame_ring
+    frame_ring.close()
+    frame_ring.unlink()
+
+def shown(canvas):
+    red, green, _ = canvas[0]
+    return red + 256 * green
+
+def test_reader_at_the_frame_rate_never_waits(ring):
+    layer = ProcessLayer(numbered, 60, Canvas(LED_COUNT), ring, None)
+    layer.render_ahead(limit=1)
+    canvas = Canvas(LED_COUNT)
+    for frame in range(50):
+        assert ring.read(frame, canvas)
+        assert shown(canvas) == frame
+        layer.render_ahead()
+
+def test_idle_reader_gets_the_frames_it_asks_for(ring):
+    layer = ProcessLayer(numbered, 60, Canvas(LED_COUNT), ring, None)
+    layer.render_ahead(limit=1)
+    canvas = Canvas(LED_COUNT)
+    for frame in range(10):
+        assert ring.read(frame, canvas)
+        layer.render_ahead()
+    # The worker drops to the idle tick: every 30th frame from now on
+    misses = 0
+    for frame in range(40, 1000, 30):
+        misses += not ring.read(frame, canvas)
+        layer.render_ahead()
+        if frame > 100:
+            assert shown(canvas) == frame
+    assert misses <= 2  # Until the writer has seen the new step twice
+
+def test_writer_keeps_the_frame_being_read(ring):
+    layer = ProcessLayer(numbered, 60, Canvas(LED_COUNT), ring, None)
+    layer.render_ahead()
+    canvas = Canvas(LED_COUNT)
+    assert ring.read(3, canvas)
+    layer.render_ahead()
+    assert 3 in ring.tags.tolist()
+    assert sorted(ring.tags.tolist()) == list(range(3, 3 + RING_SLOTS))
+
+def test_static_effect_renders_one_frame(ring):
+    calls = []
+    layer = ProcessLayer(lambda frame, canvas: calls.append(frame), None, Canvas(LED_COUNT), ring, None)
+    layer.render_ahead(limit=1)
+    assert ring.read(0, Canvas(LED_COUNT))
+    layer.render_ahead()
+    assert calls == [0]
+
+def frame_bytes(frame):
+    canvas = Canvas(LED_COUNT)
+    numbered(frame, canvas)
+    return canvas.buffer
+
+class WrittenDuringCopy:
+    """Frame memory that runs a write the moment the reader copies from it."""
+
+    def __init__(self, frames, write):
+        self.frames = frames
+        self.write = write
+
+    def __getitem__(self, index):
+        self.write()
+        return self.frames[index]
+
+def test_reader_moving_back_never_gets_a_torn_frame(ring):
+    # The writer attaches by name, like a render process
+    writer = FrameRing(ring.frame_size, ring.slots, ring.name)
+    try:
+        for slot, frame in enumerate(range(3, 3 + RING_SLOTS)):
+            writer.write(slot, frame, frame_bytes(frame))
+        canvas = Canvas(LED_COUNT)
+        assert ring.read(10, canvas)
+        # The writer picked its free slots while the cursor was at 10...
+        free = writer.free_slots()
+        assert 0 in free
+        # ...and overwrites frame 3 while the reader, moved back to it, copies it
+        frames = ring.frames
+        ring.frames = WrittenDuringCopy(frames, lambda: writer.write(0, 11, frame_bytes(11)))
+        try:
+            assert not ring.read(3, canvas)
+        finally:
+            ring.frames = frames
+        assert shown(canvas) == 10
+        assert ring.read(11, canvas)
+        assert shown(canvas) == 11
+    finally:
+        writer.close()
+
+def test_reader_skips_a_slot_being_written(ring):
+    ring.write(0, 5, frame_bytes(5))
+    canvas = Canvas(LED_COUNT)
+    ring.writes[0] += 1  # The writer is halfway through the slot
+    assert not ring.read(5, canvas)
+    assert shown(canvas) == 0
+    ring.writes[0] += 1
+    assert ring.read(5, canvas)
+    assert shown(canvas) == 5
+
+@pytest.fixture(scope='module')
+def pool():
+    render_pool = RenderPool(1)
+    yield render_pool
+    render_pool.close()
+
+def wait_for_answers(render_pool, timeout=20):
+    deadline = time.monotonic() + timeout
+    while render_pool.pending and time.monotonic() < deadline:
+        render_pool.poll()
+        time.sleep(0.01)
+    assert not render_pool.pending
+
+def test_pool_sets_effects_up_in_the_background(pool):
+    started = []
+    pool.start(controller.theater_chase, (RED, BLUE, 0.1), {}, LED_COUNT, None,
+               lambda render, fps: started.append((render, fps)))
+    assert not started
+    wait_for_answers(pool)
+    render, fps = started[0]
+    assert fps == pytest.approx(10)
+    canvas = Canvas(LED_COUNT)
+    assert render(0, canvas)
+    assert canvas[0] == RED and canvas[1] == BLUE
+    render.close()
+    assert not pool.rings
+
+def test_cancelled_start_never_shows(pool):
+    started = []
+    layer_id = pool.start(controller.theater_chase, (RED, BLUE, 0.1), {}, LED_COUNT, None,
+                          lambda render, fps: started.append(render))
+    pool.cancel(layer_id)
+    wait_for_answers(pool)
+    assert not started
+    assert not pool.rings
+
+def test_failed_setup_is_dropped(pool):
+    started = []
+    # rainbow_cycle logs and returns None with fewer than two colors
+    pool.start(controller.rainbow_cycle, ([RED],), {}, LED_COUNT, None, lambda render, fps: started.append(render))
+    wait_for_answers(pool)
+    assert not started
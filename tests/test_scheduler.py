@@ -0,0 +1,85 @@
+# tests/test_scheduler.py
+
+import threading
+
+import pytest
+
+from scheduler import MAX_FPS, FrameScheduler, fps_for_wait
+
+class FakeClock:
+    """A clock that only moves when sleep() is called, or when the test moves it."""
+
+    def __init__(self, now=0.0):
+        self.now = now
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += max(0.0, seconds)
+
+def test_renders_every_frame_on_time():
+    clock = FakeClock(10.0)
+    scheduler = FrameScheduler(50, clock=clock, sleep=clock.sleep)
+    rendered = []
+    scheduler.run(lambda frame: rendered.append((frame, clock())), threading.Event(), max_frames=10)
+    assert [frame for frame, _ in rendered] == list(range(10))
+    for frame, at in rendered:
+        assert at == pytest.approx(10.0 + frame / 50)
+    stats = scheduler.stats()
+    assert stats["frames_rendered"] == 10
+    assert stats["frames_dropped"] == 0
+    assert stats["jitter_max"] == pytest.approx(0.0, abs=1e-9)
+
+def test_slow_frames_are_dropped_not_delayed():
+    clock = FakeClock()
+    scheduler = FrameScheduler(100, clock=clock, sleep=clock.sleep)
+    rendered = []
+
+    def render(frame):
+        rendered.append(frame)
+        if frame == 2:
+            clock.now += 0.035  # Three and a half frame periods
+    scheduler.run(render, threading.Event(), max_frames=10)
+    assert rendered == [0, 1, 2, 5, 6, 7, 8, 9]
+    assert scheduler.stats()["frames_dropped"] == 2
+
+def test_resume_continues_the_timeline():
+    clock = FakeClock()
+    scheduler = FrameScheduler(10, clock=clock, sleep=clock.sleep)
+    rendered = []
+    scheduler.run(rendered.append, threading.Event(), max_frames=3)
+    scheduler.run(rendered.append, threading.Event(), max_frames=6, resume=True)
+    assert rendered == list(range(6))
+    scheduler.run(rendered.append, threading.Event(), max_frames=2)
+    assert rendered[6:] == [0, 1]
+
+def test_epoch_joins_the_shared_timeline():
+    clock = FakeClock(5.25)
+    scheduler = FrameScheduler(10, clock=clock, sleep=clock.sleep, epoch=5.0)
+    rendered = []
+    scheduler.run(rendered.append, threading.Event(), max_frames=6)
+    # Frames 0-2 were due before the run started; it waits for frame 3
+    assert rendered == [3, 4, 5]
+    assert scheduler.stats()["frames_dropped"] == 0
+    assert clock.sleeps[0] == pytest.approx(0.05)
+
+def test_stop_event_ends_the_run():
+    clock = FakeClock()
+    scheduler = FrameScheduler(30, clock=clock, sleep=clock.sleep)
+    stop = threading.Event()
+    rendered = []
+
+    def render(frame):
+        rendered.append(frame)
+        if frame == 4:
+            stop.set()
+    scheduler.run(render, stop)
+    assert rendered == [0, 1, 2, 3, 4]
+
+def test_frame_rate_limits():
+    assert FrameScheduler(10000).fps == MAX_FPS
+    assert fps_for_wait(0.05) == pytest.approx(20)
+    assert fps_for_wait(0) == MAX_FPS
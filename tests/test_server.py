@@ -0,0 +1,82 @@
+# tests/test_server.py
+
+import pytest
+
+import boot
+import controller
+import db
+import server
+
+@pytest.fixture
+def client():
+    return server.app.test_client()
+
+def test_write_rejects_non_string_keys(client):
+    response = client.post('/write', json={"key": 5, "value": "x"})
+    assert response.status_code == 400
+    assert db.get_from_database([5]) == {5: None}
+
+def test_batch_write_rejects_non_string_keys(client):
+    response = client.post('/batch', json={"operations": [{"op": "write", "key": ["a"], "value": 1}]})
+    assert response.status_code == 400
+
+def test_prefix_lookups_skip_non_string_keys(client):
+    # Written by a server that still accepted them, or replayed from its journal
+    db.get_store().set(5, "legacy")
+    try:
+        assert client.post('/write', json={"key": "preset:x", "value": {"name": "x"}}).status_code == 200
+        response = client.get('/presets')
+        assert response.status_code == 200
+        assert response.get_json()["presets"]["x"] == {"name": "x"}
+    finally:
+        db.remove_from_database([5, "preset:x"])
+
+def test_segments_and_their_effects_survive_a_restart(client):
+    response = client.post('/segments', json={"name": "left", "start": 0, "length": 10,
+                                              "map": {"layout": "linear", "count": 10}})
+    assert response.status_code == 200
+    response = client.post('/effects/color_fill', json={"color": [0, 255, 0], "segment": "left"})
+    assert response.status_code == 200
+    controller.get_worker().flush(timeout=5)
+    # A restart starts with the default segment only
+    controller.remove_segment('left')
+    boot.restore_scene()
+    assert controller.segments['left'].describe()["length"] == 10
+    assert controller.segments['left'].pixel_map is not None
+    controller.get_worker().flush(timeout=5)
+    assert controller.segments['left'].compositor.front.name == 'color_fill'
+
+    assert client.post('/segments/delete', json={"name": "left"}).status_code == 200
+    assert db.get_from_database(['segment:left', 'active_effect:left']) == {
+        'segment:left': None, 'active_effect:left': None}
+    controller.stop_current_effect()
+    controller.get_worker().flush(timeout=5)
+
+def test_redefining_a_segment_forgets_its_effect(client):
+    client.post('/segments', json={"name": "right", "start": 10, "length": 10})
+    client.post('/effects/color_fill', json={"color": [0, 0, 255], "segment": "right"})
+    client.post('/segments', json={"name": "right", "start": 20, "length": 5})
+    assert db.get_from_database(['active_effect:right'])['active_effect:right'] is None
+    client.post('/segments/delete', json={"name": "right"})
+
+@pytest.mark.parametrize("fields", [
+    {"reverse": "false"},
+    {"mirror": 0},
+    {"start": None},
+    {"length": "10"},
+    {"start": True},
+    {"name": ["a"]},
+    {"strip": ["main"]},
+])
+def test_define_segment_rejects_mistyped_fields(client, fields):
+    response = client.post('/segments', json={"name": "typed", "start": 0, "length": 10, **fields})
+    assert response.status_code == 400
+    assert 'typed' not in controller.segments
+    assert db.get_from_database(['segment:typed'])['segment:typed'] is None
+
+@pytest.mark.parametrize("layout", [[], {}, None])
+def test_define_segment_rejects_non_string_layouts(client, layout):
+    response = client.post('/segments', json={"name": "mapped", "start": 0, "length": 10,
+                                              "map": {"layout": layout, "count": 10}})
+    assert response.status_code == 400
+    assert 'Unknown layout' in response.get_json()["error"]
@@ -0,0 +1,59 @@
+# tests/test_sync.py
+
+import json
+import socket
+import threading
+
+import pytest
+
+import controller
+import sync
+
+@pytest.fixture
+def follower():
+    node = sync.SyncFollower(('127.0.0.1', 9))
+    yield node
+    node.close()
+    controller.get_worker().flush(timeout=5)
+
+def state(session, version, brightness):
+    return {"type": "state", "epoch": 0.0, "session": session, "version": version,
+            "effects": {}, "brightness": brightness}
+
+def test_follower_ignores_states_reordered_behind_newer_ones(follower):
+    follower.on_state(state('a', 2, 0.5))
+    follower.on_state(state('a', 1, 0.2))
+    assert follower.applied["brightness"] == 0.5
+    follower.on_state(state('a', 3, 0.4))
+    assert follower.applied["brightness"] == 0.4
+
+def test_follower_starts_over_when_the_leader_restarts(follower):
+    follower.on_state(state('a', 5, 0.5))
+    # A restarted leader counts from 0 again: its states are new despite the lower versions
+    follower.on_state(state('b', 0, 0.3))
+    assert follower.applied["brightness"] == 0.3
+    follower.on_state(state('b', 1, 0.6))
+    assert follower.applied["brightness"] == 0.6
+
+def test_leader_sends_changes_from_its_own_thread():
+    leader = sync.SyncLeader(port=0, host='127.0.0.1')
+    receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    receiver.bind(('127.0.0.1', 0))
+    receiver.settimeout(5)
+    sent_from = []
+    send_state = leader.send_state
+    leader.send_state = lambda *args: (sent_from.append(threading.current_thread()), send_state(*args))
+    try:
+        leader.state = leader.read_state()
+        leader.followers[receiver.getsockname()] = leader.clock()
+        announcer = threading.Thread(target=leader.announce, name='sync-announce', daemon=True)
+        announcer.start()
+        # A state store write: the writing thread only flags the change
+        leader.on_change({'set_brightness': {"brightness": 0.5}})
+        message = json.loads(receiver.recv(65536))
+        assert message["session"] == leader.session
+        assert message["version"] == 1
+        assert sent_from == [announcer]
+    finally:
+        leader.close()
+        receiver.close()